@@ -0,0 +1,72 @@
+from openiec.calculate.calcsigma import SigmaSolLiq
+from pycalphad import Database
+
+
+def test():
+    """
+    Calculate the interfacial energy between the ordered GAMMA_PRIME phase and the liquid in the Ni-Al system.
+    GAMMA_PRIME has two sublattices, and its Gibbs energy is minimized over the site fractions at given mole fractions.
+    """
+    # Given temperature.
+    T = 1640
+    # Given initial alloy composition. x0 is the mole fraction of Al.
+    x0 = [0.24]
+    # Render thermodynamic database.
+    db = Database("NiAlHuang1999.tdb")
+    # Define components in the interface.
+    comps = ["NI", "AL", "VA"]
+    # Two phases separated by the interface.
+    phasenames = ["GAMMA_PRIME", "LIQUID"]
+
+    # Molar volumes of pure components to construct corresponding molar volume database.
+    # Molar volume of Ni.
+    vni = "6.718*10.0**(-6.0) + (2.936*10.0**(-5)*10.0**(-6.0))*T**1.355"
+    # Molar volume of Al.
+    val = "10.269*10.0**(-6.0) + (3.860*10.0**(-5)*10.0**(-6.0))*T**1.491"
+    purevms = [[vni, val], ] * 2
+
+    # A composition range for searching initial interfacial equilirium composition.
+    limit = [0.0001, 0.5]
+    # The composition step for searching initial interfacial equilirium composition.
+    dx = 0.01
+
+    # Call the module for calculating solid/liquid interfacial energies.
+    # The melting enthalpies of pure Ni and Al are calculated from the pure end-members of both phases.
+    sigma = SigmaSolLiq(
+        T=T,
+        x0=x0,
+        db=db,
+        comps=comps,
+        phasenames=phasenames,
+        purevms=purevms,
+        limit=limit,
+        dx=dx,
+    )
+
+    # Print the calculated interfacial energy with xarray.Dataset type.
+    print(sigma, "\n")
+    # Print the calculated interfacial energy value.
+    print(sigma.Interfacial_Energy.values)
+
+    # Output
+    """
+    <xarray.Dataset>
+    Dimensions:                     (Components: 2)
+    Coordinates:
+    * Components                  (Components) <U2 'NI' 'AL'
+    Data variables:
+        Temperature                 int64 1640
+        In_Two_Phase_Region         bool True
+        Initial_Alloy_Composition   (Components) float64 0.76 0.24
+        Interfacial_Composition     (Components) float64 0.6601 0.3399
+        Partial_Interfacial_Energy  (Components) float64 0.2822 0.2822
+        Interfacial_Energy          float64 0.2822
+        Iterations                  int64 29
+        Evaluations                 int64 154
+
+    0.28224339475220656
+    """
+
+
+if __name__ == "__main__":
+    test()
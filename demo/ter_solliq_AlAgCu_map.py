@@ -0,0 +1,59 @@
+from openiec.calculate.calcmap import SigmaSolLiqMap
+from pycalphad import Database
+import numpy as np
+
+
+def test():
+    """
+    Calculate solid/liquid interfacial energies over the isothermal section of the Al-Ag-Cu system.
+    """
+    # Given temperature.
+    T = 775.09
+    # Grids of the mole fractions of Ag and Cu.
+    xags = np.linspace(0.02, 0.30, 15)
+    xcus = np.linspace(0.01, 0.15, 15)
+    # Render thermodynamic database.
+    db = Database("AlAgCuWitusiewicz2005.TDB")
+    # Define components in the interface.
+    comps = ["AL", "AG", "CU", "VA"]
+    # Two phases separated by the interface.
+    phasenames = ["FCC_A1", "LIQUID"]
+
+    # Molar volumes of pure components to construct corresponding molar volume database.
+    # Molar volume of Al.
+    val = "10.269*10.0**(-6.0) + (3.860*10.0**(-5)*10.0 ** (-6.0))*T**1.491"
+    # Molar volume of Ag.
+    vag = "10.49*10.0**(-6.0) + (9.646*10.0**(-5)*10.0**(-6.0))*T**1.314"
+    # Molar volume of Cu.
+    vcu = "7.226*10.0**(-6.0) + (4.06*10.0**(-5)*10.0**(-6.0))*T**1.355"
+    purevms = [[val, vag, vcu]] * 2
+
+    # A composition range for searching initial interfacial equilirium composition.
+    limit = [10 ** (-20), 0.8]
+    # The composition step for searching initial interfacial equilirium composition.
+    dx = 0.1
+
+    # Call the module for calculating solid/liquid interfacial energies over the grid with 4 processes.
+    sigma = SigmaSolLiqMap(
+        T=T,
+        xs1=xags,
+        xs2=xcus,
+        db=db,
+        comps=comps,
+        phasenames=phasenames,
+        purevms=purevms,
+        limit=limit,
+        dx=dx,
+        processes=4,
+    )
+
+    # Print the calculated interfacial energies with xarray.Dataset type.
+    print(sigma, "\n")
+    # Grid points in the FCC_A1 + LIQUID two-phase region.
+    print(sigma.In_Two_Phase_Region.values, "\n")
+    # Contour plot of the interfacial energies, NaN outside the two-phase region.
+    # sigma.Interfacial_Energy.plot.contourf(x="X_AG", y="X_CU")
+
+
+if __name__ == "__main__":
+    test()
@@ -1,8 +1,42 @@
-from openiec.calculate.calcsigma import SigmaPure, SigmaSolLiq, SigmaCoherent
+"""
+Interfacial energy calculation in alloys.
 
-from openiec.property.molarvolume import MolarVolume, InterficialMolarVolume
-from openiec.property.meltingenthalpy import MeltingEnthalpy
+The public names are loaded lazily, so that importing the package does not import pycalphad,
+sympy, xarray and matplotlib until a calculation is requested.
+"""
 
-# binary
+import importlib
 
-# ternary
+_lazy = {
+    "SigmaPure": "openiec.calculate.calcsigma",
+    "SigmaSolLiq": "openiec.calculate.calcsigma",
+    "SigmaCoherent": "openiec.calculate.calcsigma",
+    "SigmaSolLiqMap": "openiec.calculate.calcmap",
+    "SigmaCoherentMap": "openiec.calculate.calcmap",
+    "SigmaInterfaces": "openiec.calculate.calcinterfaces",
+    "SigmaSolLiqUncertainty": "openiec.calculate.uncertainty",
+    "SigmaCoherentUncertainty": "openiec.calculate.uncertainty",
+    "SigmaSolLiqFit": "openiec.calculate.fitting",
+    "SigmaScheil": "openiec.calculate.calcscheil",
+    "MolarVolume": "openiec.property.molarvolume",
+    "InterficialMolarVolume": "openiec.property.molarvolume",
+    "MeltingEnthalpy": "openiec.property.meltingenthalpy",
+    "LoadDatabase": "openiec.utils.database",
+    "ResultStore": "openiec.utils.store",
+    "OpenResults": "openiec.utils.store",
+    "ShardQueue": "openiec.utils.shards",
+}
+
+__all__ = list(_lazy)
+
+
+def __getattr__(name):
+    if name not in _lazy:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(importlib.import_module(_lazy[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
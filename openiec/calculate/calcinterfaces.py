@@ -0,0 +1,140 @@
+"""Calculate interfacial energies of several interfaces between phases of one database in one pass.
+"""
+
+from openiec.calculate.calcsigma import SigmaSolLiqModel, SigmaCoherentModel, _banner
+from openiec.property.phasemodels import PhaseModels
+from openiec.property.phaseregion import PhaseRegion
+import numpy as np
+from xarray import Dataset
+
+
+def SigmaInterfaces(
+    conditions, db, comps, interfaces, purevms, intervms={}, meltingenthalpy={}, limit=[0, 1.0], dx=0.01, pdens=None
+):
+    """
+    Calculate the interfacial energies of all given interfaces at all given conditions.
+    The models of each phase are built once per temperature and shared by every interface the phase takes part in.
+
+    Parameters
+    -----------
+    conditions: list
+        Conditions as (T, x0), where x0 is the initial alloy composition.
+    db : Database
+        Database containing the relevant parameters.
+    comps : list
+        Names of components to consider in the calculation.
+    interfaces: list
+        Pairs of phases, e.g. [("FCC_A1", "LIQUID"), ("BCC_A2", "LIQUID"), ("FCC_A1", "GAMMA_PRIME")].
+        A pair including LIQUID is a solid/liquid interface and the others are coherent interfaces,
+        unless a third element "solliq" or "coherent" is given.
+    purevms: dict
+        The molar volumes of pure components of each phase, e.g. {"FCC_A1": ["6.718*10.0**(-6.0)", ...], ...}.
+    intervms: dict
+        Redlich-Kister parameters of the excess molar volume of each phase, e.g. {"LIQUID": {("AL", "NI"): [...]}}.
+    meltingenthalpy: dict
+        The stardard melting enthalpies of pure componnets of each solid/liquid interface, e.g. {"FCC_A1/LIQUID": [...]}.
+        They are calculated from the database if not given.
+    limit: list
+        The limit of composition for searching interfacial composition in equilibrium.
+    dx: float
+        The step of composition for searching interfacial composition in equilibrium.
+    pdens: int
+        Number of points sampled per degree of freedom of each phase in the equilibrium calculations of coherent interfaces.
+
+    Returns:
+    -----------
+    Interface: list of str
+        Names of interfaces, e.g. "FCC_A1/LIQUID".
+    Interface_Type: list of str
+        "solliq" or "coherent".
+    Components: list of str
+        Given components.
+    Temperature: list
+        Temperatures of the conditions.
+    Initial_Alloy_Composition: list
+        Initial alloy compositions of the conditions.
+    In_Two_Phase_Region: bool array
+        Whether the condition lies in the two-phase region of the interface.
+    Interfacial_Composition: array
+        Interfacial compositions.
+    Partial_Interfacial_Energy: array
+        Partial interfacial energies of components.
+    Interfacial_Energy: array
+        Requested interfacial energies, NaN outside the two-phase region.
+
+    Return type: xarray Dataset with the dimensions Interface and Condition
+    """
+    components = [each for each in comps if each != "VA"]
+    pairs = [_interface(each) for each in interfaces]
+    names = ["%s/%s" % tuple(phasenames) for phasenames, _ in pairs]
+    phasemodels = PhaseModels(db, comps)
+
+    ni, nc, ncomp = len(pairs), len(conditions), len(components)
+    Ts = np.array([float(T) for T, _ in conditions])
+    x0s = np.array([[1.0 - sum(x0)] + list(x0) for _, x0 in conditions], dtype=float)
+    region = np.zeros((ni, nc), dtype=bool)
+    sigma = np.full((ni, nc), np.nan)
+    sigmapartial = np.full((ni, nc, ncomp), np.nan)
+    xc = np.full((ni, nc, ncomp), np.nan)
+
+    _banner()
+    for T in dict.fromkeys(Ts):
+        indices = np.nonzero(Ts == T)[0]
+        for i, (phasenames, kind) in enumerate(pairs):
+            vms = [purevms[each] for each in phasenames]
+            ivms = [intervms.get(each, []) for each in phasenames]
+            if kind == "coherent":
+                check = PhaseRegion.shared(db, comps, phasenames, pdens)
+            else:
+                check = PhaseRegion.shared(db, comps, phasenames)
+
+            model = None
+            for j in indices:
+                x0 = list(conditions[j][1])
+                if not check.check(x0, T)["region"]:
+                    continue
+                if model is None:
+                    if kind == "coherent":
+                        model = SigmaCoherentModel(
+                            T, db, comps, phasenames, vms, ivms, pdens, phasemodels=phasemodels
+                        )
+                    else:
+                        model = SigmaSolLiqModel(
+                            T, db, comps, phasenames, vms, ivms, meltingenthalpy.get(names[i], []),
+                            phasemodels=phasemodels,
+                        )
+                record = model.calculate(x0, limit=limit, dx=dx)
+                region[i, j] = True
+                sigma[i, j] = record["sigma"]
+                sigmapartial[i, j] = record["sigmapartial"]
+                xc[i, j] = record["xc"]
+            check.clear(T)
+        phasemodels.clear(T)
+    _banner(end=True)
+
+    return Dataset(
+        {
+            "Interface_Type": ("Interface", [kind for _, kind in pairs]),
+            "Temperature": ("Condition", Ts),
+            "Initial_Alloy_Composition": (("Condition", "Components"), x0s),
+            "In_Two_Phase_Region": (("Interface", "Condition"), region),
+            "Interfacial_Composition": (("Interface", "Condition", "Components"), xc),
+            "Partial_Interfacial_Energy": (("Interface", "Condition", "Components"), sigmapartial),
+            "Interfacial_Energy": (("Interface", "Condition"), sigma),
+        },
+        coords={"Interface": names, "Condition": np.arange(nc), "Components": components},
+    )
+
+
+def _interface(interface):
+    """
+    The pair of phases and the type of the interface.
+    """
+    phasenames = list(interface[:2])
+    if len(interface) > 2:
+        kind = interface[2]
+    else:
+        kind = "solliq" if "LIQUID" in phasenames else "coherent"
+    if kind not in ("solliq", "coherent"):
+        raise ValueError("Unknown interface %r, use 'solliq' or 'coherent'." % kind)
+    return phasenames, kind
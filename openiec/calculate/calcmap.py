@@ -0,0 +1,209 @@
+"""Calculate interfacial energies over the isothermal section of a ternary system.
+"""
+
+from openiec.calculate.calcsigma import SigmaSolLiqModel, SigmaCoherentModel
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from xarray import Dataset
+
+
+def SigmaSolLiqMap(
+    T, xs1, xs2, db, comps, phasenames, purevms, intervms=[], meltingenthalpy=[], limit=[0, 1.0], dx=0.01, processes=1
+):
+    """
+    Calculate solid/liquid interfacial energies over the composition grid of a ternary isothermal section.
+
+    Parameters
+    -----------
+    T: float
+        Given temperature.
+    xs1: list
+        Grid of the mole fraction of the second component, e.g. Ag in ["AL", "AG", "CU", "VA"].
+    xs2: list
+        Grid of the mole fraction of the third component, e.g. Cu in ["AL", "AG", "CU", "VA"].
+    db : Database
+        Database containing the relevant parameters.
+    comps : list
+        Names of components to consider in the calculation.
+    phasenames : list
+        Names of phase model to build.
+    purevms: list
+        The molar volume of the components.
+    intervms: list
+        Redlich-Kister parameters of the excess molar volumes of the two phases.
+    meltingenthalpy: list
+        The stardard melting enthalpies of pure componnets.
+    limit: list
+        The limit of composition for searching interfacial composition in equilibrium.
+    dx: float
+        The step of composition for searching interfacial composition in equilibrium.
+    processes: int
+        Number of worker processes. Rows of the grid are distributed over the workers.
+
+    Returns:
+    -----------
+    Components: list of str
+        Given components.
+    Phases: list of str
+        Given phases.
+    Temperature: float
+        Given temperature.
+    In_Two_Phase_Region: bool array
+        Whether the grid point lies in the two-phase region.
+    Equilibrium_Composition: array
+        Compositions of the two phases in equilibrium.
+    Interfacial_Composition: array
+        Interfacial compositions.
+    Partial_Interfacial_Energy: array
+        Partial interfacial energies of components.
+    Interfacial_Energy: array
+        Requested interfacial energies, NaN outside the two-phase region.
+
+    Return type: xarray Dataset with the dimensions of the two composition grids
+    """
+    args = (SigmaSolLiqModel, (T, db, comps, phasenames, purevms, intervms, meltingenthalpy))
+    return _sigmamap(T, xs1, xs2, comps, phasenames, args, limit, dx, processes)
+
+
+def SigmaCoherentMap(
+    T, xs1, xs2, db, comps, phasenames, purevms, intervms=[], limit=[0, 1.0], dx=0.01, processes=1
+):
+    """
+    Calculate coherent interfacial energies over the composition grid of a ternary isothermal section.
+
+    Parameters
+    -----------
+    T: float
+        Given temperature.
+    xs1: list
+        Grid of the mole fraction of the second component, e.g. Al in ["NI", "AL", "CR", "VA"].
+    xs2: list
+        Grid of the mole fraction of the third component, e.g. Cr in ["NI", "AL", "CR", "VA"].
+    db : Database
+        Database containing the relevant parameters.
+    comps : list
+        Names of components to consider in the calculation.
+    phasenames : list
+        Names of phase model to build.
+    purevms: list
+        The molar volumes of pure components.
+    intervms: list
+        Redlich-Kister parameters of the excess molar volumes of the two phases.
+    limit: list
+        The limit of composition for searching interfacial composition in equilibrium.
+    dx: float
+        The step of composition for searching interfacial composition in equilibrium.
+    processes: int
+        Number of worker processes. Rows of the grid are distributed over the workers.
+
+    Returns:
+    -----------
+    Same as SigmaSolLiqMap, with in addition
+    Equilibrium_Chemical_Potential: array
+        Chemical potentials of components in two-phase equilibrium.
+
+    Return type: xarray Dataset with the dimensions of the two composition grids
+    """
+    args = (SigmaCoherentModel, (T, db, comps, phasenames, purevms, intervms))
+    return _sigmamap(T, xs1, xs2, comps, phasenames, args, limit, dx, processes)
+
+
+_worker = {}
+
+
+def _initworker(modelclass, modelargs):
+    """
+    Build the models once per worker process.
+    """
+    _worker["model"] = modelclass(*modelargs)
+
+
+def _maprow(x1, xs2, limit, dx, model=None):
+    """
+    Calculate the interfacial energies along a row of the grid.
+    The tie-line and the interfacial composition of the previous point in the row are the initial guesses of the next one.
+    """
+    model = model or _worker["model"]
+    records = []
+    xguess, tieguess = None, None
+    for x2 in xs2:
+        x0 = [float(x1), float(x2)]
+        if x0[0] + x0[1] >= 1.0:
+            records.append(None)
+            xguess, tieguess = None, None
+            continue
+        tieline = model.tieline(x0, tieguess)
+        if not tieline["region"]:
+            records.append(None)
+            xguess, tieguess = None, None
+            continue
+        if isinstance(model, SigmaCoherentModel):
+            record = model.calculate(x0, mueq=tieline["mueq"], limit=limit, dx=dx, xguess=xguess)
+            record["mueq"] = np.array(tieline["mueq"], dtype=float).flatten()
+        else:
+            record = model.calculate(x0, xeq=tieline["xeq"], limit=limit, dx=dx, xguess=xguess)
+        record["xeq"] = np.array(tieline["xeq"], dtype=float).reshape((2, -1))
+        records.append(record)
+        xguess, tieguess = record["x"], tieline["xeq"]
+    return records
+
+
+def _sigmamap(T, xs1, xs2, comps, phasenames, args, limit, dx, processes):
+    """
+    Distribute the rows of the grid and collect the results in a Dataset.
+    """
+    modelclass, modelargs = args
+    components = [each for each in comps if each != "VA"]
+    if len(components) != 3:
+        raise ValueError("Composition maps are calculated for ternary systems only.")
+    xs1, xs2 = np.asarray(xs1, dtype=float), np.asarray(xs2, dtype=float)
+
+    if processes == 1:
+        model = modelclass(*modelargs)
+        rows = [_maprow(x1, xs2, limit, dx, model) for x1 in xs1]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=_initworker, initargs=args
+        ) as executor:
+            rows = list(
+                executor.map(_maprow, xs1, [xs2] * len(xs1), [limit] * len(xs1), [dx] * len(xs1))
+            )
+
+    n1, n2, nc = len(xs1), len(xs2), len(components)
+    region = np.zeros((n1, n2), dtype=bool)
+    sigma = np.full((n1, n2), np.nan)
+    sigmapartial = np.full((n1, n2, nc), np.nan)
+    xc = np.full((n1, n2, nc), np.nan)
+    coherent = modelclass is SigmaCoherentModel
+    xeq = np.full((n1, n2, 2, nc), np.nan)
+    mueq = np.full((n1, n2, nc), np.nan)
+    for i, row in enumerate(rows):
+        for j, record in enumerate(row):
+            if record is None:
+                continue
+            region[i, j] = True
+            sigma[i, j] = record["sigma"]
+            sigmapartial[i, j] = record["sigmapartial"]
+            xc[i, j] = record["xc"]
+            xeq[i, j] = record["xeq"]
+            if coherent:
+                mueq[i, j] = record["mueq"]
+
+    dims = ("X_%s" % components[1], "X_%s" % components[2])
+    eqvar = {"Equilibrium_Composition": (dims + ("Phases", "Components"), xeq)}
+    if coherent:
+        eqvar["Equilibrium_Chemical_Potential"] = (dims + ("Components",), mueq)
+
+    res = Dataset(
+        {
+            "Temperature": T,
+            "In_Two_Phase_Region": (dims, region),
+            "Interfacial_Composition": (dims + ("Components",), xc),
+            "Partial_Interfacial_Energy": (dims + ("Components",), sigmapartial),
+            "Interfacial_Energy": (dims, sigma),
+            **eqvar
+        },
+        coords={dims[0]: xs1, dims[1]: xs2, "Components": components, "Phases": phasenames},
+    )
+
+    return res
@@ -0,0 +1,184 @@
+"""Calculate the solid/liquid interfacial energy along a Scheil solidification path.
+"""
+
+from openiec.calculate.calcsigma import SigmaSolLiqModel, _banner
+from openiec.property.phasemodels import PhaseModels
+from openiec.property.phaseregion import PhaseRegion
+from openiec.property.coherentenergy import CoherentGibbsEnergy
+import numpy as np
+from xarray import Dataset
+
+
+def SigmaScheil(
+    T0, x0, db, comps, phasenames, purevms, intervms=[], meltingenthalpy=[], dT=1.0, Tmin=298.15, fsmax=0.99, limit=[0, 1.0], dx=0.01,
+    competing=None
+):
+    """
+    Calculate the solid/liquid interfacial energy along the Scheil solidification path of an alloy.
+
+    Temperature is stepped down from T0. At each step, the liquid left by the previous step is split
+    into the solid and the liquid of the two-phase equilibrium by the lever rule, the solid is frozen,
+    and the remaining liquid continues with the equilibrium liquid composition.
+    The interfacial energy is calculated between the solid and the liquid of each step.
+    The compiled models are shared by all steps, and both the tie-line and the interfacial composition
+    start from the results of the previous step.
+    At every step, the remaining liquid is also equilibrated with the competing phases of the database,
+    and the path ends as soon as a phase other than the two given phases forms, e.g. at a eutectic.
+
+    Parameters
+    -----------
+    T0: float
+        Start temperature, usually at or just below the liquidus temperature.
+        Steps above the liquidus are skipped.
+    x0: list
+        Initial alloy composition.
+    db : Database
+        Database containing the relevant parameters.
+    comps : list
+        Names of components to consider in the calculation.
+    phasenames : list
+        Names of the solid and the liquid phases, e.g. ["FCC_A1", "LIQUID"].
+    purevms: list
+        The molar volume of the components.
+    intervms: list
+        Redlich-Kister parameters of the excess molar volumes of the two phases.
+    meltingenthalpy: list
+        The stardard melting enthalpies of pure componnets, calculated once if not given.
+    dT: float
+        Temperature step.
+    Tmin: float
+        The lowest temperature.
+    fsmax: float
+        The path ends when the solid fraction reaches fsmax.
+    limit: list
+        The limit of composition for searching interfacial composition in equilibrium.
+    dx: float
+        The step of composition for searching interfacial composition in equilibrium.
+    competing: list
+        Phases checked for their formation from the remaining liquid, all phases of the database
+        which can be built from the components by default. An empty list skips the check,
+        and the path then follows the two given phases only, also beyond invariant reactions.
+        The database must therefore hold the competing phases, not only the two given phases.
+
+    Returns:
+    -----------
+    Components: list of str
+        Given components.
+    Phases: list of str
+        Given phases.
+    Temperature: list
+        Temperatures of the steps.
+    Solid_Fraction: list
+        Fractions of solid after the steps.
+    Liquid_Composition: array
+        Compositions of the remaining liquid after the steps.
+    Equilibrium_Composition: array
+        Compositions of the solid and the liquid in two-phase equilibrium at the steps.
+    Interfacial_Composition: array
+        Interfacial compositions.
+    Partial_Interfacial_Energy: array
+        Partial interfacial energies of components.
+    Interfacial_Energy: list
+        Solid/liquid interfacial energies.
+
+    Return type: xarray Dataset with the dimension Step
+    """
+    components = [each for each in comps if each != "VA"]
+    phasemodels = PhaseModels(db, comps)
+    region = PhaseRegion.shared(db, comps, phasenames)
+    meltingenthalpy = list(meltingenthalpy)
+    if competing is None:
+        competing = _phases(db, comps)
+    competing = sorted(set(competing) | set(phasenames)) if competing else []
+
+    xliq = np.array([1.0 - sum(x0)] + list(x0), dtype=float)
+    fliq = 1.0
+    xeq, xguess = None, None
+    steps = []
+
+    _banner()
+    T = float(T0)
+    while T >= Tmin and 1.0 - fliq < fsmax:
+        res = region.check(list(xliq[1:]), T, xeq)
+        if not res["region"]:
+            if fliq < 1.0:
+                print(
+                    "[Warning] The liquid composition %s leaves the two-phase region of %s at %s K, the Scheil path ends."
+                    % (list(xliq), " + ".join(phasenames), T)
+                )
+                break
+            T -= dT
+            continue
+        xeq = [list(each) for each in res["xeq"]]
+        if competing:
+            extra = _stable(T, db, comps, competing, list(xliq[1:])) - set(phasenames)
+            if extra:
+                print(
+                    "[Warning] %s forms from the liquid %s at %s K, the Scheil path of %s ends."
+                    % (" + ".join(sorted(extra)), list(xliq), T, " + ".join(phasenames))
+                )
+                break
+
+        model = SigmaSolLiqModel(
+            T, db, comps, phasenames, purevms, intervms, meltingenthalpy, phasemodels=phasemodels
+        )
+        record = model.calculate(list(xliq[1:]), xeq=xeq, limit=limit, dx=dx, xguess=xguess)
+        meltingenthalpy = model.meltingenthalpy
+        xguess = record["x"]
+
+        """Lever rule on the tie-line, and only the liquid takes part in the next step"""
+        xS, xL = np.array(xeq[0]), np.array(xeq[1])
+        f = np.dot(xliq - xS, xL - xS) / np.dot(xL - xS, xL - xS)
+        fliq *= min(max(f, 0.0), 1.0)
+        xliq = xL
+
+        steps.append((T, 1.0 - fliq, xL, xeq, record))
+        phasemodels.clear(T)
+        region.clear(T)
+        T -= dT
+    _banner(end=True)
+
+    return Dataset(
+        {
+            "Temperature": ("Step", [each[0] for each in steps]),
+            "Solid_Fraction": ("Step", [each[1] for each in steps]),
+            "Liquid_Composition": (("Step", "Components"), _array([each[2] for each in steps], (0, len(components)))),
+            "Equilibrium_Composition": (
+                ("Step", "Phases", "Components"), _array([each[3] for each in steps], (0, 2, len(components)))
+            ),
+            "Interfacial_Composition": (
+                ("Step", "Components"), _array([each[4]["xc"] for each in steps], (0, len(components)))
+            ),
+            "Partial_Interfacial_Energy": (
+                ("Step", "Components"), _array([each[4]["sigmapartial"] for each in steps], (0, len(components)))
+            ),
+            "Interfacial_Energy": ("Step", [each[4]["sigma"] for each in steps]),
+        },
+        coords={"Step": np.arange(len(steps)), "Components": components, "Phases": list(phasenames)},
+    )
+
+
+def _phases(db, comps):
+    """
+    Names of the phases of the database whose every sublattice has a constituent among the components.
+    """
+    comps = set(comps) | {"VA"}
+    return [
+        name for name, phase in db.phases.items()
+        if all(set(getattr(c, "name", c) for c in subl) & comps for subl in phase.constituents)
+    ]
+
+
+def _stable(T, db, comps, phasenames, x0):
+    """
+    Names of the phases in the equilibrium of the given phases at the composition.
+    """
+    phases = CoherentGibbsEnergy(T, db, comps, phasenames, slim=True).phase(x0)
+    return set(str(each) for each in phases if str(each))
+
+
+def _array(values, empty):
+    """
+    The values as an array, with the given shape if there is no step.
+    """
+    return np.array(values, dtype=float) if values else np.zeros(empty)
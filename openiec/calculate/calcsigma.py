@@ -2,17 +2,14 @@
 """
 
 from openiec.model.sigmacoint import SigmaCoherentInterface
+from openiec.property.phaseregion import PhaseRegion
+from openiec.property.phasemodels import PhaseModels
+from openiec.property.commontangent import substitutional
 from openiec.property.coherentenergy import CoherentGibbsEnergy
 from openiec.model.sigmasolliq import SigmaPureMetal, SigmaSolidLiquidInterface
-from openiec.property.solliqenergy import SolutionGibbsEnergy, InterfacialGibbsEnergy
 from openiec.property.meltingenthalpy import MeltingEnthalpy
 from openiec.property.molarinfarea import MolarInterfacialArea
-from openiec.property.molarvolume import MolarVolume, InterficialMolarVolume
-from openiec.calculate.minimize import SearchEquilibrium, ComputeEquilibrium
-from openiec.utils.decorafunc import wraptem
-from pycalphad import equilibrium
-from pycalphad import Database, Model
-import pycalphad.variables as v
+from openiec.calculate.minimize import SearchEquilibrium, BranchAndBound, ComputeEquilibrium, ImplicitDerivatives, MemoizedObjective
 import numpy as np
 from xarray import Dataset
 
@@ -22,56 +19,571 @@ def SigmaPure(
 ):
     """Calculate the solid/liquid interfacial energy of the pure metal.
 
+    Temperatures and components may be given as arrays and lists, e.g. for temperature-dependent curves of sigma0.
+    The melting enthalpy is calculated once per component, and the interfacial energies
+    of all components and temperatures are evaluated at once.
+
+    Parameters
+    -----------
+    T: float or array
+        Given temperatures.
+    db : Database
+        Database containing the relevant parameters.
+    comp: str or list
+        Names of pure components.
+    phasenames : list
+        Names of phase model to build.    
+    meltingenthalpy: float or list
+        The standard molar enthalpies of melting of the pure components, calculated if not given.
+    purevm: float, array or list
+        The characteristic molar volume of pure component, a float or an array over temperatures,
+        and one of them per component if comp is a list.
+
+    Returns:   
+    -----------
+    Component：str or list of str
+        Given components.
+    Temperature: float or array
+        Given temperatures.
+    Melting_Enthalpy: float or array
+        The melting enthalpies of the pure components.
+    Interfacial_Energy: float or array
+        The interfacial energies of the pure components.
+
+    Return type: xarray Dataset, with the dimensions Component and Temperature for a list of components
+        and an array of temperatures respectively
+    """
+    single = comp is None or isinstance(comp, str)
+    components = [comp] if single else list(comp)
+    temperatures = np.atleast_1d(np.asarray(T, dtype=float))
+
+    if single or not isinstance(meltingenthalpy, (list, tuple, np.ndarray)):
+        meltingenthalpy = [meltingenthalpy] * len(components)
+    meltingenthalpy = list(meltingenthalpy)
+    for i, each in enumerate(components):
+        if not meltingenthalpy[i]:
+            meltingenthalpy[i] = MeltingEnthalpy(db, each, phasenames, debug)
+            print("Calculated melting enthalpy of %s: " % each, meltingenthalpy[i])
+
+    """Molar volumes with the shape (components, temperatures)"""
+    vms = np.array(
+        [np.broadcast_to(np.asarray(each, dtype=float), temperatures.shape) for each in ([purevm] if single else purevm)]
+    )
+
+    model = SigmaPureMetal(np.asarray(meltingenthalpy, dtype=float)[:, None], vms)
+    sigma = model.infenergy(temperatures[None, :])
+    for i, each in enumerate(components):
+        print("Calculated solid/liquid interfacial energy of %s: " %
+              each, sigma[i] if np.ndim(T) else sigma[i, 0], "\n")
+
+    res = Dataset(
+        {
+            "Melting_Enthalpy": ("Component", meltingenthalpy),
+            "Interfacial_Energy": (("Component", "Temperature"), sigma),
+        },
+        coords={"Component": components, "Temperature": temperatures},
+    )
+    if np.ndim(T) == 0:
+        res = res.isel(Temperature=0)
+    if single:
+        res = res.isel(Component=0)
+
+    return res
+
+
+class SigmaSolLiqModel(object):
+    """
+    Build the models of the solid/liquid interface at a given temperature once,
+    so that interfacial energies at many alloy compositions can be calculated with them.
+
     Parameters
     -----------
     T: float
         Given temperature.
     db : Database
         Database containing the relevant parameters.
-    comp: str
-        Name of pure component.
+    comps : list
+        Names of components to consider in the calculation.
     phasenames : list
         Names of phase model to build.    
-    meltingenthalpy: float
-        The standard molar enthalpy of melting of the pure component.
-    purevm: float
-        The characteristic molar volume of pure component.
+    purevms: list 
+        The molar volume of the components.
+    intervms: list
+        Redlich-Kister parameters of the excess molar volumes of the two phases.
+    meltingenthalpy: list
+        The stardard melting enthalpies of pure componnets.
+    phasemodels: PhaseModels
+        Models of phases shared with other interfaces, a new one if not given.
+    """
 
-    Returns:   
+    def __init__(
+        self, T, db, comps, phasenames, purevms, intervms=[], meltingenthalpy=[], debug=False, phasemodels=None
+    ):
+        self.T = T
+        self.db = db
+        self.comps = comps
+        self.phasenames = phasenames
+        self.components = [each for each in comps if each != "VA"]
+        self.meltingenthalpy = list(meltingenthalpy)
+        self.debug = debug
+        self.phasemodels = phasemodels or PhaseModels(db, comps)
+
+        self.vmis = self.phasemodels.interfacialvolume(phasenames, purevms, intervms)
+
+        """Two-phase equilibrium, solved on the common tangent when both phases are supported"""
+        self.region = PhaseRegion.shared(db, comps, phasenames)
+
+    def sigma0(self, vmis0):
+        """
+        Solid/liquid interfacial energies of pure components.
+        The melting enthalpies are calculated only once.
+
+        Parameters
+        ----------
+        vmis0: list
+            Partial molar volumes of components at the initial alloy composition.
+        """
+        if not self.meltingenthalpy:
+            self.meltingenthalpy = [
+                self.phasemodels.meltingenthalpy(each, self.phasenames, self.debug)
+                for each in self.components
+            ]
+        sigma0 = SigmaPureMetal(np.asarray(self.meltingenthalpy, dtype=float), np.asarray(vmis0, dtype=float))
+        return [float(each) for each in sigma0.infenergy(self.T)]
+
+    def tieline(self, x0, guess=None):
+        """
+        Two-phase equilibrium at the initial alloy composition.
+
+        Parameters
+        ----------
+        x0: list
+            Initial alloy composition.
+        guess: list
+            Two-phase equilibrium composition at a neighbouring condition, as the initial guess of the common tangent.
+
+        Returns
+        ----------
+        A dictionary with region, xeq and mueq, see PhaseRegion.check.
+        """
+        return self.region.check(x0, self.T, guess)
+
+    def interface(self, x0, omega=[], sigma0=[], xeq=[]):
+        """
+        The model of the solid/liquid interface at the initial alloy composition.
+        The arguments are the same as calculate.
+        """
+        vmis0 = self.vmis(x0, self.T)
+
+        """Calculation for the solid/liquid interfacial energies of pure components"""
+        if not omega:
+            omega = [MolarInterfacialArea(each) for each in vmis0]
+        if len(sigma0) == 0:
+            sigma0 = self.sigma0(vmis0)
+
+        """Two-phase equilibirium composition"""
+        if not xeq:
+            xeq = self.tieline(x0)["xeq"]
+            if xeq is None:
+                raise ValueError("%s lies outside the two-phase region of %s." % (x0, self.phasenames))
+
+        """Call the module of solid/liquid interfacial energy calculation"""
+        return SigmaSolidLiquidInterface(
+            self.T,
+            xeq[0],
+            xeq[1],
+            omega,
+            sigma0,
+        )
+
+    def calculate(
+        self, x0, omega=[], sigma0=[], xeq=[], limit=[0, 1.0], dx=0.01, xguess=None, derivatives=False, search="grid",
+        sigmatol=None, spreadtol=None
+    ):
+        """
+        Calculate the solid/liquid interfacial energy at the initial alloy composition.
+
+        Parameters
+        ----------
+        x0: list
+            Initial alloy composition.
+        omega: list
+            The molar interfacial areas of components.
+        sigma0: list
+            Interfacial energies of pure metal.
+        xeq: list
+            Two-phase equilibrium composition.
+        limit: list
+            The limit of composition for searching interfacial composition in equilibrium.
+        dx: float
+            The step of composition for searching interfacial composition in equilibrium.
+        xguess: list
+            Initial guess of the interfacial composition, e.g. the result of a neighbouring condition.
+            The grid search is skipped if it is given.
+        derivatives: bool
+            Add the derivatives of the interfacial energy with respect to temperature and x0, see derivatives.
+        search: str
+            "grid" for the grid search with the step dx, or "branchbound" for the global search of BranchAndBound,
+            which needs far fewer evaluations with many components and does not miss narrow minima.
+        sigmatol: float
+            Tolerance of the interfacial energy in J/m^2 for the local refinement, see ComputeEquilibrium.
+        spreadtol: float
+            Tolerance of the spread of the partial interfacial energies in J/m^2 for the local refinement.
+        """
+        x0 = list(x0)
+        model = self.interface(x0, omega, sigma0, xeq)
+
+        if search not in ("grid", "branchbound"):
+            raise ValueError("Unknown search %r, use 'grid' or 'branchbound'." % search)
+        lowerbound = model.lowerbound if search == "branchbound" else None
+        res = _interfacialequilibrium(
+            model.objective, len(x0), limit, dx, xguess, lowerbound, sigmatol, spreadtol, model.infenergy
+        )
+        x_c = res["x"]
+        sigma = model.infenergy(x_c)
+
+        record = _sigmarecord(x0, x_c, sigma, res)
+        if derivatives:
+            record.update(self.derivatives(x0, x_c, omega, sigma0, xeq))
+        return record
+
+    def derivatives(self, x0, x, omega=[], sigma0=[], xeq=[]):
+        """
+        Derivatives of the interfacial energy and the interfacial composition
+        with respect to temperature and the initial alloy composition,
+        from the implicit differentiation of the interfacial equilibrium at the converged interfacial composition x.
+        The changes of the two-phase equilibrium, the partial molar volumes, the molar interfacial areas
+        and the interfacial energies of pure components are included,
+        except for omega, sigma0 and xeq given as fixed values.
+        Both phases must be supported by CommonTangent.
+
+        Parameters
+        ----------
+        x0: list
+            Initial alloy composition.
+        x: list
+            Converged interfacial composition.
+        omega, sigma0, xeq: list
+            The same as calculate.
+        """
+        tangent = self.region.tangent
+        if tangent is None:
+            raise ValueError("Analytic derivatives require two phases supported by CommonTangent, not %s." % self.phasenames)
+        x0, x = list(x0), list(x)
+        k = len(x0) + 1
+        model = self.interface(x0, omega, sigma0, xeq)
+        J = model.jacobian(x)
+
+        dsdp = J["T"][:, None] * np.eye(k)[0]
+        if not xeq:
+            dxeq = tangent.derivatives(x0, self.T, [model.xS, model.xL])["x"]
+            dsdp += J["xS"][:, None] * dxeq[0] + J["xL"][:, None] * dxeq[1]
+
+        vmis0 = self.vmis(x0, self.T)
+        dvmis0 = self.vmis.jacobian(x0, self.T)
+        dvmis0 = np.hstack([dvmis0[:, -1:], dvmis0[:, :-1]])
+        if not omega:
+            dsdp += J["omega"][:, None] * (2.0 / 3.0) * (np.asarray(model.omega) / vmis0)[:, None] * dvmis0
+        if len(sigma0) == 0:
+            for i in range(len(vmis0)):
+                d = SigmaPureMetal(self.meltingenthalpy[i], vmis0[i]).derivatives(self.T)
+                dsdp[i] += d["purevm"] * dvmis0[i]
+                dsdp[i, 0] += d["T"]
+
+        return _derivativerecord(ImplicitDerivatives(J["x"], dsdp))
+
+
+class SigmaCoherentModel(object):
+    """
+    Build the models of the coherent interface at a given temperature once,
+    so that interfacial energies at many alloy compositions can be calculated with them.
+
+    Parameters
     -----------
-    Component：str
-        Given component.
-    Temperature: float
+    T: float
         Given temperature.
-    Melting_Enthalpy: float
-        The melting enthalpy of the pure component.
-    Interfacial_Energy: float
-        The interfacial energy of the pure component.
+    db : Database
+        Database containing the relevant parameters.
+    comps : list
+        Names of components to consider in the calculation.
+    phasenames : list
+        Names of phase model to build.    
+    purevms: list
+        The molar volumes of pure components.
+    intervms: list
+        Redlich-Kister parameters of the excess molar volumes of the two phases.
+    pdens: int
+        Number of points sampled per degree of freedom of each phase in the equilibrium calculations.
+    phasemodels: PhaseModels
+        Models of phases shared with other interfaces, a new one if not given.
+    """
 
-    Return type: xarray Dataset
+    def __init__(self, T, db, comps, phasenames, purevms, intervms=[], pdens=None, phasemodels=None):
+        self.T = T
+        self.db = db
+        self.comps = comps
+        self.pdens = pdens
+        self.phasenames = phasenames
+        self.components = [each for each in comps if each != "VA"]
+        self.phasemodels = phasemodels or PhaseModels(db, comps)
+
+        self.vmis = self.phasemodels.interfacialvolume(phasenames, purevms, intervms)
+
+        """Two-phase equilibrium, solved on the common tangent when both phases are supported"""
+        self.region = PhaseRegion.shared(db, comps, phasenames, pdens)
+
+        """Chemical potentials in two bulk phases"""
+        model_phase = [self.phasemodels.equilibrium(T, each, pdens) for each in phasenames]
+        self.alphafuncs, self.betafuncs = [each.chemicalpotential for each in model_phase]
+
+    def tieline(self, x0, guess=None):
+        """
+        Two-phase equilibrium at the initial alloy composition.
+
+        Parameters
+        ----------
+        x0: list
+            Initial alloy composition.
+        guess: list
+            Two-phase equilibrium composition at a neighbouring condition, as the initial guess of the common tangent.
+
+        Returns
+        ----------
+        A dictionary with region, xeq and mueq, see PhaseRegion.check.
+        """
+        return self.region.check(x0, self.T, guess)
+
+    def calculate(self, x0, mueq=None, limit=[0, 1.0], dx=0.01, xguess=None, derivatives=False, sigmatol=None, spreadtol=None):
+        """
+        Calculate the coherent interfacial energy at the initial alloy composition.
+
+        Parameters
+        ----------
+        x0: list
+            Initial alloy composition.
+        mueq: list
+            Chemical potentials in two-phase equilibrium.
+        limit: list
+            The limit of composition for searching interfacial composition in equilibrium.
+        dx: float
+            The step of composition for searching interfacial composition in equilibrium.
+        xguess: list
+            Initial guess of the interfacial composition, e.g. the result of a neighbouring condition.
+            The grid search is skipped if it is given.
+        derivatives: bool
+            Add the derivatives of the interfacial energy with respect to temperature and x0, see derivatives.
+        sigmatol: float
+            Tolerance of the interfacial energy in J/m^2 for the local refinement, see ComputeEquilibrium.
+        spreadtol: float
+            Tolerance of the spread of the partial interfacial energies in J/m^2 for the local refinement.
+        """
+        x0 = list(x0)
+        sigma_model = self.interface(x0, mueq)
+
+        res = _interfacialequilibrium(
+            sigma_model.objective, len(x0), limit, dx, xguess, None, sigmatol, spreadtol, sigma_model.infenergy
+        )
+        x_c = res["x"]
+        sigma = sigma_model.infenergy(x_c)
+
+        record = _sigmarecord(x0, x_c, sigma, res)
+        if derivatives:
+            record.update(self.derivatives(x0, x_c, mueq))
+        return record
+
+    def interface(self, x0, mueq=None):
+        """
+        The model of the coherent interface at the initial alloy composition.
+        The arguments are the same as calculate.
+        """
+        """Chemical potentials in two-phase equilibrium"""
+        if mueq is None:
+            mueq = self.tieline(x0)["mueq"]
+            if mueq is None:
+                raise ValueError("%s lies outside the two-phase region of %s." % (x0, self.phasenames))
+
+        return SigmaCoherentInterface(
+            self.alphafuncs, self.betafuncs, mueq, self.vmis, self.T
+        )
+
+    def derivatives(self, x0, x, mueq=None):
+        """
+        Derivatives of the interfacial energy and the interfacial composition
+        with respect to temperature and the initial alloy composition,
+        from the implicit differentiation of the interfacial equilibrium at the converged interfacial composition x.
+        The chemical potentials at the interface and their derivatives come from the symbolic Gibbs energies
+        of substitutional phases, and from the equilibrium of pycalphad used by the objective for phases
+        with several sublattices, see _equilibriumpotentials.
+        The changes of the two-phase equilibrium are included unless mueq is given as a fixed value.
+        Both phases must be supported by CommonTangent.
+
+        Parameters
+        ----------
+        x0: list
+            Initial alloy composition.
+        x: list
+            Converged interfacial composition.
+        mueq: list
+            The same as calculate.
+        """
+        tangent = self.region.tangent
+        if tangent is None:
+            raise ValueError("Analytic derivatives require two phases supported by CommonTangent, not %s." % self.phasenames)
+        x0, x = list(x0), list(x)
+        k = len(x0) + 1
+        alpha, beta = [
+            phase.chemicalpotential(x, self.T) if substitutional(self.db, each) else self._equilibriumpotentials(x, each)
+            for phase, each in zip(tangent.phases, self.phasenames)
+        ]
+        J = self.interface(x0, mueq).jacobian(x, alpha, beta)
+
+        dsdp = J["T"][:, None] * np.eye(k)[0]
+        if mueq is None:
+            dmueq = tangent.derivatives(x0, self.T, self.tieline(x0)["xeq"])["mu"]
+            dsdp += J["mueq"][:, None] * dmueq
+
+        return _derivativerecord(ImplicitDerivatives(J["x"], dsdp))
+
+    def _equilibriumpotentials(self, x, phasename, dx=1.0e-5, dT=0.5):
+        """
+        Chemical potentials of components in one phase at the interfacial composition x and their derivatives,
+        by central differences of the equilibrium of pycalphad, in the form of PhaseGibbsEnergy.chemicalpotential.
+        The equilibrium of an ordered phase may split into ordered and disordered composition sets,
+        where the chemical potentials follow their common tangent, unlike those of OrderedGibbsEnergy.
+        """
+        mu = lambda model, xx: np.ravel(model.chemicalpotential(list(xx))).astype(float)
+        x = np.asarray(x, dtype=float)
+        model = self.phasemodels.equilibrium(self.T, phasename, self.pdens)
+        dmudx = np.array([(mu(model, x + dx * e) - mu(model, x - dx * e)) / (2.0 * dx) for e in np.eye(len(x))]).T
+        hot, cold = [
+            CoherentGibbsEnergy(self.T + each, self.db, self.comps, phasename, self.pdens, slim=True) for each in (dT, -dT)
+        ]
+        return {"mu": mu(model, x), "x": dmudx, "T": (mu(hot, x) - mu(cold, x)) / (2.0 * dT)}
+
+
+def _interfacialequilibrium(
+    objective, cum, limit, dx, xguess=None, lowerbound=None, sigmatol=None, spreadtol=None, partialfunction=None
+):
+    """
+    Search the interfacial equilibrium composition, starting from a given guess,
+    the global search of BranchAndBound if the lower bounds of the objective are given, or a grid search.
+    The objective is cached for the whole search, and the numbers of iterations of the local refinement
+    and of evaluations of the objective are returned with the composition.
+    """
+    objective = MemoizedObjective(objective)
+    tolerances = {"sigmatol": sigmatol, "spreadtol": spreadtol, "partialfunction": partialfunction, "full_output": True}
+    if xguess is not None:
+        res = ComputeEquilibrium(objective, list(xguess), **tolerances)
+    elif lowerbound is None:
+        xguess = SearchEquilibrium(objective, [limit] * cum, [dx] * cum)["x"]
+        res = ComputeEquilibrium(objective, list(xguess), **tolerances)
+    else:
+        search = BranchAndBound(objective, lowerbound, [limit] * cum)
+        res = ComputeEquilibrium(objective, list(search["x"]), **tolerances)
+        """The local refinement must not leave the global minimum"""
+        if res["fun"] > search["vmin"]:
+            res["x"] = np.array(search["x"])
+    return {"x": res["x"], "nit": res["nit"], "nfev": objective.nfev}
+
+
+def _sigmarecord(x0, x_c, sigma, res):
+    """
+    Collect the result of an interfacial energy calculation.
+    """
+    return {
+        "x0": [1.0 - sum(x0)] + list(x0),
+        "x": list(x_c),
+        "xc": [1.0 - sum(list(x_c))] + list(x_c),
+        "sigmapartial": list(np.array(sigma).flatten()),
+        "sigma": np.average([each for each in sigma]),
+        "nit": res["nit"],
+        "nfev": res["nfev"],
+    }
+
+
+def _outsiderecord(x0, components):
+    """
+    The result of an initial alloy composition outside the two-phase region.
+    """
+    nan = [float("nan")] * len(components)
+    return {
+        "x0": [1.0 - sum(x0)] + list(x0),
+        "x": nan[1:],
+        "xc": nan,
+        "sigmapartial": nan,
+        "sigma": float("nan"),
+        "nit": 0,
+        "nfev": 0,
+    }
+
+
+def _derivativerecord(res):
     """
-    if not meltingenthalpy:
-        meltingenthalpy = MeltingEnthalpy(db, comp, phasenames, debug)
-        print("Calculated melting enthalpy of %s: " % comp, meltingenthalpy)
-    model = SigmaPureMetal(meltingenthalpy, purevm)
-    sigma = model.infenergy(T)
-    print("Calculated solid/liquid interfacial energy of %s: " %
-          comp, sigma, "\n")
+    Collect the derivatives with respect to temperature and the initial alloy composition.
+    """
+    dxc = np.vstack([-res["x"].sum(axis=0), res["x"]])
+    return {
+        "dsigmadT": float(res["sigma"][0]),
+        "dsigmadx0": [float(each) for each in res["sigma"][1:]],
+        "dxcdT": [float(each) for each in dxc[:, 0]],
+        "dxcdx0": dxc[:, 1:].tolist(),
+    }
 
-    res = Dataset(
+
+def _sigmadataset(components, T, record, region=True):
+    """
+    Build the Dataset of an interfacial energy calculation.
+    """
+    return Dataset(
         {
-            "Component": comp,
+            "Components": components,
             "Temperature": T,
-            "Melting_Enthalpy": meltingenthalpy,
-            "Interfacial_Energy": sigma,
+            "In_Two_Phase_Region": region,
+            "Initial_Alloy_Composition": ("Components", record["x0"]),
+            "Interfacial_Composition": ("Components", record["xc"]),
+            "Partial_Interfacial_Energy": ("Components", record["sigmapartial"]),
+            "Interfacial_Energy": record["sigma"],
+            "Iterations": record["nit"],
+            "Evaluations": record["nfev"],
+            **_derivativevars(record)
         }
     )
 
-    return res
+
+def _derivativevars(record):
+    """
+    Dataset variables of the derivatives, if they are calculated.
+    """
+    if "dsigmadT" not in record:
+        return {}
+    return {
+        "Interfacial_Energy_Temperature_Derivative": record["dsigmadT"],
+        "Interfacial_Energy_Composition_Derivative": ("Solutes", record["dsigmadx0"]),
+        "Interfacial_Composition_Temperature_Derivative": ("Components", record["dxcdT"]),
+        "Interfacial_Composition_Composition_Derivative": (("Components", "Solutes"), record["dxcdx0"]),
+    }
+
+
+def _outside(x0, T, phasenames):
+    print(
+        "[Error] The initial alloy composition %s lies outside the two-phase region of %s at %s K, no interfacial energy is calculated."
+        % (list(x0), " + ".join(phasenames), T)
+    )
+
+
+def _banner(end=False):
+    if end:
+        print(
+            "******************************************************************************\n\n"
+        )
+    else:
+        print(
+            "\n******************************************************************************\nOpenIEC is looking for interfacial equilibirium coposition.\nFor more information visit https://github.com/openiec/openiec."
+        )
 
 
 def SigmaSolLiq(
-    T, x0, db, comps, phasenames, purevms, intervms=[], omega=[], meltingenthalpy=[], sigma0=[], xeq=[], limit=[0, 1.0], dx=0.01, debug=False
+    T, x0, db, comps, phasenames, purevms, intervms=[], omega=[], meltingenthalpy=[], sigma0=[], xeq=[], limit=[0, 1.0], dx=0.01, debug=False, checkregion=True, derivatives=False, search="grid", sigmatol=None, spreadtol=None
 ):
     """
     Calculate the solid/liquid interfacial energy in alloys.
@@ -95,6 +607,10 @@ def SigmaSolLiq(
             phasenames = ["FCC_A1", "LIQUID"]
             purevms = [["1.0*T", "2.0*T"], ["3.0*T", "4.0*T"]]
             where "1.0*T" and "2.0*T" are molar volumes of components Ni and Al in FCC_A1 phase, while "3.0*T" and "4.0*T" are molar volumes of components Ni and Al in LIQUID phase.
+    intervms: list
+        Redlich-Kister parameters of the excess molar volumes of the two phases.
+        example:
+            intervms = [{("NI", "AL"): ["-1.0*10.0**(-6.0)"]}, {}]
     omega: list
         The molar interfacial areas of components.
     meltingenthalpy: list
@@ -107,6 +623,20 @@ def SigmaSolLiq(
         The limit of composition for searching interfacial composition in equilibrium.
     dx: float
         The step of composition for searching interfacial composition in equilibrium.
+    checkregion: bool
+        Check whether the initial alloy composition lies in the two-phase region before building the interface models.
+        Outside the region, no interfacial equilibrium is searched and NaN is returned.
+    derivatives: bool
+        Calculate the derivatives of the interfacial energy and the interfacial composition
+        with respect to temperature and the initial alloy composition, by implicit differentiation
+        of the interfacial equilibrium. Both phases must be supported by CommonTangent.
+    search: str
+        "grid" for the grid search of the interfacial composition with the step dx,
+        or "branchbound" for the global search by branch and bound, see BranchAndBound.
+    sigmatol: float
+        Tolerance of the interfacial energy in J/m^2, see ComputeEquilibrium.
+    spreadtol: float
+        Tolerance of the spread of the partial interfacial energies in J/m^2, see ComputeEquilibrium.
 
     Returns:   
     -----------
@@ -114,6 +644,8 @@ def SigmaSolLiq(
         Given components.
     Temperature: float
         Given temperature.
+    In_Two_Phase_Region: bool
+        Whether the initial alloy composition lies in the two-phase region.
     Initial_Alloy_Composition: list
         Given initial alloy composition.
     Interfacial_Composition: list
@@ -122,101 +654,44 @@ def SigmaSolLiq(
         Partial interfacial energies of components.
     Interfacial_Energy: float    
         Requested interfacial energies.
+    Iterations: int
+        Number of iterations of the local refinement of the interfacial composition.
+    Evaluations: int
+        Number of evaluations of the objective, without the values taken from the cache.
+    Interfacial_Energy_Temperature_Derivative: float
+        dσ/dT, only if derivatives is True.
+    Interfacial_Energy_Composition_Derivative: list
+        dσ/dx0 of the independent components of x0, only if derivatives is True.
+    Interfacial_Composition_Temperature_Derivative: list
+        Derivatives of the interfacial composition with respect to temperature, only if derivatives is True.
+    Interfacial_Composition_Composition_Derivative: list
+        Derivatives of the interfacial composition with respect to x0, only if derivatives is True.
 
     Return type: xarray Dataset
     """
-
-    phasevm = [MolarVolume(db, phasenames[i], comps, purevms[i])
-               for i in range(2)]
-    _vmis = InterficialMolarVolume(*phasevm)
-
-    """Decorate the _vmis to release the constains on temperature"""
-    vmis = [each.decfunc() for each in [wraptem(T, f) for f in _vmis]]
-
-    """Calculation for the solid/liquid interfacial energies of pure components"""
-    if not omega:
-        omega = [
-            MolarInterfacialArea(vmis[i](x0))
-            for i in range(len(comps))
-            if comps[i] != "VA"
-        ]
-
-    if len(sigma0)==0 and len(meltingenthalpy)==0:
-        sigma0 = [
-            float(
-                SigmaPure(
-                    T, vmis[i](x0), db, comps[i], phasenames, debug=debug
-                ).Interfacial_Energy.values
-            )
-            for i in range(len(comps))
-            if comps[i] != "VA"
-        ]
-
-    if len(sigma0)==0 and len(meltingenthalpy)!=0:
-        sigma0 = [
-            float(
-                SigmaPure(
-                    T, vmis[i](
-                        x0), db, comps[i], phasenames, meltingenthalpy[i], debug=debug
-                ).Interfacial_Energy.values
-            )
-            for i in range(len(comps))
-            if comps[i] != "VA"
-        ]
-
-    """Two-phase equilibirium composition"""
-    if not xeq:
-        _modeleq = CoherentGibbsEnergy(T, db, comps, phasenames)
-        xeq = _modeleq.molefraction(x0)
-
-    """Partial excess Gibbs energy in the interface """
-    _modelinterface = InterfacialGibbsEnergy(T, db, comps, phasenames)
-    interfacialpexgm = _modelinterface.lam_pexgm
-
-    """Partial excess Gibbs energies in two bulk phases """
-    _modelphase = [
-        SolutionGibbsEnergy(T, db, comps, phasenames[i]) for i in range(len(phasenames))
-    ]
-    phasepexgm = [each.lam_pexgm for each in _modelphase]
-
-    """Call the module of solid/liquid interfacial energy calculation"""
-    Model = SigmaSolidLiquidInterface(
-        T, xeq[0], xeq[1], omega, sigma0, interfacialpexgm, phasepexgm[0], phasepexgm[1]
-    )
-
     components = [each for each in comps if each != "VA"]
-    cum = int(len(components) - 1)
-    print(
-        "\n******************************************************************************\nOpenIEC is looking for interfacial equilibirium coposition.\nFor more information visit https://github.com/openiec/openiec."
-    )
-    x_s = SearchEquilibrium(Model.objective, [limit] * cum, [dx] * cum)
-    x_c = ComputeEquilibrium(Model.objective, x_s["x"])
-    print(
-        "******************************************************************************\n\n"
+    if checkregion and not xeq:
+        res = PhaseRegion.shared(db, comps, phasenames).check(x0, T)
+        if not res["region"]:
+            _outside(x0, T, phasenames)
+            return _sigmadataset(components, T, _outsiderecord(x0, components), False)
+
+    model = SigmaSolLiqModel(
+        T, db, comps, phasenames, purevms, intervms, meltingenthalpy, debug
     )
-    sigma = Model.infenergy(x_c)
-
-    xx0 = [1.0 - sum(x0)] + x0
-    xx_c = [1.0 - sum(list(x_c))] + list(x_c)
-    sigmapartial = list(np.array(sigma).flatten())
-    sigmaavg = np.average([each for each in sigma])
 
-    res = Dataset(
-        {
-            "Components": components,
-            "Temperature": T,
-            "Initial_Alloy_Composition": ("Components", xx0),
-            "Interfacial_Composition": ("Components", xx_c),
-            "Partial_Interfacial_Energy": ("Components", sigmapartial),
-            "Interfacial_Energy": sigmaavg,
-        }
+    _banner()
+    record = model.calculate(
+        x0, omega, sigma0, xeq, limit, dx, derivatives=derivatives, search=search, sigmatol=sigmatol, spreadtol=spreadtol
     )
+    _banner(end=True)
 
-    return res
+    return _sigmadataset(components, T, record)
 
 
 def SigmaCoherent(
-    T, x0, db, comps, phasenames, purevms, intervms=[], limit=[0, 1.0], dx=0.01
+    T, x0, db, comps, phasenames, purevms, intervms=[], limit=[0, 1.0], dx=0.01, pdens=None, checkregion=True, derivatives=False,
+    sigmatol=None, spreadtol=None
 ):
     """
     Calculate the coherent interfacial energy in alloys.
@@ -237,8 +712,23 @@ def SigmaCoherent(
         The limit of composition for searching interfacial composition in equilibrium.
     purevms: list
         The molar volumes of pure components.
+    intervms: list
+        Redlich-Kister parameters of the excess molar volumes of the two phases.
     dx: float
         The step of composition for searching interfacial composition in equilibrium.
+    pdens: int
+        Number of points sampled per degree of freedom of each phase in the equilibrium calculations.
+    checkregion: bool
+        Check whether the initial alloy composition lies in the two-phase region before building the interface models.
+        Outside the region, no interfacial equilibrium is searched and NaN is returned.
+    derivatives: bool
+        Calculate the derivatives of the interfacial energy and the interfacial composition
+        with respect to temperature and the initial alloy composition, by implicit differentiation
+        of the interfacial equilibrium. Both phases must be supported by CommonTangent.
+    sigmatol: float
+        Tolerance of the interfacial energy in J/m^2, see ComputeEquilibrium.
+    spreadtol: float
+        Tolerance of the spread of the partial interfacial energies in J/m^2, see ComputeEquilibrium.
 
     Returns:   
     -----------
@@ -246,6 +736,8 @@ def SigmaCoherent(
         Given components.
     Temperature: float
         Given temperature.
+    In_Two_Phase_Region: bool
+        Whether the initial alloy composition lies in the two-phase region.
     Initial_Alloy_Composition: list
         Given initial alloy composition.
     Interfacial_Composition: list
@@ -254,55 +746,32 @@ def SigmaCoherent(
         Partial interfacial energies of components.
     Interfacial_Energy: float    
         Requested interfacial energies.
+    Iterations: int
+        Number of iterations of the local refinement of the interfacial composition.
+    Evaluations: int
+        Number of evaluations of the objective, without the values taken from the cache.
+    Interfacial_Energy_Temperature_Derivative: float
+        dσ/dT, only if derivatives is True.
+    Interfacial_Energy_Composition_Derivative: list
+        dσ/dx0 of the independent components of x0, only if derivatives is True.
+    Interfacial_Composition_Temperature_Derivative: list
+        Derivatives of the interfacial composition with respect to temperature, only if derivatives is True.
+    Interfacial_Composition_Composition_Derivative: list
+        Derivatives of the interfacial composition with respect to x0, only if derivatives is True.
 
     Return type: xarray Dataset
     """
-    phasevm = [MolarVolume(db, phasenames[i], comps, purevms[i])
-               for i in range(2)]
-    _vmis = InterficialMolarVolume(*phasevm)
-
-    """decorate the _vmis to release the constains on temperature"""
-    vmis = [each.decfunc() for each in [wraptem(T, f) for f in _vmis]]
-
-    model = CoherentGibbsEnergy(T, db, comps, phasenames)
-
-    """Chemical potentials in two-phase equilibrium"""
-    mueq = model.chemicalpotential(x0)
-
-    """Chemical potentials in two bulk phases"""
-    model_phase = [
-        CoherentGibbsEnergy(T, db, comps, phasenames[i]) for i in range(len(phasenames))
-    ]
-    alphafuncs, betafuncs = [each.chemicalpotential for each in model_phase]
-
-    sigma_model = SigmaCoherentInterface(alphafuncs, betafuncs, mueq, vmis)
-
     components = [each for each in comps if each != "VA"]
-    cum = int(len(components) - 1)
-    print(
-        "\n******************************************************************************\nOpenIEC is looking for interfacial equilibirium coposition.\nFor more information visit https://github.com/openiec/openiec."
-    )
-    x_s = SearchEquilibrium(sigma_model.objective, [limit] * cum, [dx] * cum)
-    x_c = ComputeEquilibrium(sigma_model.objective, x_s["x"])
-    print(
-        "******************************************************************************\n\n"
-    )
-    sigma = sigma_model.infenergy(x_c)
+    if checkregion:
+        res = PhaseRegion.shared(db, comps, phasenames, pdens).check(x0, T)
+        if not res["region"]:
+            _outside(x0, T, phasenames)
+            return _sigmadataset(components, T, _outsiderecord(x0, components), False)
 
-    xx0 = [1.0 - sum(list(x0))] + list(x0)
-    xx_c = [1.0 - sum(list(x_c))] + list(x_c)
-    sigmapartial = list(np.array(sigma).flatten())
-    sigmaavg = np.average([each for each in sigma])
+    model = SigmaCoherentModel(T, db, comps, phasenames, purevms, intervms, pdens)
 
-    res = Dataset(
-        {
-            "Components": components,
-            "Temperature": T,
-            "Initial_Alloy_Composition": ("Components", xx0),
-            "Interfacial_Composition": ("Components", xx_c),
-            "Partial_Interfacial_Energy": ("Components", sigmapartial),
-            "Interfacial_Energy": sigmaavg,
-        }
-    )
+    _banner()
+    record = model.calculate(x0, limit=limit, dx=dx, derivatives=derivatives, sigmatol=sigmatol, spreadtol=spreadtol)
+    _banner(end=True)
 
-    return res
+    return _sigmadataset(components, T, record)
@@ -0,0 +1,211 @@
+"""Calibrate the parameters of the solid/liquid interfacial energy model to measured interfacial energies.
+"""
+
+from openiec.calculate.minimize import SearchEquilibria, ComputeEquilibria, ComputeEquilibrium
+from openiec.model.sigmasolliq import SigmaPureMetal
+from openiec.property.meltingenthalpy import MeltingEnthalpy
+from openiec.property.molarinfarea import MolarInterfacialArea
+from openiec.property.molarvolume import MolarVolume, CompiledInterficialMolarVolume
+from openiec.property.phaseregion import PhaseRegion
+from scipy.optimize import least_squares
+import numpy as np
+from sympy import Symbol
+from xarray import Dataset
+
+
+class SigmaSolLiqFit(object):
+    """
+    Fit the packing ratio fi of the interface and free parameters of the molar volumes
+    to measured solid/liquid interfacial energies.
+    The packing ratios fb and fi enter the molar interfacial areas only through the factor (3*fb/4)**(2/3)/fi,
+    see MolarInterfacialArea, so they cannot be fitted together. Only fi is fitted by default,
+    and fb is fitted instead if it is given in params.
+
+    Everything independent of the fitted parameters is prepared once: the tie-lines of all data points,
+    the melting enthalpies and the partial molar volumes with the free parameters kept symbolic.
+    The interface takes the average of the solid and the liquid, so the partial excess Gibbs energies
+    cancel in the partial interfacial energies and are not evaluated.
+    Every evaluation of the residuals then solves the interfacial equilibria of all data points in one batched call,
+    starting from the interfacial compositions of the previous evaluation.
+
+    Parameters
+    -----------
+    db : Database
+        Database containing the relevant parameters.
+    comps : list
+        Names of components to consider in the calculation.
+    phasenames : list
+        Names of phase model to build.
+    purevms: list
+        The molar volume of the components. Free symbols other than T are fitted parameters.
+        example:
+            purevms = [["a*(1.0 + 1.0e-5*T)", "10.0e-6"], ["b*(1.0 + 1.0e-5*T)", "11.0e-6"]]
+            params = {"fi": 0.906, "a": 6.7e-6, "b": 7.0e-6}
+    data: list
+        Measured interfacial energies as (T, x0, sigma), or (T, x0, sigma, uncertainty).
+        The residuals are divided by the uncertainty, which is sigma itself by default.
+    intervms: list
+        Redlich-Kister parameters of the excess molar volumes of the two phases, which may contain free symbols too.
+    meltingenthalpy: list
+        The stardard melting enthalpies of pure componnets.
+    params: dict
+        Initial values of the fitted parameters. fb and fi are fixed to the defaults of MolarInterfacialArea if absent.
+    bounds: dict
+        Lower and upper bounds of fitted parameters, e.g. {"fi": (0.5, 1.0)}.
+    limit: list
+        The limit of composition for searching interfacial composition in equilibrium.
+    dx: float
+        The step of composition for searching interfacial composition in equilibrium.
+    """
+
+    def __init__(
+        self, db, comps, phasenames, purevms, data, intervms=[], meltingenthalpy=[], params={"fi": 0.906}, bounds={}, limit=[0, 1.0], dx=0.01
+    ):
+        self.components = [each for each in comps if each != "VA"]
+        if "fb" in params and "fi" in params:
+            print("[Warning] fb and fi enter the molar interfacial areas only through one factor, fit only one of them.")
+        self.names = list(params)
+        self.initial = np.array([params[each] for each in self.names], dtype=float)
+        self.bounds = (
+            [bounds.get(each, (-np.inf, np.inf))[0] for each in self.names],
+            [bounds.get(each, (-np.inf, np.inf))[1] for each in self.names],
+        )
+        self.limit, self.dx = limit, dx
+
+        """Partial molar volumes with the free parameters as runtime arguments"""
+        self.vmnames = [each for each in self.names if each not in ("fb", "fi")]
+        phasevm = [
+            MolarVolume(db, phasenames[i], comps, purevms[i], intervms[i] if intervms else [])
+            for i in range(2)
+        ]
+        self.vmis = CompiledInterficialMolarVolume(
+            *phasevm, params=[Symbol(each) for each in self.vmnames]
+        )
+
+        self.T = np.array([each[0] for each in data], dtype=float)
+        self.x0 = np.array([list(each[1]) for each in data], dtype=float)
+        self.measured = np.array([each[2] for each in data], dtype=float)
+        self.uncertainty = np.array(
+            [each[3] if len(each) > 3 else each[2] for each in data], dtype=float
+        )
+
+        if not meltingenthalpy:
+            meltingenthalpy = [MeltingEnthalpy(db, each, phasenames) for each in self.components]
+        self.meltingenthalpy = np.array(meltingenthalpy, dtype=float)
+
+        """Tie-lines of all data points"""
+        region = PhaseRegion.shared(db, comps, phasenames)
+        xeq = []
+        for T, x0 in zip(self.T, self.x0):
+            res = region.check(list(x0), T)
+            if not res["region"]:
+                raise ValueError(
+                    "The data point %s at %s K lies outside the two-phase region of %s." % (list(x0), T, phasenames)
+                )
+            xeq.append(res["xeq"])
+        xeq = np.array(xeq, dtype=float)
+        self.xS, self.xL = xeq[:, 0], xeq[:, 1]
+
+        self.x = None
+        self.nfev = 0
+
+    def partials(self, theta):
+        """
+        The function of calculating partial interfacial energies of components of all data points
+        for the given values of the fitted parameters, see ComputeEquilibria.
+        """
+        p = dict(zip(self.names, theta))
+        vmis0 = self.vmis(self.x0, self.T, *[p[each] for each in self.vmnames]).T
+        omega = MolarInterfacialArea(vmis0, p.get("fb", 0.65), p.get("fi", 0.906))
+        sigma0 = SigmaPureMetal(self.meltingenthalpy, vmis0).infenergy(self.T[:, None])
+        R = 8.31451
+
+        def func(x, index=slice(None)):
+            T = self.T[index]
+            xx = np.concatenate([1.0 - x.sum(axis=-1, keepdims=True), x], axis=-1)
+            return (
+                sigma0[index]
+                + R * T[:, None] * np.log(xx / np.sqrt(self.xS[index] * self.xL[index])) / omega[index]
+            )
+
+        return func
+
+    def sigma(self, theta):
+        """
+        Interfacial energies and interfacial compositions of all data points for the given values of the fitted parameters.
+        Data points not converging by the batched Newton method are solved by Nelder-Mead one by one.
+        """
+        func = self.partials(theta)
+        n = len(self.T)
+        if self.x is None:
+            cum = self.x0.shape[1]
+            self.x = SearchEquilibria(func, n, [self.limit] * cum, [self.dx] * cum)
+
+        x, converged = ComputeEquilibria(func, self.x)
+        for i in np.nonzero(~converged)[0]:
+            objective = lambda xi: _objective(func(np.array([xi]), [i])[0])
+            x[i] = ComputeEquilibrium(objective, list(self.x[i]))
+        self.x = x
+        self.nfev += 1
+        return func(x).mean(axis=-1), x
+
+    def residual(self, theta):
+        """
+        Residuals between calculated and measured interfacial energies, divided by the uncertainties.
+        """
+        sigma, _ = self.sigma(theta)
+        res = (sigma - self.measured) / self.uncertainty
+        return np.where(np.isfinite(res), res, 1.0e3)
+
+    def fit(self, **kwargs):
+        """
+        Fit the parameters by scipy.optimize.least_squares. Keyword arguments are passed on to least_squares.
+
+        Returns:
+        -----------
+        Parameter: list of str
+            Names of fitted parameters.
+        Initial_Value, Fitted_Value: list
+            Initial and fitted values of the parameters.
+        Temperature, Initial_Alloy_Composition, Measured_Interfacial_Energy: list
+            The data points.
+        Interfacial_Composition, Interfacial_Energy: list
+            Interfacial compositions and interfacial energies calculated with the fitted parameters.
+        Residual: list
+            Residuals divided by the uncertainties.
+        Cost: float
+            Half of the sum of squared residuals.
+        Function_Evaluations: int
+            Number of evaluations of the residuals.
+
+        Return type: xarray Dataset
+        """
+        kwargs.setdefault("x_scale", "jac")
+        kwargs.setdefault("diff_step", 1.0e-6)
+        res = least_squares(self.residual, self.initial, bounds=self.bounds, **kwargs)
+
+        sigma, x = self.sigma(res.x)
+        xc = np.concatenate([1.0 - x.sum(axis=-1, keepdims=True), x], axis=-1)
+        x0 = np.concatenate([1.0 - self.x0.sum(axis=-1, keepdims=True), self.x0], axis=-1)
+        return Dataset(
+            {
+                "Initial_Value": ("Parameter", self.initial),
+                "Fitted_Value": ("Parameter", res.x),
+                "Temperature": ("Point", self.T),
+                "Initial_Alloy_Composition": (("Point", "Components"), x0),
+                "Measured_Interfacial_Energy": ("Point", self.measured),
+                "Interfacial_Composition": (("Point", "Components"), xc),
+                "Interfacial_Energy": ("Point", sigma),
+                "Residual": ("Point", res.fun),
+                "Cost": res.cost,
+                "Function_Evaluations": self.nfev,
+            },
+            coords={"Parameter": self.names, "Components": self.components},
+        )
+
+
+def _objective(s):
+    """
+    The sum of the absolute differences between the partial interfacial energies, as in SigmaSolidLiquidInterface.
+    """
+    return sum(abs(s[i] - s[j]) for i in range(len(s) - 1) for j in range(i + 1, len(s)))
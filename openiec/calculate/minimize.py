@@ -41,10 +41,134 @@ def SearchEquilibrium(objectfunction, limit, dx):
     return {"index": index, "x": xs[index], "vmin": vs[index]}
 
 
-def ComputeEquilibrium(objectfunction, x0, method="Nelder-Mead", tol=1e-10):
+def BranchAndBound(objectfunction, lowerbound, limit, ftol=1e-4, xtol=1e-9, maxboxes=100000):
+    """
+    Search the global minimum of the objective by branch and bound over the composition simplex.
+    The box of the limits is bisected repeatedly, and a box is discarded when the lower bound of the objective over it
+    is no better than the best value found so far by more than ftol. The boxes of a generation are bounded in one call.
+    As the objective is zero at the interfacial equilibrium, the search ends as soon as a composition with an objective
+    below ftol is found, and otherwise once every box is discarded.
+    Boxes are bisected along the coordinate, or the dependent first component, with the largest relative width,
+    which resolves the logarithmic terms near the edges of the simplex first.
+
+    Parameters
+    -----------
+    objectfunction: function
+        The function to minimize, of one interfacial composition.
+    lowerbound: function
+        The lower bounds of the objective over boxes, of the lower and upper corners with the shape (nboxes, ncomps - 1),
+        e.g. SigmaSolidLiquidInterface.lowerbound.
+    limit: list
+        The composition range of every independent component, see SearchEquilibrium.
+    ftol: float
+        Tolerance of the global minimum.
+    xtol: float
+        Boxes narrower than xtol are not bisected further.
+    maxboxes: int
+        Maximum number of boxes kept at once, the boxes with the largest lower bounds are dropped beyond it.
+
+    Returns
+    -----------
+    A dictionary with
+    x: the composition with the smallest objective.
+    vmin: the smallest objective.
+    lbound: a lower bound of the global minimum, vmin - ftol unless boxes were left unresolved at xtol or maxboxes.
+    nfev: number of evaluations of the objective.
+    """
+    tiny = 1e-300
+    L = np.array([[each[0] for each in limit]], dtype=float)
+    H = np.array([[each[1] for each in limit]], dtype=float)
+    best, vbest = list(0.5 * (L[0] + H[0])), np.inf
+    unresolved, nfev = np.inf, 0
+
+    while len(L):
+        inside = L.sum(axis=1) < 1.0
+        L, H = L[inside], H[inside]
+        if not len(L):
+            break
+        W = H - L
+
+        """A point of every box inside the simplex, its center if the center is inside"""
+        t = np.minimum(0.5, (1.0 - L.sum(axis=1)) / (2.0 * np.maximum(W.sum(axis=1), tiny)))
+        P = L + t[:, None] * W
+        vs = np.array([objectfunction(list(p)) for p in P], dtype=float)
+        nfev += len(P)
+        vs = np.where(np.isfinite(vs), vs, np.inf)
+        index = np.argmin(vs)
+        if vs[index] < vbest:
+            best, vbest = list(P[index]), vs[index]
+
+        lb = np.asarray(lowerbound(L, H), dtype=float)
+        keep = lb < vbest - ftol
+        L, H, W, lb = L[keep], H[keep], W[keep], lb[keep]
+        small = W.max(axis=1, initial=0.0) < xtol
+        if small.any():
+            unresolved = min(unresolved, lb[small].min())
+            L, H, W, lb = L[~small], H[~small], W[~small], lb[~small]
+        if len(L) > maxboxes:
+            order = np.argsort(lb)
+            unresolved = min(unresolved, lb[order[maxboxes:]].min())
+            L, H, W = L[order[:maxboxes]], H[order[:maxboxes]], W[order[:maxboxes]]
+        if not len(L):
+            break
+
+        """Bisect every box along its relatively widest coordinate"""
+        r = W / np.maximum(H, tiny)
+        r0 = W.sum(axis=1) / np.maximum(1.0 - L.sum(axis=1), tiny)
+        k = np.where(r0 > r.max(axis=1), np.argmax(W, axis=1), np.argmax(r, axis=1))
+        rows = np.arange(len(L))
+        mid = 0.5 * (L[rows, k] + H[rows, k])
+        L2, H1 = L.copy(), H.copy()
+        L2[rows, k] = mid
+        H1[rows, k] = mid
+        L, H = np.vstack([L, L2]), np.vstack([H1, H])
+
+    if unresolved < vbest - ftol:
+        print(
+            "[Warning] The global search left boxes unresolved, the global minimum is only bounded by %s." % unresolved
+        )
+    return {"x": best, "vmin": vbest, "lbound": min(vbest - ftol, unresolved), "nfev": nfev}
+
+
+class MemoizedObjective(object):
+    """
+    Cache the values of an objective by the exact composition, so that points visited again,
+    e.g. by the simplex of Nelder-Mead or by the local refinement of a searched point, are not evaluated again.
+
+    Parameters
+    -----------
+    objectfunction: function
+        The function to cache, of one interfacial composition.
+    maxsize: int
+        Maximum number of cached values.
+    """
+
+    def __init__(self, objectfunction, maxsize=100000):
+        self.objectfunction = objectfunction
+        self.maxsize = maxsize
+        self.cache = {}
+        self.nfev = 0
+        self.ncalls = 0
+
+    def __call__(self, x):
+        key = np.asarray(x, dtype=float).tobytes()
+        self.ncalls += 1
+        if key not in self.cache:
+            if len(self.cache) >= self.maxsize:
+                self.cache = {}
+            self.cache[key] = self.objectfunction(list(np.asarray(x, dtype=float)))
+            self.nfev += 1
+        return self.cache[key]
+
+
+def ComputeEquilibrium(
+    objectfunction, x0, method="Nelder-Mead", tol=1e-10, sigmatol=None, spreadtol=None, partialfunction=None, full_output=False
+):
     """
     Optimize searched initial values of the nonlinear optimization.
     This program uses the scipy.optimize package. For more imformation visit https://docs.scipy.org/doc/scipy/reference/tutorial/optimize.html.
+    The objective is cached, see MemoizedObjective. If sigmatol or spreadtol is given, Nelder-Mead ends
+    as soon as the partial interfacial energies meet them, or otherwise at the tolerance tol.
 
     Parameters
     -----------
@@ -57,8 +181,172 @@ def ComputeEquilibrium(objectfunction, x0, method="Nelder-Mead", tol=1e-10):
         Default minimization algorithm in this program is "Nelder-Mead".
     tol : float
         Tolerance for termination. For detailed control, use solver-specific options.
+    sigmatol: float
+        Tolerance of the interfacial energy in J/m^2, met when the interfacial energies at all vertices
+        of the simplex lie within sigmatol.
+    spreadtol: float
+        Tolerance of the spread of the partial interfacial energies in J/m^2, met when the largest
+        and the smallest partial interfacial energy at the best vertex differ by less than spreadtol.
+    partialfunction: function
+        The partial interfacial energies of an interfacial composition, required by sigmatol and spreadtol.
+    full_output: bool
+        Return a dictionary of the composition x, the objective fun, the number of iterations nit
+        and the number of evaluations of the objective nfev, instead of the composition only.
+    """
+    objective = objectfunction if isinstance(objectfunction, MemoizedObjective) else MemoizedObjective(objectfunction)
+    nfev = objective.nfev
+    if sigmatol is None and spreadtol is None:
+        res = minimize(objective, x0, method=method, tol=tol)
+        x, nit = res.x, res.get("nit", 0)
+    else:
+        if partialfunction is None:
+            raise ValueError("The tolerances of the interfacial energies require partialfunction.")
+        if method != "Nelder-Mead":
+            raise ValueError("The tolerances of the interfacial energies require the method Nelder-Mead.")
+        x, nit = _simplexiterations(objective, MemoizedObjective(partialfunction), x0, tol, sigmatol, spreadtol)
+
+    if not full_output:
+        return x
+    return {"x": x, "fun": objective(x), "nit": int(nit), "nfev": objective.nfev - nfev}
+
+
+def _simplexiterations(objective, partials, x0, tol, sigmatol, spreadtol):
     """
+    Nelder-Mead one iteration at a time, each continued from the final simplex of the previous one,
+    which is the whole state of the method, until the partial interfacial energies at the simplex meet the tolerances.
+    """
+    x, simplex, nit = np.asarray(x0, dtype=float), None, 0
+    maxiter = 200 * len(x)
+    while nit < maxiter:
+        """scipy counts the initial simplex as the first iteration"""
+        options = {"maxiter": 2} if simplex is None else {"maxiter": 2, "initial_simplex": simplex}
+        res = minimize(objective, x, method="Nelder-Mead", tol=tol, options=options)
+        nit += res.nit - 1
+        x, simplex = res.x, res.final_simplex[0]
+        """The simplex is sorted, and the best vertex comes first"""
+        sigmas = np.array([np.asarray(partials(list(each)), dtype=float).ravel() for each in simplex])
+        met = spreadtol is None or np.ptp(sigmas[0]) < spreadtol
+        met = met and (sigmatol is None or np.ptp(sigmas.mean(axis=1)) < sigmatol)
+        if met or res.status == 0:
+            break
+    return x, nit
+
+
+def ImplicitDerivatives(dsdx, dsdp):
+    """
+    Derivatives of the interfacial equilibrium with respect to given parameters, e.g. temperature and alloy composition,
+    from the implicit differentiation of the equality of the partial interfacial energies at the converged composition.
+
+    Parameters
+    -----------
+    dsdx: array
+        Derivatives of the partial interfacial energies with respect to the interfacial composition,
+        with the shape (ncomps, ncomps - 1).
+    dsdp: array
+        Derivatives of the partial interfacial energies with respect to the parameters at the fixed interfacial composition,
+        with the shape (ncomps, nparams).
+
+    Returns
+    -----------
+    A dictionary with
+    x: derivatives of the interfacial composition, with the shape (ncomps - 1, nparams).
+    sigmapartial: total derivatives of the partial interfacial energies, with the shape (ncomps, nparams).
+    sigma: total derivatives of the interfacial energy, with the shape (nparams,).
+    """
+    dsdx, dsdp = np.asarray(dsdx, dtype=float), np.asarray(dsdp, dtype=float)
+    dxdp = -np.linalg.solve(dsdx[1:] - dsdx[0], dsdp[1:] - dsdp[0])
+    total = dsdp + dsdx @ dxdp
+    return {"x": dxdp, "sigmapartial": total, "sigma": total.mean(axis=0)}
+
+
+def ComputeEquilibria(partialfunction, x0, tol=1e-9, maxiter=50, h=1e-7):
+    """
+    Resolve the interfacial equilibrium condition of a batch of samples at once,
+    by the Newton method on the equality of the partial interfacial energies with a finite difference Jacobian.
+    Each sample should start close to its solution, e.g. from the solution without perturbations.
+
+    Parameters
+    -----------
+    partialfunction: function
+        The function of calculating partial interfacial energies of components,
+        mapping interfacial compositions with the shape (nsamples, ncomps - 1) to the shape (nsamples, ncomps).
+    x0: array
+        Initial interfacial compositions with the shape (nsamples, ncomps - 1).
+    tol: float
+        Tolerance of the differences between the partial interfacial energies.
+    maxiter: int
+        Maximum number of Newton iterations.
+    h: float
+        Step of the finite differences.
+
+    Returns
+    -----------
+    Interfacial compositions and whether each sample converged.
+    """
+    x = np.array(x0, dtype=float)
+    ns, m = x.shape
+    converged = np.zeros(ns, dtype=bool)
+    for _ in range(maxiter):
+        s = partialfunction(x)
+        G = s[:, 1:] - s[:, :1]
+        converged = np.max(np.abs(G), axis=-1) < tol
+        if converged.all():
+            break
+        J = np.empty((ns, m, m))
+        for j in range(m):
+            xh = x.copy()
+            xh[:, j] += h
+            sh = partialfunction(xh)
+            J[:, :, j] = ((sh[:, 1:] - sh[:, :1]) - G) / h
+        try:
+            dx = np.linalg.solve(J, -G[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            break
+        dx[converged | ~np.isfinite(dx).all(axis=-1)] = 0.0
+
+        """Keep the mole fractions of all components positive"""
+        xx = np.concatenate([1.0 - x.sum(axis=-1, keepdims=True), x], axis=-1)
+        dxx = np.concatenate([-dx.sum(axis=-1, keepdims=True), dx], axis=-1)
+        ratio = np.where(dxx < 0.0, 0.99 * xx / np.where(dxx < 0.0, -dxx, 1.0), np.inf)
+        x = x + np.minimum(1.0, ratio.min(axis=-1))[:, None] * dx
+    return x, converged
+
+
+def SearchEquilibria(partialfunction, nsamples, limit, dx):
+    """
+    Search initial values of the interfacial equilibria of a batch of samples at once.
+    Every grid point is evaluated for all samples in one call of partialfunction.
 
-    res = minimize(objectfunction, x0, method=method, tol=tol)
+    Parameters
+    -----------
+    partialfunction: function
+        The function of calculating partial interfacial energies of components, see ComputeEquilibria.
+    nsamples: int
+        Number of samples.
+    limit: list
+        The composition range of the searched interfacial composition, see SearchEquilibrium.
+    dx: list
+        The step of searching initial interfacial equilibrium composition, see SearchEquilibrium.
+
+    Returns
+    -----------
+    Interfacial compositions with the smallest objective for each sample, with the shape (nsamples, ncomps - 1).
+    """
+    xs = makemultigrid(len(dx), [int(1.0 / dxi) for dxi in dx])
+    xs = [
+        [(limit[j][1] - limit[j][0]) * p[j] + limit[j][0] for j in range(len(p))]
+        for p in xs
+    ]
+    xs = [each for each in xs if sum(each) < 1.0]
 
-    return res.x
+    best = np.zeros((nsamples, len(dx)))
+    vmin = np.full(nsamples, np.inf)
+    for x in xs:
+        s = partialfunction(np.tile(x, (nsamples, 1)))
+        v = sum(
+            np.abs(s[:, i] - s[:, j]) for i in range(s.shape[1] - 1) for j in range(i + 1, s.shape[1])
+        )
+        v = np.where(np.isfinite(v), v, np.inf)
+        better = v < vmin
+        best[better], vmin[better] = x, v[better]
+    return best
@@ -0,0 +1,251 @@
+"""Propagate the uncertainties of molar volumes and thermodynamic parameters to interfacial energies by Monte Carlo sampling.
+"""
+
+from openiec.calculate.calcsigma import SigmaSolLiqModel, SigmaCoherentModel, _banner
+from openiec.calculate.minimize import ComputeEquilibria
+from openiec.model.sigmasolliq import SigmaPureMetal
+from openiec.property.commontangent import CommonTangent, substitutional
+from openiec.property.molarvolume import MolarVolume, CompiledInterficialMolarVolume
+from openiec.property.molarinfarea import MolarInterfacialArea
+import numpy as np
+from sympy import Symbol, sympify
+from xarray import Dataset
+
+
+class UncertainSystem(object):
+    """
+    Keep the uncertain parameters of a two-phase system symbolic and compile the models once,
+    so that a whole batch of parameter samples is evaluated in vectorized form.
+
+    The pure molar volumes are multiplied by symbolic factors with the mean 1,
+    and the selected interaction parameters of the database get symbolic additive perturbations with the mean 0.
+    Both are sampled from normal distributions.
+
+    Parameters
+    -----------
+    db : Database
+        Database containing the relevant parameters.
+    comps : list
+        Names of components to consider in the calculation.
+    phasenames : list
+        Names of two phases.
+    purevms: list
+        The molar volumes of pure components.
+    intervms: list
+        Redlich-Kister parameters of the excess molar volumes of the two phases.
+    vmscale: float or list
+        Relative standard deviations of the pure molar volumes, one value for all or one list per phase.
+    parameters: list
+        Standard deviations of interaction parameters as (phasename, species, order, sd),
+        e.g. ("LIQUID", ("AL", "NI"), 0, 1000.0) for L(LIQUID,AL,NI:VA;0) in J/mol.
+    """
+
+    def __init__(self, db, comps, phasenames, purevms, intervms=[], vmscale=0.0, parameters=[]):
+        if not all(substitutional(db, each) for each in phasenames):
+            raise ValueError("Uncertainty propagation requires two substitutional phases, not %s." % phasenames)
+        components = [each for each in comps if each != "VA"]
+
+        self.vmsymbols = [
+            [Symbol("VM_%s_%s" % (phasename, each)) for each in components] for phasename in phasenames
+        ]
+        phasevm = [
+            MolarVolume(
+                db,
+                phasenames[i],
+                comps,
+                [sympify(vm) * s for vm, s in zip(purevms[i], self.vmsymbols[i])],
+                intervms[i] if intervms else [],
+            )
+            for i in range(2)
+        ]
+        self.vmis = CompiledInterficialMolarVolume(*phasevm, params=sum(self.vmsymbols, []))
+        self.vmscale = np.broadcast_to(np.asarray(vmscale, dtype=float), (2, len(components))).reshape(-1)
+
+        self.lsymbols = [
+            Symbol("L_%s_%s_%d" % (phasename, "_".join(species), order))
+            for phasename, species, order, _ in parameters
+        ]
+        self.lscale = np.array([each[3] for each in parameters], dtype=float)
+        self.tangent = CommonTangent(
+            db,
+            comps,
+            phasenames,
+            params=[
+                (s, phasename, tuple(species), order)
+                for s, (phasename, species, order, _) in zip(self.lsymbols, parameters)
+            ],
+        )
+
+    def sample(self, samples, seed=None):
+        """
+        Draw samples of the molar volume factors and the parameter perturbations.
+
+        Returns
+        -----------
+        Factors of the pure molar volumes with the shape (samples, 2 * ncomps), ordered by phase and component,
+        and perturbations of the interaction parameters with the shape (samples, len(parameters)).
+        """
+        rng = np.random.default_rng(seed)
+        vm = 1.0 + self.vmscale * rng.standard_normal((samples, len(self.vmscale)))
+        dl = self.lscale * rng.standard_normal((samples, len(self.lscale)))
+        return vm, dl
+
+
+def SigmaSolLiqUncertainty(
+    T, x0, db, comps, phasenames, purevms, intervms=[], meltingenthalpy=[], vmscale=0.0, parameters=[], samples=1000, quantiles=[0.025, 0.5, 0.975], seed=None, limit=[0, 1.0], dx=0.01
+):
+    """
+    Calculate the solid/liquid interfacial energy in alloys with its uncertainty.
+    The interfacial equilibrium is solved once with the nominal parameters,
+    and then for all samples at once starting from the nominal solution.
+
+    Parameters
+    -----------
+    T: float
+        Given temperature.
+    x0: list
+        Initial alloy composition.
+    db : Database
+        Database containing the relevant parameters.
+    comps : list
+        Names of components to consider in the calculation.
+    phasenames : list
+        Names of phase model to build.
+    purevms: list
+        The molar volume of the components.
+    intervms: list
+        Redlich-Kister parameters of the excess molar volumes of the two phases.
+    meltingenthalpy: list
+        The stardard melting enthalpies of pure componnets.
+    vmscale: float or list
+        Relative standard deviations of the pure molar volumes, see UncertainSystem.
+    parameters: list
+        Standard deviations of interaction parameters in the database, see UncertainSystem.
+    samples: int
+        Number of Monte Carlo samples.
+    quantiles: list
+        Requested quantiles of the interfacial energy.
+    seed: int
+        Seed of the random number generator.
+    limit: list
+        The limit of composition for searching interfacial composition in equilibrium.
+    dx: float
+        The step of composition for searching interfacial composition in equilibrium.
+
+    Returns:
+    -----------
+    The variables of SigmaSolLiq with the nominal parameters, and
+    Interfacial_Energy_Quantiles: list
+        Requested quantiles of the interfacial energy.
+    Interfacial_Composition_Quantiles: list
+        The same quantiles of the interfacial composition.
+    Interfacial_Energy_Mean, Interfacial_Energy_Std: float
+        Mean and standard deviation of the interfacial energy.
+    Interfacial_Energy_Samples: list
+        Interfacial energies of all samples, NaN if not converged.
+
+    Return type: xarray Dataset
+    """
+    model = SigmaSolLiqModel(T, db, comps, phasenames, purevms, intervms, meltingenthalpy)
+    system = UncertainSystem(db, comps, phasenames, purevms, intervms, vmscale, parameters)
+    R = 8.31451
+
+    _banner()
+    record = model.calculate(x0, limit=limit, dx=dx)
+
+    vm, dl = system.sample(samples, seed)
+    tieline = system.tangent.solvemany(x0, T, model.tieline(x0)["xeq"], dl)
+    xS, xL = tieline["x"][:, 0], tieline["x"][:, 1]
+
+    """Molar interfacial areas and interfacial energies of pure components of all samples"""
+    vmis0 = system.vmis(x0, T, *vm.T).T
+    omega = MolarInterfacialArea(vmis0)
+    sigma0 = np.stack(
+        [SigmaPureMetal(model.meltingenthalpy[i], vmis0[:, i]).infenergy(T) for i in range(vmis0.shape[1])],
+        axis=-1,
+    )
+
+    def partials(x):
+        """The excess terms 2*pI - pS - pL vanish, as the interface takes the average of two phases"""
+        xx = np.concatenate([1.0 - x.sum(axis=-1, keepdims=True), x], axis=-1)
+        return sigma0 + R * T * np.log(xx / np.sqrt(xS * xL)) / omega
+
+    x, converged = ComputeEquilibria(partials, np.tile(record["x"], (samples, 1)))
+    sigma = partials(x)
+    _banner(end=True)
+
+    return _uncertaintydataset(model.components, T, record, x, sigma, converged & tieline["converged"], quantiles)
+
+
+def SigmaCoherentUncertainty(
+    T, x0, db, comps, phasenames, purevms, intervms=[], vmscale=0.0, parameters=[], samples=1000, quantiles=[0.025, 0.5, 0.975], seed=None, limit=[0, 1.0], dx=0.01, pdens=None
+):
+    """
+    Calculate the coherent interfacial energy in alloys with its uncertainty.
+    The chemical potentials of all samples come from the symbolic Gibbs energies of the two phases,
+    so both phases must be substitutional.
+
+    Parameters
+    -----------
+    The same as SigmaSolLiqUncertainty, and
+    pdens: int
+        Number of points sampled per degree of freedom of each phase in the nominal equilibrium calculations.
+
+    Returns:
+    -----------
+    The same as SigmaSolLiqUncertainty.
+
+    Return type: xarray Dataset
+    """
+    model = SigmaCoherentModel(T, db, comps, phasenames, purevms, intervms, pdens)
+    system = UncertainSystem(db, comps, phasenames, purevms, intervms, vmscale, parameters)
+    Nav = 6.02 * 10.0 ** (23.0)
+
+    _banner()
+    record = model.calculate(x0, limit=limit, dx=dx)
+
+    vm, dl = system.sample(samples, seed)
+    tieline = system.tangent.solvemany(x0, T, model.tieline(x0)["xeq"], dl)
+    mueq = tieline["mu"]
+    alpha, beta = system.tangent.phases
+
+    def partials(x):
+        mu = 0.5 * (alpha.chemicalpotentials(x, T, dl) + beta.chemicalpotentials(x, T, dl))
+        vmis = system.vmis(x, T, *vm.T).T
+        return 2.48 * (mu - mueq) * (vmis ** (-2.0 / 3.0)) * (Nav ** (-1.0 / 3.0))
+
+    x, converged = ComputeEquilibria(partials, np.tile(record["x"], (samples, 1)))
+    sigma = partials(x)
+    _banner(end=True)
+
+    return _uncertaintydataset(model.components, T, record, x, sigma, converged & tieline["converged"], quantiles)
+
+
+def _uncertaintydataset(components, T, record, x, sigmapartial, converged, quantiles):
+    """
+    Build the Dataset of the nominal result and the statistics of the samples.
+    """
+    sigma = np.where(converged, sigmapartial.mean(axis=-1), np.nan)
+    xc = np.concatenate([1.0 - x.sum(axis=-1, keepdims=True), x], axis=-1)
+    xc[~converged] = np.nan
+    if not converged.any():
+        print("[Error] The interfacial equilibrium did not converge for any sample.")
+    elif not converged.all():
+        print("[Warning] %d of %d samples did not converge and are excluded." % ((~converged).sum(), len(converged)))
+
+    return Dataset(
+        {
+            "Components": components,
+            "Temperature": T,
+            "Initial_Alloy_Composition": ("Components", record["x0"]),
+            "Interfacial_Composition": ("Components", record["xc"]),
+            "Partial_Interfacial_Energy": ("Components", record["sigmapartial"]),
+            "Interfacial_Energy": record["sigma"],
+            "Interfacial_Energy_Quantiles": ("Quantile", np.nanquantile(sigma, quantiles)),
+            "Interfacial_Composition_Quantiles": (("Quantile", "Components"), np.nanquantile(xc, quantiles, axis=0)),
+            "Interfacial_Energy_Mean": np.nanmean(sigma),
+            "Interfacial_Energy_Std": np.nanstd(sigma),
+            "Interfacial_Energy_Samples": ("Sample", sigma),
+        },
+        coords={"Quantile": list(quantiles)},
+    )
@@ -0,0 +1,518 @@
+"""
+Command-line interface of OpenIEC.
+
+The calculation system (database, components, phases, molar volumes and search settings) is described in a JSON file,
+and the conditions are streamed from a CSV file, a Parquet file or the standard input, e.g.
+
+    openiec run --system NiAl.json --input NiAl-xal-tem.csv --output sigma-NiAl.csv --processes 4
+
+where NiAl.json reads
+
+    {
+        "tdb": "NiAlCrHuang1999.tdb",
+        "interface": "solliq",
+        "comps": ["NI", "AL", "VA"],
+        "phasenames": ["FCC_A1", "LIQUID"],
+        "purevms": [["6.718*10.0**(-6.0) + ...", "10.269*10.0**(-6.0) + ..."], [...]],
+        "limit": [1e-20, 0.3],
+        "dx": 0.01
+    }
+
+and the conditions have a column T and a column X_<component> for each component except the first one,
+e.g. T,X_AL. An optional column id identifies the conditions, otherwise the row number is used.
+Results are appended to the output file as soon as they are completed, and a killed run is continued with --resume.
+Large sweeps are better written in chunks to a directory of NetCDF files (--format netcdf, or an output ending with "/")
+or a Zarr store (*.zarr), which are read back lazily with openiec.utils.store.OpenResults.
+Sweeps over several machines sharing a directory are partitioned into shards, calculated by any number of workers
+and merged into one Dataset, see openiec.utils.shards:
+
+    openiec shard --system NiAl.json --input NiAl-xal-tem.csv --queue /shared/sigma-NiAl --shardsize 1000
+    openiec work --queue /shared/sigma-NiAl --processes 4             # on every machine
+    openiec merge --queue /shared/sigma-NiAl --output sigma-NiAl.nc
+
+Only the parts of the database relevant to the components and phases are loaded,
+and the filtered database is cached in the directory given by the environment variable OPENIEC_CACHE (~/.cache/openiec by default).
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+
+def readsystem(path):
+    """
+    Read the description of the calculation system from a JSON file.
+
+    Parameters
+    -----------
+    path: str
+        Path of the JSON file.
+    """
+    with open(path) as f:
+        system = json.load(f)
+    system.setdefault("interface", "solliq")
+    system.setdefault("intervms", [])
+    system.setdefault("limit", [0, 1.0])
+    system.setdefault("dx", 0.01)
+    if system["interface"] not in ("solliq", "coherent"):
+        raise ValueError("Unknown interface %r, use 'solliq' or 'coherent'." % system["interface"])
+    tdb = system["tdb"]
+    if not os.path.isabs(tdb):
+        system["tdb"] = os.path.join(os.path.dirname(os.path.abspath(path)), tdb)
+    return system
+
+
+def readconditions(path, chunksize=1024):
+    """
+    Stream conditions as dictionaries from a CSV file, a Parquet file or the standard input.
+
+    Parameters
+    -----------
+    path: str
+        Path of the CSV or Parquet file, or "-" for CSV from the standard input.
+    chunksize: int
+        Number of rows read at once from a Parquet file.
+    """
+    if path.endswith(".parquet") or path.endswith(".pq"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            for row in batch.to_pylist():
+                yield row
+        return
+
+    f = sys.stdin if path == "-" else open(path, newline="")
+    try:
+        for row in csv.DictReader(line for line in f if line.strip() and not line.startswith("#")):
+            yield row
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _conditions(rows, components, done, start=0):
+    """
+    Convert rows to (id, T, x0), skipping the conditions finished in a previous run.
+    The rows are numbered from start, for the default identifiers.
+    """
+    for index, row in enumerate(rows, start):
+        cid = str(row.get("id", index))
+        if cid in done:
+            continue
+        T = float(row["T"])
+        x0 = [float(row["X_%s" % each]) for each in components[1:]]
+        yield cid, T, x0
+
+
+_worker = {}
+
+
+def _initworker(system):
+    """
+    Load the database once per worker process, restricted to the components and phases of the system.
+    The database and the models are kept for later calls with the same system.
+    """
+    from openiec.utils.database import LoadDatabase
+
+    if _worker.get("system") == system:
+        return
+    _worker["system"] = system
+    _worker["db"] = LoadDatabase(system["tdb"], system["comps"], system["phasenames"])
+    _worker["models"] = {}
+
+
+def _model(T):
+    """
+    Models of the worker at the given temperature, built once per temperature.
+    """
+    from openiec.calculate.calcsigma import SigmaSolLiqModel, SigmaCoherentModel
+
+    models = _worker["models"]
+    if T not in models:
+        system, db = _worker["system"], _worker["db"]
+        args = (T, db, system["comps"], system["phasenames"], system["purevms"], system["intervms"])
+        if len(models) >= 8:
+            models.pop(next(iter(models)))
+        if system["interface"] == "coherent":
+            models[T] = SigmaCoherentModel(*args)
+        else:
+            models[T] = SigmaSolLiqModel(*args, meltingenthalpy=system.get("meltingenthalpy", []))
+    return models[T]
+
+
+def _calculate(condition):
+    """
+    Calculate the interfacial energy of one condition in a worker.
+    """
+    from openiec.property.phaseregion import PhaseRegion
+
+    cid, T, x0 = condition
+    system, db = _worker["system"], _worker["db"]
+    try:
+        region = PhaseRegion.shared(db, system["comps"], system["phasenames"]).check(x0, T)
+        if not region["region"]:
+            return cid, T, x0, None, "outside two-phase region"
+        record = _model(T).calculate(x0, limit=system["limit"], dx=system["dx"])
+    except Exception as e:
+        return cid, T, x0, None, "%s: %s" % (type(e).__name__, e)
+    return cid, T, x0, record, "ok"
+
+
+def _header(components):
+    return (
+        ["id", "T"]
+        + ["X_%s" % each for each in components]
+        + ["XI_%s" % each for each in components]
+        + ["SIGMA_%s" % each for each in components]
+        + ["SIGMA", "STATUS"]
+    )
+
+
+def _row(result, components):
+    cid, T, x0, record, status = result
+    nan = [float("nan")] * len(components)
+    if record is None:
+        return [cid, T, 1.0 - sum(x0)] + list(x0) + nan + nan + [float("nan"), status]
+    return (
+        [cid, T]
+        + [float(each) for each in record["x0"]]
+        + [float(each) for each in record["xc"]]
+        + [float(each) for each in record["sigmapartial"]]
+        + [float(record["sigma"]), status]
+    )
+
+
+def _done(path):
+    """
+    Identifiers of the conditions already written to the output file.
+    A row cut off by a killed run is removed, so that the file can be appended to.
+    """
+    if path == "-" or not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as f:
+        content = f.read()
+        if content and not content.endswith(b"\n"):
+            f.truncate(content.rfind(b"\n") + 1)
+    with open(path, newline="") as f:
+        return set(row["id"] for row in csv.DictReader(f) if row.get("STATUS"))
+
+
+def run(system, input, output, processes=1, resume=False, inflight=None, format=None, chunksize=4096):
+    """
+    Calculate interfacial energies for streamed conditions and write the results as they are completed.
+
+    Parameters
+    -----------
+    system: dict
+        Description of the calculation system, see readsystem.
+    input: str
+        Path of the conditions, or "-" for the standard input.
+    output: str
+        Path of the output, or "-" for CSV on the standard output.
+    processes: int
+        Number of worker processes.
+    resume: bool
+        Skip the conditions already in the output file and append to it.
+    inflight: int
+        Maximum number of conditions submitted but not completed, 4 per process by default.
+    format: str
+        "csv", "netcdf" for a directory of NetCDF part files or "zarr" for a Zarr store, see ResultStore.
+        By default Zarr if the output ends with ".zarr", NetCDF if it ends with "/" or is an existing directory,
+        and CSV otherwise.
+    chunksize: int
+        Number of conditions written at once to a NetCDF or Zarr output.
+    """
+    components = [each for each in system["comps"] if each != "VA"]
+    if format is None:
+        if output.rstrip("/").endswith(".zarr"):
+            format = "zarr"
+        else:
+            format = "netcdf" if output.endswith("/") or os.path.isdir(output) else "csv"
+    if format != "csv":
+        return _runstore(system, input, output, processes, resume, inflight, chunksize)
+
+    done = _done(output) if resume else set()
+    conditions = _conditions(readconditions(input), components, done)
+
+    if output == "-":
+        f = sys.stdout
+    else:
+        append = resume and os.path.exists(output) and os.path.getsize(output) > 0
+        f = open(output, "a" if append else "w", newline="")
+    writer = csv.writer(f)
+    if output == "-" or f.tell() == 0:
+        writer.writerow(_header(components))
+        f.flush()
+
+    def write(result):
+        writer.writerow(_row(result, components))
+        f.flush()
+
+    try:
+        with _pool(system, processes) as executor:
+            _execute(conditions, write, executor, inflight or 4 * processes)
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+
+def _runstore(system, input, output, processes, resume, inflight, chunksize):
+    """
+    The same as run, with the results written in chunks to a ResultStore.
+    """
+    from openiec.utils.store import ResultStore
+
+    components = [each for each in system["comps"] if each != "VA"]
+    if os.path.exists(output) and not resume and not (os.path.isdir(output) and not os.listdir(output)):
+        raise ValueError("The output %s exists already, continue it with --resume or remove it." % output)
+    store = ResultStore(output, components, chunksize, attrs={"system": json.dumps(system)})
+    done = store.done() if resume else set()
+    conditions = _conditions(readconditions(input), components, done)
+
+    def write(result):
+        cid, T, x0, record, status = result
+        store.append(cid, T, x0, record, status)
+
+    try:
+        with _pool(system, processes) as executor:
+            _execute(conditions, write, executor, inflight or 4 * processes)
+    finally:
+        store.close()
+
+
+def shard(system, input, queue, shardsize=1000, lease=600.0):
+    """
+    Partition the conditions into shards in a work queue in a shared directory, see openiec.utils.shards.
+
+    Parameters
+    -----------
+    system: dict
+        Description of the calculation system, see readsystem.
+    input: str
+        Path of the conditions, readable by all workers.
+    queue: str
+        The shared directory of the queue and the results.
+    shardsize: int
+        Number of consecutive conditions in a shard.
+    lease: float
+        Seconds without a heartbeat of a worker after which its shard is claimed by another worker.
+    """
+    from openiec.utils.shards import ShardQueue
+
+    nrows = sum(1 for _ in readconditions(input))
+    return ShardQueue(queue).create(system, input, nrows, shardsize, lease)
+
+
+def work(queue, processes=1, inflight=None, chunksize=4096):
+    """
+    Claim and calculate shards from a work queue until none is left.
+    Any number of workers may run on the machines sharing the directory of the queue.
+    The database is loaded and the pool is started once, and shared by all shards calculated by this worker.
+
+    Parameters
+    -----------
+    queue: str
+        The shared directory of the queue and the results.
+    processes: int
+        Number of worker processes.
+    inflight: int
+        Maximum number of conditions submitted but not completed, 4 per process by default.
+    chunksize: int
+        Number of conditions written at once to the results of a shard.
+
+    Return type: int, the number of shards calculated by this worker
+    """
+    from openiec.utils.shards import ShardQueue, Owner
+    from openiec.utils.store import ResultStore
+
+    queue = ShardQueue(queue)
+    meta = queue.meta()
+    system = meta["system"]
+    components = [each for each in system["comps"] if each != "VA"]
+    owner = Owner()
+    count = 0
+
+    with _pool(system, processes) as executor:
+        while True:
+            claimed = queue.claim(owner)
+            if claimed is None:
+                return count
+            index, start, stop = claimed
+            store = ResultStore(queue.output(index), components, chunksize, attrs={"system": json.dumps(system)})
+            """A shard claimed again after the loss of its worker continues from the stored chunks"""
+            conditions = _conditions(
+                itertools.islice(readconditions(meta["input"]), start, stop), components, store.done(), start
+            )
+            beat = [time.time()]
+
+            def write(result):
+                """Renew the lease before storing, so that no chunk is written to a shard of another worker"""
+                if time.time() - beat[0] > meta["lease"] / 10.0:
+                    if not queue.heartbeat(index, owner):
+                        raise _LeaseLost()
+                    beat[0] = time.time()
+                cid, T, x0, record, status = result
+                store.append(cid, T, x0, record, status)
+
+            try:
+                _execute(conditions, write, executor, inflight or 4 * processes)
+            except _LeaseLost:
+                store.discard()
+                print("[Warning] The shard %d was claimed by another worker, its remaining results are dropped." % index)
+                continue
+            finally:
+                store.close()
+            if queue.complete(index, owner):
+                count += 1
+            else:
+                print("[Warning] The shard %d was claimed by another worker before it was completed." % index)
+
+
+class _LeaseLost(Exception):
+    pass
+
+
+def merge(queue, output):
+    """
+    Merge the results of the shards of a work queue into one NetCDF file, or a Zarr store if output ends with ".zarr".
+    """
+    from openiec.utils.shards import ShardQueue
+
+    ds = ShardQueue(queue).merge()
+    if output.rstrip("/").endswith(".zarr"):
+        ds.to_zarr(output, mode="w-")
+    else:
+        ds.load().to_netcdf(output, format="NETCDF3_64BIT")
+    return ds
+
+
+@contextmanager
+def _pool(system, processes=1):
+    """
+    A pool of worker processes, or None to calculate in this process,
+    for the conditions of one or more calls of _execute.
+    """
+    if processes > 1:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_initworker, initargs=(system,)) as executor:
+            yield executor
+        return
+    _initworker(system)
+    yield None
+
+
+def _execute(conditions, write, executor=None, inflight=4):
+    """
+    Calculate the conditions in this process or in the pool of _pool,
+    and pass each result to write as soon as it is completed.
+    If write fails, the submitted conditions are cancelled or completed first, so that the pool is free again.
+    """
+    if executor is None:
+        for condition in conditions:
+            write(_calculate(condition))
+        return
+
+    pending = set()
+    try:
+        for condition in conditions:
+            pending.add(executor.submit(_calculate, condition))
+            if len(pending) >= inflight:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for each in finished:
+                    write(each.result())
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for each in finished:
+                write(each.result())
+    except BaseException:
+        for each in pending:
+            each.cancel()
+        wait(pending)
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="openiec", description="Calculate interfacial energies in alloys."
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    runparser = subparsers.add_parser(
+        "run", help="Calculate interfacial energies for a table of conditions."
+    )
+    runparser.add_argument("--system", required=True, help="JSON description of the system.")
+    runparser.add_argument("--input", default="-", help="CSV or Parquet conditions, '-' for stdin.")
+    runparser.add_argument(
+        "--output", default="-",
+        help="CSV file, NetCDF directory (ending with '/') or Zarr store (*.zarr) of the results, '-' for CSV on stdout.",
+    )
+    runparser.add_argument(
+        "--format", choices=["csv", "netcdf", "zarr"], help="Format of the output, by its name if not given."
+    )
+    runparser.add_argument(
+        "--chunksize", type=int, default=4096, help="Conditions written at once to NetCDF or Zarr."
+    )
+    runparser.add_argument("--processes", type=int, default=1, help="Number of worker processes.")
+    runparser.add_argument(
+        "--resume", action="store_true", help="Skip conditions already in the output file."
+    )
+
+    shardparser = subparsers.add_parser(
+        "shard", help="Partition a table of conditions into shards of a work queue in a shared directory."
+    )
+    shardparser.add_argument("--system", required=True, help="JSON description of the system.")
+    shardparser.add_argument("--input", required=True, help="CSV or Parquet conditions on the shared filesystem.")
+    shardparser.add_argument("--queue", required=True, help="Shared directory of the queue and the results.")
+    shardparser.add_argument("--shardsize", type=int, default=1000, help="Number of conditions in a shard.")
+    shardparser.add_argument(
+        "--lease", type=float, default=600.0, help="Seconds without heartbeat until a shard is claimed again."
+    )
+
+    workparser = subparsers.add_parser("work", help="Calculate shards of a work queue until none is left.")
+    workparser.add_argument("--queue", required=True, help="Shared directory of the queue and the results.")
+    workparser.add_argument("--processes", type=int, default=1, help="Number of worker processes.")
+    workparser.add_argument(
+        "--chunksize", type=int, default=4096, help="Conditions written at once to the results of a shard."
+    )
+
+    mergeparser = subparsers.add_parser("merge", help="Merge the results of the shards of a work queue.")
+    mergeparser.add_argument("--queue", required=True, help="Shared directory of the queue and the results.")
+    mergeparser.add_argument("--output", required=True, help="NetCDF file or Zarr store (*.zarr) of the results.")
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 1
+
+    if args.command == "run":
+        if args.resume and args.output == "-":
+            parser.error("--resume requires an output file.")
+        if args.format in ("netcdf", "zarr") and args.output == "-":
+            parser.error("--format %s requires an output path." % args.format)
+        run(
+            readsystem(args.system), args.input, args.output, args.processes, args.resume,
+            format=args.format, chunksize=args.chunksize,
+        )
+    elif args.command == "shard":
+        if args.input == "-":
+            parser.error("shard requires an input file readable by all workers.")
+        n = shard(readsystem(args.system), args.input, args.queue, args.shardsize, args.lease)
+        print("%d shards in %s" % (n, args.queue))
+    elif args.command == "work":
+        from openiec.utils.shards import ShardQueue
+
+        n = work(args.queue, args.processes, chunksize=args.chunksize)
+        print("%d shards calculated, %s" % (n, ShardQueue(args.queue).status()))
+    elif args.command == "merge":
+        ds = merge(args.queue, args.output)
+        print("%d conditions merged into %s" % (ds.sizes["Condition"], args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
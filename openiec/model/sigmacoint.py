@@ -2,11 +2,8 @@
 Contruct the partial interfacial energies for different components on the solid/liquid interface and the object function to resolving the interfacial equilibrium condition.
 """
 
-from openiec.utils.makemultigrid import makemultigrid
-from scipy.optimize import minimize
 from math import fabs
 import numpy as np
-from functools import reduce
 
 
 class SigmaCoherentInterface(object):
@@ -21,15 +18,19 @@ class SigmaCoherentInterface(object):
         The phase with two sublattices.
     mueq: list
         The chemical potentials of the equilibrium state at the given compositions.
-    vmis: list
-        The partial molar volumes of components.
+    vmis: list or CompiledInterficialMolarVolume
+        The partial molar volumes of components, either as a list of functions of the interfacial composition
+        or as a compiled function returning the partial molar volumes of all components at once.
+    T: float
+        Given temperature, only required when vmis is a compiled function.
     """
 
-    def __init__(self, alphafuncs, betafuncs, mueq, vmis):
+    def __init__(self, alphafuncs, betafuncs, mueq, vmis, T=None):
         self.alphafuncs = alphafuncs
         self.betafuncs = betafuncs
         self.mueq = mueq
         self.vmis = vmis
+        self.T = T
         self.Nav = 6.02 * 10.0 ** (23.0)
 
     def infenergy(self, x):
@@ -40,17 +41,57 @@ class SigmaCoherentInterface(object):
         x: list
             Interfacial composition.
         """
+        if callable(self.vmis):
+            vmis = getattr(self.vmis, "scalar", self.vmis)(x, self.T)
+        else:
+            vmis = [each(x) for each in self.vmis]
+        mualpha = self.alphafuncs(list(x))
+        mubeta = self.betafuncs(list(x))
         sigma = [
             2.48
             * (
-                0.5 * (self.alphafuncs(list(x))[i] + self.betafuncs(list(x))[i])
+                0.5 * (mualpha[i] + mubeta[i])
                 - self.mueq[i]
             )
-            * ((self.vmis[i](x) ** (-2.0 / 3.0)) * (self.Nav ** (-1.0 / 3.0)))
+            * ((vmis[i] ** (-2.0 / 3.0)) * (self.Nav ** (-1.0 / 3.0)))
             for i in range(len(x) + 1)
         ]
         return sigma
 
+    def jacobian(self, x, alpha, beta):
+        """
+        Compute the partial derivatives of the partial interfacial energies of components
+        at the interfacial composition x, used for the implicit differentiation of the interfacial equilibrium.
+        vmis must be a compiled function providing its jacobian.
+
+        Parameters
+        ----------
+        x: list
+            Interfacial composition.
+        alpha: dict
+            Chemical potentials of components in the first phase at x and their derivatives,
+            see PhaseGibbsEnergy.chemicalpotential.
+        beta: dict
+            The same quantities in the second phase.
+
+        Returns
+        ----------
+        A dictionary of the derivatives of the partial interfacial energies with respect to
+        x: the interfacial composition, one row per component.
+        T: temperature, with the other arguments fixed.
+        mueq: the chemical potential in two-phase equilibrium of the same component.
+        """
+        vmis = np.asarray(self.vmis(x, self.T), dtype=float)
+        dvmis = self.vmis.jacobian(x, self.T)
+        f = 2.48 * vmis ** (-2.0 / 3.0) * self.Nav ** (-1.0 / 3.0)
+        dmu = 0.5 * (alpha["mu"] + beta["mu"]) - np.asarray(self.mueq, dtype=float)
+        dlnf = -2.0 / 3.0 * dvmis / vmis[:, None]
+        return {
+            "x": f[:, None] * (0.5 * (alpha["x"] + beta["x"]) + dmu[:, None] * dlnf[:, :-1]),
+            "T": f * (0.5 * (alpha["T"] + beta["T"]) + dmu * dlnf[:, -1]),
+            "mueq": -f,
+        }
+
     def objective(self, x):
         """
         Compute the absolute value of the differences between the partial interfacial energy.
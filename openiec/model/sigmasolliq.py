@@ -2,37 +2,49 @@
 Contruct the partial interfacial energies for different components on the coherent interface and the object function to resolving the interfacial equilibrium condition.
 """
 
-from openiec.utils.makemultigrid import makemultigrid
-from scipy.optimize import minimize
 from math import fabs
 import numpy as np
-from functools import reduce
 
 
 class SigmaPureMetal(object):
     """
     Contruct the solid/liquid interfacial energies of pure components.
+    All quantities are broadcast against each other, e.g. one value per component against temperature arrays.
 
     Parameters
     -----------
-    deltaH: float
+    deltaH: float or array
         The standard molar entholpy of melting of the pure component.
-    purevm: float
+    purevm: float or array
         The characteristic molar volume of pure component.
     """
 
     def __init__(self, deltaH, purevm):
-        self.deltaH = deltaH
-        self.purevm = purevm
+        self.deltaH = np.asarray(deltaH, dtype=float)
+        self.purevm = np.asarray(purevm, dtype=float)
         self.R = 8.31451
         self.NAv = 6.02 * 10.0 ** 23
 
     def infenergy(self, T):
+        """
+        Interfacial energies at the temperatures T, broadcast against deltaH and purevm.
+        """
+        T = np.asarray(T, dtype=float)
         sigma = (self.deltaH + 0.5 * self.R * T * np.log(2)) / (
             2.0 * self.purevm ** (2.0 / 3.0) * self.NAv ** (1.0 / 3.0)
         )
         return sigma
 
+    def derivatives(self, T):
+        """
+        Derivatives of the interfacial energy with respect to temperature and to the characteristic molar volume.
+        """
+        sigma = self.infenergy(T)
+        return {
+            "T": 0.5 * self.R * np.log(2) / (2.0 * self.purevm ** (2.0 / 3.0) * self.NAv ** (1.0 / 3.0)),
+            "purevm": -2.0 / 3.0 * sigma / self.purevm,
+        }
+
 
 class SigmaSolidLiquidInterface(object):
     """
@@ -50,23 +62,18 @@ class SigmaSolidLiquidInterface(object):
         Molar interfacial areas of components
     sigma0: 
         Solid/liquid interfacial energies of pure components
-    excessgmI: list
-        Partial molar excess Gibbs energies of components in the solid/liquid interfacial region
-    excessgmS: list
-        Partial molar excess Gibbs energies of components in solid phase
-    excessgmL: list
-        Partial molar excess Gibbs energies of components in liquid phase
+
+    The excess Gibbs energy of the interfacial region is the average of those of the solid and the liquid,
+    so the excess terms 2*pI - pS - pL of the partial interfacial energies vanish identically
+    and the partial excess Gibbs energies are not needed.
     """
 
-    def __init__(self, T, xS, xL, omega, sigma0, excessgmI, excessgmS, excessgmL):
+    def __init__(self, T, xS, xL, omega, sigma0):
         self.T = T
         self.xS = xS
         self.xL = xL
         self.omega = omega
         self.sigma0 = sigma0
-        self.excessgmI = excessgmI
-        self.excessgmS = excessgmS
-        self.excessgmL = excessgmL
         self.R = 8.31451
         self.NAv = 6.02 * 10.0 ** 23
 
@@ -89,16 +96,43 @@ class SigmaSolidLiquidInterface(object):
                 * np.log(xx[i] * ((self.xS[i] * self.xL[i]) ** (-1.0 / 2.0)))
             )
             / self.omega[i]
-            + (
-                2.0 * self.excessgmI[i](*x)
-                - self.excessgmS[i](*x)
-                - self.excessgmL[i](*x)
-            )
-            / (2.0 * self.omega[i])
             for i in range(len(x) + 1)
         ]
         return sigma
 
+    def jacobian(self, x):
+        """
+        Compute the partial derivatives of the partial interfacial energies of components
+        at the interfacial composition x, used for the implicit differentiation of the interfacial equilibrium.
+
+        Parameters
+        ----------
+        x: list
+            Interfacial composition.
+
+        Returns
+        ----------
+        A dictionary of the derivatives of the partial interfacial energies with respect to
+        x: the interfacial composition, one row per component.
+        T: temperature, with the other arguments fixed.
+        xS, xL, omega, sigma0: the corresponding quantity of the same component.
+        """
+        xx = np.array([1 - sum(x)] + list(x), dtype=float)
+        omega = np.asarray(self.omega, dtype=float)
+        xS, xL = np.asarray(self.xS, dtype=float), np.asarray(self.xL, dtype=float)
+        RT = self.R * self.T
+
+        dlnx = np.vstack([-np.ones(len(x)) / xx[0], np.diag(1.0 / xx[1:])])
+        sigma = np.array(self.infenergy(x), dtype=float)
+        return {
+            "x": RT * dlnx / omega[:, None],
+            "T": self.R * np.log(xx / np.sqrt(xS * xL)) / omega,
+            "xS": -RT / (2.0 * omega * xS),
+            "xL": -RT / (2.0 * omega * xL),
+            "omega": -(sigma - np.asarray(self.sigma0, dtype=float)) / omega,
+            "sigma0": np.ones(len(xx)),
+        }
+
     def objective(self, x):
         """
         Compute the absolute value of the differences between the partial interfacial energy.
@@ -114,3 +148,31 @@ class SigmaSolidLiquidInterface(object):
             for j in range(i + 1, len(s)):
                 v += fabs(s[i] - s[j])
         return v
+
+    def lowerbound(self, L, H):
+        """
+        Lower bounds of the objective over boxes of interfacial compositions, for the global search of BranchAndBound.
+        The partial interfacial energies are bounded separately, and a pair of components contributes
+        the gap between their bounds, if they do not overlap.
+
+        Parameters
+        ----------
+        L, H: array
+            Lower and upper corners of the boxes with the shape (nboxes, ncomps - 1).
+        """
+        L, H = np.asarray(L, dtype=float), np.asarray(H, dtype=float)
+        xlo = np.vstack([1.0 - H.sum(axis=1), L.T])
+        xhi = np.vstack([1.0 - L.sum(axis=1), H.T])
+        omega = np.asarray(self.omega, dtype=float)[:, None]
+        sigma0 = np.asarray(self.sigma0, dtype=float)[:, None]
+        ref = 0.5 * np.log(np.asarray(self.xS, dtype=float) * np.asarray(self.xL, dtype=float))[:, None]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slo = sigma0 + self.R * self.T * (np.log(np.maximum(xlo, 0.0)) - ref) / omega
+            shi = sigma0 + self.R * self.T * (np.log(np.maximum(xhi, 0.0)) - ref) / omega
+        v = np.zeros(L.shape[0])
+        for i in range(len(slo) - 1):
+            for j in range(i + 1, len(slo)):
+                gap = np.maximum(slo[i] - shi[j], slo[j] - shi[i])
+                v += np.where(gap > 0.0, gap, 0.0)
+        return v
@@ -2,17 +2,72 @@
 Obtain quantities correlating with thremodynamic equilibrium calculation using the pycalphad package.
 """
 
-import matplotlib.pyplot as plt
-from pycalphad import equilibrium
-from pycalphad import Database, Model
+from pycalphad import equilibrium, Model
 import pycalphad.variables as v
 import numpy as np
 import math
+import threading
+
+"""The equilibrium calculations of pycalphad are not known to be thread-safe, so threads take turns"""
+_lock = threading.RLock()
+
+
+def PhaseRecords(db, comps, phases, T, P=101325):
+    """
+    Build the pycalphad models and the compiled phase records of the phases once,
+    so that they are passed into every equilibrium calculation instead of being rebuilt.
+
+    Parameters
+    ----------
+    db : Database
+        Database containing the relevant parameters.
+    comps: list
+        Names of components to consider in the calculation.
+    phases: list
+        Names of phases.
+    T: float
+        Given temperature.
+    P: float
+        Given pressure.
+
+    Returns
+    ----------
+    The keyword arguments of pycalphad.equilibrium carrying the prebuilt models and phase records.
+    The keyword of the phase records depends on the version of pycalphad.
+    """
+    models = {each: Model(db, comps, each) for each in phases}
+    statevars = {v.N: 1, v.P: P, v.T: T}
+
+    try:
+        from pycalphad.codegen.phase_record_factory import PhaseRecordFactory
+    except ImportError:
+        pass
+    else:
+        records = PhaseRecordFactory(db, comps, statevars, models)
+        return {"model": models, "phase_records": records}
+
+    try:
+        from pycalphad.codegen.callables import build_phase_records
+    except ImportError:
+        from pycalphad.codegen.callables import build_callables
+
+        callables = build_callables(
+            db, comps, phases, models, build_gradients=True, build_hessians=True,
+            additional_statevars={v.N, v.P, v.T},
+        )
+        return {"model": models, "callables": callables}
+
+    records = build_phase_records(
+        db, comps, phases, statevars, models, build_gradients=True, build_hessians=True
+    )
+    return {"model": models, "phase_records": records}
 
 
 class CoherentGibbsEnergy(object):
     """
     Equilibrium calculation for sing phase or two phases.
+    The pycalphad models and phase records are built at construction and reused by every equilibrium calculation,
+    and the result at the latest composition is kept, so that several quantities at one composition cost one calculation.
 
     Parameters
     ----------
@@ -24,31 +79,83 @@ class CoherentGibbsEnergy(object):
         Name of pure component.
     phasename: list
         Name of phase model to build.
+    pdens: int
+        Number of points sampled per degree of freedom of each phase, the default of pycalphad if not given.
+    slim: bool
+        Extract MU, GM, and Phase, NP, X of each vertex into small NumPy arrays right after the calculation,
+        which the accessors use instead of slicing the equilibrium Dataset.
     """
 
-    def __init__(self, T, db, comps, phasename):
+    def __init__(self, T, db, comps, phasename, pdens=None, slim=False):
         self.T = T
         self.comps = comps
         self.phasename = phasename
         self.P = 101325
         self.db = db
+        self.slim = slim
+        self.components = [each for each in comps if each != "VA"]
+        phases = [phasename] if isinstance(phasename, str) else list(phasename)
+        self.phases = phases
+        with _lock:
+            self.eqkwargs = PhaseRecords(db, comps, phases, T, self.P)
+        if pdens is not None:
+            self.eqkwargs["calc_opts"] = {"pdens": pdens}
+        self.latest = (None, None)
 
     def eqfunc(self, x):
         """
         Calculate the phase equilibrium.
         """
+        key = ("Dataset",) + tuple(x)
+        latest = self.latest
+        if latest[0] == key:
+            return latest[1]
         variable = x + [self.T, self.P]
         xs = [v.X(each) for each in self.comps if each != "VA"]
         xxs = [xs[i] for i in range(1, len(xs))]
         xxxs = xxs + [v.T, v.P]
         var = {xxxs[i]: variable[i] for i in range(len(variable))}
-        eq_result = equilibrium(self.db, self.comps, self.phasename, var)
+        with _lock:
+            eq_result = equilibrium(self.db, self.comps, self.phasename, var, **self.eqkwargs)
+        if not self.slim:
+            self.latest = (key, eq_result)
         return eq_result
 
+    def eqarrays(self, x):
+        """
+        The quantities of the phase equilibrium in small NumPy arrays.
+
+        Returns
+        ----------
+        MU: chemical potentials of components, ordered as comps.
+        GM: molar Gibbs energy of the system.
+        Phase: names of phases of vertices.
+        NP: phase fractions of vertices.
+        X: mole fractions of components in vertices, ordered as comps.
+        """
+        key = ("arrays",) + tuple(x)
+        latest = self.latest
+        if latest[0] == key:
+            return latest[1]
+        eq = self.eqfunc(x)
+        nv = eq.sizes["vertex"] if hasattr(eq, "sizes") else eq.dims["vertex"]
+        order = [list(eq.component.values).index(each) for each in self.components]
+        arrays = {
+            "MU": eq.MU.values.reshape(-1)[order],
+            "GM": float(eq.GM.values.reshape(-1)[0]),
+            "Phase": eq.Phase.values.reshape(nv),
+            "NP": eq.NP.values.reshape(nv),
+            "X": eq.X.values.reshape(nv, -1)[:, order],
+        }
+        self.latest = (key, arrays)
+        return arrays
+
     def phase(self, x, **kwargs):
         """
         The string name of the phase in equilibrium at the conditions.
         """
+        if self.slim and not kwargs:
+            return self.eqarrays(x)["Phase"]
         phasearray = self.eqfunc(x).Phase.sel(P=self.P, T=self.T, **kwargs)
         return phasearray.values.flatten()
 
@@ -56,6 +163,9 @@ class CoherentGibbsEnergy(object):
         """
         The phasevertex is the index of the phase in equilibrium. 
         """
+        if self.slim and not kwargs:
+            phases = self.eqarrays(x)["Phase"]
+            return [int(i) for each in self.phases for i in np.nonzero(phases == each)[0]]
         phaseindex = []
         for each in self.phasename:
             phasevertex = (
@@ -72,6 +182,8 @@ class CoherentGibbsEnergy(object):
         """
         Molar Gibbs energy of bulk phases.
         """
+        if self.slim and not kwargs:
+            return np.array([self.eqarrays(x)["GM"]])
         GM = self.eqfunc(x).GM.sel(P=self.P, T=self.T, **kwargs)
         return GM.values.flatten()
 
@@ -84,6 +196,8 @@ class CoherentGibbsEnergy(object):
         componentname: list
             Names of components to consider in the calculation.    
         """
+        if self.slim and not kwargs:
+            return self.eqarrays(x)["MU"]
         componentname = [each for each in self.comps if each != "VA"]
         chemicalpotential = (
             self.eqfunc(x).MU.sel(P=self.P, T=self.T, component=componentname, **kwargs)
@@ -95,6 +209,9 @@ class CoherentGibbsEnergy(object):
         Phase fractions of phases in equilibrium.
         """
         phaseindex = self.phasevertex(x, **kwargs)
+        if self.slim and not kwargs:
+            arrays = self.eqarrays(x)
+            return [arrays["NP"][phaseindex[i]] for i in range(len(self.phasename))]
         phasefraction = [
             (
                 self.eqfunc(x)
@@ -116,6 +233,9 @@ class CoherentGibbsEnergy(object):
         """
         components = [each for each in self.comps if each != "VA"]
         phaseindex = self.phasevertex(x, **kwargs)
+        if self.slim and not kwargs:
+            X = self.eqarrays(x)["X"]
+            return [list(X[phaseindex[i]]) for i in range(len(self.phasename))]
         molefraction = [
             [
                 (
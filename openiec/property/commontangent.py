@@ -0,0 +1,507 @@
+"""
+Solve the two-phase equilibrium between two given phases directly from the common tangent of their Gibbs energies.
+"""
+
+from openiec.property.coherentenergy import CoherentGibbsEnergy
+from openiec.property.molarvolume import RedlichKister
+from openiec.property.orderedenergy import OrderedGibbsEnergy, spanning
+from pycalphad import Model
+import pycalphad.variables as V
+from openiec.utils.symbolic import lambdify, subs, diff, sympify
+import numpy as np
+import threading
+
+_shared = {}
+_sharedphases = {}
+"""Shared solvers are built once under the lock, so that threads may share them"""
+_lock = threading.RLock()
+
+
+def substitutional(db, phasename):
+    """
+    Whether the phase mixes all components on the first sublattice, with only vacancies on the others.
+
+    Parameters
+    -----------
+    db : Database
+        Database containing the relevant parameters.
+    phasename: str
+        Name of the phase.
+    """
+    constituents = db.phases[phasename].constituents
+    return all(
+        set(getattr(c, "name", c) for c in subl) == {"VA"} for subl in constituents[1:]
+    )
+
+
+class PhaseGibbsEnergy(object):
+    """
+    Construct the molar Gibbs energy of a substitutional phase as a function of mole fractions and temperature,
+    together with its gradient and Hessian with respect to the independent mole fractions.
+
+    Parameters
+    -----------
+    db : Database
+        Database containing the relevant parameters.
+    comps: list
+        Names of components to consider in the calculation.
+    phasename: str
+        Name of the phase.
+    params: list
+        Symbolic perturbations of interaction parameters as (symbol, phasename, species, order),
+        e.g. (Symbol("dL"), "LIQUID", ("AL", "NI"), 0) adds dL to L(LIQUID,AL,NI:VA;0).
+        Perturbations of other phases are ignored, and all symbols are trailing arguments of the compiled functions.
+    """
+
+    def __init__(self, db, comps, phasename, params=()):
+        if not substitutional(db, phasename):
+            raise ValueError("%s is not a substitutional phase." % phasename)
+        components = [each for each in comps if each != "VA"]
+        sublattices = db.phases[phasename].sublattices
+
+        model = Model(db, comps, phasename)
+        xs = [V.X(each) for each in components]
+        vars = {V.Y(phasename, i, "VA"): 1.0 for i in range(1, len(sublattices))}
+        vars.update({V.Y(phasename, 0, each): x for each, x in zip(components, xs)})
+        vars[V.R] = 8.31451
+        xdict = dict(zip(components, xs))
+        gm = subs(model.ast, vars) + sympify(sum(
+            [RedlichKister([xdict[each] for each in species], order, symbol)
+             for symbol, phase, species, order in params if phase == phasename],
+            0,
+        ))
+        gm = gm / sublattices[0]
+        gm = subs(gm, {xs[0]: 1.0 - sum(xs[1:])})
+
+        self.xxs = xs[1:]
+        self.params = [each[0] for each in params]
+        self.nominal = [0.0] * len(self.params)
+        args = self.xxs + [V.T] + self.params
+        grad = [diff(gm, x) for x in self.xxs]
+        hess = [[diff(each, x) for x in self.xxs] for each in grad]
+        self.gm = lambdify(args, gm)
+        self.grad = lambdify(args, grad)
+        self.hess = lambdify(args, hess)
+        self.dT = lambdify(args, [diff(gm, V.T)] + [diff(each, V.T) for each in grad])
+
+    @classmethod
+    def shared(cls, db, comps, phasename):
+        """
+        The Gibbs energy of the phase without perturbations, built once per system and shared by every pair of phases.
+        """
+        key = (id(db), tuple(comps), phasename)
+        with _lock:
+            if key not in _sharedphases or _sharedphases[key][0] is not db:
+                _sharedphases[key] = (db, cls(db, comps, phasename))
+            return _sharedphases[key][1]
+
+    def __call__(self, x, T):
+        """
+        Molar Gibbs energy, its gradient and Hessian at the independent mole fractions x.
+        """
+        args = list(x) + [T] + self.nominal
+        return (
+            float(self.gm(*args)),
+            np.array(self.grad(*args), dtype=float),
+            np.array(self.hess(*args), dtype=float),
+        )
+
+    def batch(self, x, T, p):
+        """
+        Molar Gibbs energies, gradients and Hessians of a batch of samples.
+
+        Parameters
+        -----------
+        x: array
+            Independent mole fractions with the shape (nsamples, ncomps - 1).
+        T: float
+            Given temperature.
+        p: array
+            Values of the perturbations with the shape (nsamples, len(params)).
+        """
+        x, p = np.asarray(x, dtype=float), np.asarray(p, dtype=float)
+        args = [x[:, i] for i in range(x.shape[1])] + [T] + [p[:, i] for i in range(p.shape[1])]
+        shape = x.shape[:1]
+        g = np.broadcast_to(self.gm(*args), shape)
+        grad = np.stack([np.broadcast_to(each, shape) for each in self.grad(*args)], axis=-1)
+        hess = np.stack(
+            [np.stack([np.broadcast_to(each, shape) for each in row], axis=-1) for row in self.hess(*args)], axis=-2
+        )
+        return g, grad, hess
+
+    def temperature(self, x, T):
+        """
+        Temperature derivatives of the molar Gibbs energy and of its gradient at the independent mole fractions x.
+        """
+        dT = np.array(self.dT(*(list(x) + [T] + self.nominal)), dtype=float)
+        return float(dT[0]), dT[1:]
+
+    def chemicalpotential(self, x, T):
+        """
+        Chemical potentials of components in the phase at the independent mole fractions x,
+        together with their derivatives.
+
+        Returns
+        -----------
+        A dictionary with
+        mu: chemical potentials of components.
+        x: derivatives with respect to the independent mole fractions, one row per component.
+        T: derivatives with respect to temperature.
+        """
+        x = np.asarray(x, dtype=float)
+        g, grad, hess = self(x, T)
+        gT, gradT = self.temperature(x, T)
+        mu0, dmu0, dmu0dT = g - x @ grad, -(hess @ x), gT - x @ gradT
+        return {
+            "mu": np.concatenate([[mu0], mu0 + grad]),
+            "x": np.vstack([dmu0, dmu0 + hess]),
+            "T": np.concatenate([[dmu0dT], dmu0dT + gradT]),
+        }
+
+    def chemicalpotentials(self, x, T, p):
+        """
+        Chemical potentials of components for a batch of samples, with the shape (nsamples, ncomps).
+        The arguments are the same as batch.
+        """
+        g, grad, _ = self.batch(x, T, p)
+        mu0 = g - np.einsum("si,si->s", np.asarray(x, dtype=float), grad)
+        return np.concatenate([mu0[:, None], mu0[:, None] + grad], axis=-1)
+
+
+class CommonTangent(object):
+    """
+    Two-phase equilibrium between two given phases, e.g. FCC_A1 and LIQUID,
+    solved by the Newton method on the common tangent and the lever rule.
+    Phases with several sublattices, e.g. GAMMA_PRIME, take part through their minimized Gibbs energies,
+    see OrderedGibbsEnergy.
+    The global equilibrium of pycalphad is used only for the initial guess of a cold start and for validation.
+
+    Parameters
+    -----------
+    db : Database
+        Database containing the relevant parameters.
+    comps: list
+        Names of components to consider in the calculation.
+    phasenames: list
+        Names of two phases.
+    tol: float
+        Tolerance of the residuals, with the Gibbs energies scaled by RT.
+    maxiter: int
+        Maximum number of Newton iterations.
+    params: list
+        Symbolic perturbations of interaction parameters, see PhaseGibbsEnergy.
+        They are zero except in solvemany, and both phases must be substitutional.
+    maxmodels: int
+        Maximum number of temperatures whose global equilibrium models are kept, the oldest is dropped first.
+    """
+
+    def __init__(self, db, comps, phasenames, tol=1.0e-10, maxiter=50, params=(), maxmodels=8):
+        self.db = db
+        self.comps = comps
+        self.phasenames = phasenames
+        self.tol = tol
+        self.maxiter = maxiter
+        self.maxmodels = maxmodels
+        if params and not all(substitutional(db, each) for each in phasenames):
+            raise ValueError("Perturbations of parameters require two substitutional phases, not %s." % phasenames)
+        self.phases = [
+            PhaseGibbsEnergy(db, comps, each, params) if params
+            else PhaseGibbsEnergy.shared(db, comps, each) if substitutional(db, each)
+            else OrderedGibbsEnergy.shared(db, comps, each)
+            for each in phasenames
+        ]
+        self.eqmodels = {}
+        self.lock = threading.RLock()
+
+    @classmethod
+    def shared(cls, db, comps, phasenames):
+        """
+        The common tangent solver of the two phases, built once per system and shared within the process.
+        The Gibbs energies keep the temperature symbolic, so one solver serves every temperature.
+        """
+        key = (id(db), tuple(comps), tuple(phasenames))
+        with _lock:
+            if key not in _shared or _shared[key].db is not db:
+                _shared[key] = cls(db, comps, phasenames)
+            return _shared[key]
+
+    @staticmethod
+    def supports(db, comps, phasenames):
+        """
+        Whether the two phases can be handled by the common tangent solver,
+        i.e. each phase is substitutional or has a pure end-member of every component.
+        """
+        return all(substitutional(db, each) or spanning(db, comps, each) for each in phasenames)
+
+    def residual(self, z, x0, T):
+        """
+        Residuals and Jacobian of the common tangent and the lever rule.
+
+        Parameters
+        -----------
+        z: array
+            Independent mole fractions of two phases followed by the fraction of the first phase.
+        x0: list
+            Initial alloy composition.
+        T: float
+            Given temperature.
+        """
+        m = len(x0)
+        xa, xb, f = z[:m], z[m : 2 * m], z[-1]
+        ga, dga, ha = self.phases[0](xa, T)
+        gb, dgb, hb = self.phases[1](xb, T)
+        RT = 8.31451 * T
+
+        F = np.concatenate(
+            [
+                (dga - dgb) / RT,
+                [((ga - xa @ dga) - (gb - xb @ dgb)) / RT],
+                f * xa + (1.0 - f) * xb - np.asarray(x0),
+            ]
+        )
+        J = np.zeros((2 * m + 1, 2 * m + 1))
+        J[:m, :m], J[:m, m : 2 * m] = ha / RT, -hb / RT
+        J[m, :m], J[m, m : 2 * m] = -(ha @ xa) / RT, (hb @ xb) / RT
+        J[m + 1 :, :m] = f * np.eye(m)
+        J[m + 1 :, m : 2 * m] = (1.0 - f) * np.eye(m)
+        J[m + 1 :, -1] = xa - xb
+        return F, J
+
+    def globalequilibrium(self, x0, T):
+        """
+        Two-phase equilibrium from the global minimization of pycalphad, used for cold starts and validation.
+        Returns None if the two phases are not in equilibrium at the initial alloy composition.
+        """
+        with self.lock:
+            if T not in self.eqmodels:
+                if len(self.eqmodels) >= self.maxmodels:
+                    self.eqmodels.pop(next(iter(self.eqmodels)))
+                self.eqmodels[T] = CoherentGibbsEnergy(
+                    T, self.db, self.comps, self.phasenames, slim=True
+                )
+            model = self.eqmodels[T]
+        if not set(self.phasenames).issubset(set(model.phase(list(x0)))):
+            return None
+        xeq = model.molefraction(list(x0))
+        return [[float(np.squeeze(each)) for each in phase] for phase in xeq]
+
+    def clear(self, T=None):
+        """
+        Drop the global equilibrium model at the given temperature, or at all temperatures by default.
+        """
+        with self.lock:
+            if T is None:
+                self.eqmodels = {}
+            else:
+                self.eqmodels.pop(T, None)
+
+    def solve(self, x0, T, guess=None):
+        """
+        Compositions, phase fractions and chemical potentials of the two-phase equilibrium.
+
+        Parameters
+        -----------
+        x0: list
+            Initial alloy composition.
+        T: float
+            Given temperature.
+        guess: list
+            Mole fractions of all components in two phases, e.g. the result at a neighbouring condition.
+            The global equilibrium is calculated for the initial guess if it is not given.
+
+        Returns
+        -----------
+        A dictionary with
+        x: mole fractions of components in two phases, as xeq of SigmaSolLiq.
+        fraction: phase fractions of two phases.
+        mu: chemical potentials of components.
+        region: whether the initial alloy composition lies in the two-phase region.
+        converged: whether the Newton iteration converged, otherwise the result of the global equilibrium is returned.
+        """
+        x0 = [float(each) for each in x0]
+        m = len(x0)
+        if guess is None:
+            guess = self.globalequilibrium(x0, T)
+            if guess is None:
+                return {"x": None, "fraction": None, "mu": None, "region": False, "converged": True}
+
+        xa, xb = np.asarray(guess[0][1:], dtype=float), np.asarray(guess[1][1:], dtype=float)
+        dxab = xa - xb
+        f = float(np.clip(dxab @ (np.asarray(x0) - xb) / max(dxab @ dxab, 1e-30), 0.0, 1.0))
+        z = np.concatenate([xa, xb, [f]])
+
+        converged = False
+        for _ in range(self.maxiter):
+            F, J = self.residual(z, x0, T)
+            if np.max(np.abs(F)) < self.tol:
+                converged = True
+                break
+            try:
+                dz = np.linalg.solve(J, -F)
+            except np.linalg.LinAlgError:
+                break
+            z = z + _damping(z[: 2 * m], dz[: 2 * m], m) * dz
+
+        if not converged:
+            reference = self.globalequilibrium(x0, T)
+            if reference is None:
+                return {"x": None, "fraction": None, "mu": None, "region": False, "converged": False}
+            xa, xb = np.asarray(reference[0][1:]), np.asarray(reference[1][1:])
+            dxab = xa - xb
+            z = np.concatenate([xa, xb, [dxab @ (np.asarray(x0) - xb) / max(dxab @ dxab, 1e-30)]])
+
+        xa, xb, f = z[:m], z[m : 2 * m], float(z[-1])
+        ga, dga, _ = self.phases[0](xa, T)
+        mu0 = ga - xa @ dga
+        return {
+            "x": [[float(1.0 - sum(x))] + [float(each) for each in x] for x in (xa, xb)],
+            "fraction": [f, 1.0 - f],
+            "mu": [float(each) for each in [mu0] + list(mu0 + dga)],
+            "region": bool(0.0 <= f <= 1.0),
+            "converged": converged,
+        }
+
+    def derivatives(self, x0, T, xeq):
+        """
+        Derivatives of the two-phase equilibrium with respect to temperature and the initial alloy composition,
+        from the implicit differentiation of the common tangent and the lever rule at the solution.
+
+        Parameters
+        -----------
+        x0: list
+            Initial alloy composition.
+        T: float
+            Given temperature.
+        xeq: list
+            Mole fractions of all components in two phases at the solution, as x of solve.
+
+        Returns
+        -----------
+        A dictionary with
+        x: derivatives of the mole fractions of components in two phases, with the shape (2, ncomps, 1 + len(x0)),
+            where the last axis runs over temperature and the independent components of x0.
+        mu: derivatives of the chemical potentials of components, with the shape (ncomps, 1 + len(x0)).
+        """
+        x0 = np.asarray(x0, dtype=float)
+        m = len(x0)
+        xa, xb = np.asarray(xeq[0][1:], dtype=float), np.asarray(xeq[1][1:], dtype=float)
+        dxab = xa - xb
+        f = float(dxab @ (x0 - xb) / max(dxab @ dxab, 1e-30))
+        _, J = self.residual(np.concatenate([xa, xb, [f]]), x0, T)
+
+        (gTa, dgTa), (gTb, dgTb) = self.phases[0].temperature(xa, T), self.phases[1].temperature(xb, T)
+        RT = 8.31451 * T
+        Fp = np.zeros((2 * m + 1, 1 + m))
+        Fp[:m, 0] = (dgTa - dgTb) / RT
+        Fp[m, 0] = ((gTa - xa @ dgTa) - (gTb - xb @ dgTb)) / RT
+        Fp[m + 1 :, 1:] = -np.eye(m)
+        dz = -np.linalg.solve(J, Fp)
+
+        dx = np.array(
+            [np.vstack([-dz[i * m : (i + 1) * m].sum(axis=0), dz[i * m : (i + 1) * m]]) for i in range(2)]
+        )
+        _, _, ha = self.phases[0](xa, T)
+        dmu0 = -(ha @ xa) @ dz[:m]
+        dmu0[0] += gTa - xa @ dgTa
+        dmu = np.vstack([dmu0, dmu0 + ha @ dz[:m]])
+        dmu[1:, 0] += dgTa
+        return {"x": dx, "mu": dmu}
+
+    def solvemany(self, x0, T, guess, p):
+        """
+        Two-phase equilibria at one initial alloy composition for a batch of samples of the perturbations,
+        solved by the Newton method for all samples at once.
+
+        Parameters
+        -----------
+        x0: list
+            Initial alloy composition.
+        T: float
+            Given temperature.
+        guess: list
+            Mole fractions of all components in two phases, e.g. the solution without perturbations.
+        p: array
+            Values of the perturbations with the shape (nsamples, len(params)).
+
+        Returns
+        -----------
+        A dictionary with
+        x: mole fractions of components in two phases, with the shape (nsamples, 2, ncomps).
+        mu: chemical potentials of components, with the shape (nsamples, ncomps).
+        fraction: fractions of the first phase.
+        converged: whether the Newton iteration converged for each sample.
+        """
+        x0, p = np.asarray(x0, dtype=float), np.atleast_2d(np.asarray(p, dtype=float))
+        m, ns = len(x0), p.shape[0]
+        xa, xb = np.asarray(guess[0][1:], dtype=float), np.asarray(guess[1][1:], dtype=float)
+        dxab = xa - xb
+        f = float(np.clip(dxab @ (x0 - xb) / max(dxab @ dxab, 1e-30), 0.0, 1.0))
+        z = np.tile(np.concatenate([xa, xb, [f]]), (ns, 1))
+        RT = 8.31451 * T
+
+        converged = np.zeros(ns, dtype=bool)
+        for _ in range(self.maxiter):
+            xa, xb, f = z[:, :m], z[:, m : 2 * m], z[:, -1:]
+            ga, dga, ha = self.phases[0].batch(xa, T, p)
+            gb, dgb, hb = self.phases[1].batch(xb, T, p)
+            F = np.concatenate(
+                [
+                    (dga - dgb) / RT,
+                    (((ga - np.einsum("si,si->s", xa, dga)) - (gb - np.einsum("si,si->s", xb, dgb))) / RT)[:, None],
+                    f * xa + (1.0 - f) * xb - x0,
+                ],
+                axis=-1,
+            )
+            converged = np.max(np.abs(F), axis=-1) < self.tol
+            if converged.all():
+                break
+            J = np.zeros((ns, 2 * m + 1, 2 * m + 1))
+            J[:, :m, :m], J[:, :m, m : 2 * m] = ha / RT, -hb / RT
+            J[:, m, :m] = -np.einsum("sij,sj->si", ha, xa) / RT
+            J[:, m, m : 2 * m] = np.einsum("sij,sj->si", hb, xb) / RT
+            J[:, m + 1 :, :m] = f[:, :, None] * np.eye(m)
+            J[:, m + 1 :, m : 2 * m] = (1.0 - f)[:, :, None] * np.eye(m)
+            J[:, m + 1 :, -1] = xa - xb
+            try:
+                dz = np.linalg.solve(J, -F[:, :, None])[:, :, 0]
+            except np.linalg.LinAlgError:
+                break
+            dz[converged] = 0.0
+            step = np.array([_damping(z[i, : 2 * m], dz[i, : 2 * m], m) for i in range(ns)])
+            z = z + step[:, None] * dz
+
+        xa, xb = z[:, :m], z[:, m : 2 * m]
+        ga, dga, _ = self.phases[0].batch(xa, T, p)
+        mu0 = ga - np.einsum("si,si->s", xa, dga)
+        return {
+            "x": np.stack([np.concatenate([1.0 - x.sum(axis=-1, keepdims=True), x], axis=-1) for x in (xa, xb)], axis=1),
+            "mu": np.concatenate([mu0[:, None], mu0[:, None] + dga], axis=-1),
+            "fraction": z[:, -1],
+            "converged": converged,
+        }
+
+    def validate(self, x0, T):
+        """
+        Compare the common tangent solution with the global equilibrium of pycalphad.
+        Returns the maximum deviation of the mole fractions, or None if the two results disagree on the phases.
+        """
+        reference = self.globalequilibrium(x0, T)
+        if reference is None:
+            return None
+        result = self.solve(x0, T, reference)
+        if result["x"] is None:
+            return None
+        return float(np.max(np.abs(np.array(result["x"]) - np.array(reference))))
+
+
+def _damping(x, dx, m, keep=0.99):
+    """
+    The step length keeping the mole fractions of both phases inside the composition simplex.
+    """
+    step = 1.0
+    for xs, dxs in ((x[:m], dx[:m]), (x[m:], dx[m:])):
+        x1, dx1 = 1.0 - sum(xs), -sum(dxs)
+        for xi, dxi in zip(list(xs) + [x1], list(dxs) + [dx1]):
+            if dxi < 0.0:
+                step = min(step, keep * xi / -dxi)
+    return step
@@ -5,10 +5,10 @@ Construct the function of calculating the melting enthalpy of the pure metal.
 from pycalphad import equilibrium
 from pycalphad import Database, Model
 import pycalphad.variables as V
-from sympy import lambdify, symbols, sympify, diff
+from openiec.utils.symbolic import lambdify, subs, diff, sympify
+from openiec.property.orderedenergy import _constituents
 from functools import reduce
 import numpy as np
-import matplotlib.pyplot as plt
 from scipy.optimize import fsolve
 
 
@@ -27,11 +27,21 @@ def RenderPhas(db, comp, phasename):
     """
     model = Model(db, [comp, "VA"], phasename)
     gm = model.ast
-    vars = {V.Y(phasename, 1, "VA"): 1.0, V.R: 8.31451, V.Y(phasename, 0, comp): 1.0}
-    gm = gm.subs(vars)
+
+    """The pure end-member occupies every sublattice, alone or together with vacancies"""
+    vars = {V.R: 8.31451}
+    for i, subl in enumerate(_constituents(db, [comp], phasename)):
+        if comp in subl:
+            vars[V.Y(phasename, i, comp)] = 1.0
+        elif "VA" in subl:
+            vars[V.Y(phasename, i, "VA")] = 1.0
+        else:
+            raise ValueError("%s forms no pure end-member of %s." % (comp, phasename))
+    gm = subs(gm, vars)
+    T = sympify(V.T)
     return {
-        "gm": lambdify(V.T, gm, "numpy", dummify=True),
-        "hm": lambdify(V.T, -V.T ** 2 * diff(gm / V.T, V.T), "numpy", dummify=True),
+        "gm": lambdify(V.T, gm),
+        "hm": lambdify(V.T, -T ** 2 * diff(gm / T, T)),
     }
 
 
@@ -58,6 +68,8 @@ def MeltingEnthalpy(db, comp, phasenames, debug=False):
     v = f(x)
 
     if debug:
+        import matplotlib.pyplot as plt
+
         plt.plot(x, v, "-", label="diff")
         plt.plot(x, v * 0.0, "--", label="zero")
         plt.plot(x, falpha(x), label="%s" % phasenames[0])
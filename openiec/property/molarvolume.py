@@ -6,7 +6,9 @@ import numpy as np
 import sympy as sy
 import pycalphad.variables as V
 from pycalphad import Database, Model
-from sympy import lambdify, symbols, sympify, diff
+from sympy import symbols, sympify
+from openiec.utils.symbolic import lambdify, subs, diff
+from openiec.utils.kernels import Kernel
 import itertools
 from functools import reduce
 
@@ -25,8 +27,16 @@ class MolarVolume(object):
         Names of the phase to consider in the calculation.    
     purevm: list 
         The molar volume of the components.
+    intervm: dict or list
+        Redlich-Kister parameters of the excess molar volume, keyed by the interacting components.
+        example:
+            intervm = {("AL", "NI"): ["-1.0*10.0**(-6.0)", "0.2*10.0**(-6.0)*T"]}
+            where the two expressions are the 0th and 1st order parameters of the Al-Ni interaction.
+        Interaction parameters of the type V0 in the database, e.g. V0(FCC_A1,AL,NI:VA;0), are added as well.
     vm: a sympy expression
         The molar volume of the bulk phase.
+    exvm: a sympy expression
+        The excess molar volume of the bulk phase.
     """
 
     def __init__(self, db, phasename, comps, purevm, intervm=[]):
@@ -35,10 +45,115 @@ class MolarVolume(object):
             (self.xs[0], 1.0 - sum([self.xs[i] for i in range(1, len(self.xs))]))
         ]
         self.xxs = [self.xs[i] for i in range(1, len(self.xs))]
-        self.vm = reduce(
+        self.idvm = reduce(
             lambda x, y: x + y, [x * sympify(v) for x, v in zip(self.xs, purevm)]
         ).subs({"T": V.T})
 
+        components = [each for each in comps if each != "VA"]
+        params = _dbintervm(db, phasename, components)
+        items = intervm.items() if isinstance(intervm, dict) else intervm
+        for species, coefs in items:
+            for order, coef in enumerate(coefs):
+                params.append((tuple(species), order, sympify(coef).subs({"T": V.T})))
+
+        """A single 0th order ternary parameter implies the symmetric 1st and 2nd order parameters"""
+        ternaries = [(species, order) for species, order, _ in params if len(species) == 3]
+        params += [
+            (species, order, param)
+            for species, _, param in params
+            if len(species) == 3
+            and all((species, order) not in ternaries for order in (1, 2))
+            for order in (1, 2)
+        ]
+
+        xdict = dict(zip(components, self.xs))
+        self.exvm = sum(
+            [RedlichKister([xdict[each] for each in species], order, param)
+             for species, order, param in params],
+            sy.S.Zero,
+        )
+        self.vm = self.idvm + self.exvm
+
+
+def RedlichKister(xs, order, param):
+    """
+    Construct a Redlich-Kister term of the excess molar volume.
+    Binary terms follow the Redlich-Kister polynomial, and ternary terms follow the Muggianu extension.
+
+    Parameters
+    -----------
+    xs: list
+        Mole fractions of the interacting components.
+    order: int
+        Order of the interaction parameter.
+    param: a sympy expression
+        The interaction parameter.
+    """
+    term = reduce(lambda x, y: x * y, xs) * param
+    if len(xs) == 2:
+        return term * (xs[0] - xs[1]) ** order
+    if len(xs) == 3:
+        v = xs[order] + (1 - sum(xs)) / 3
+        return term * v
+    raise ValueError("Interactions of more than three components are not supported.")
+
+
+def _dbintervm(db, phasename, components):
+    """
+    Read the V0 interaction parameters of the phase from the database.
+    Only interactions on the first sublattice among the given components are considered.
+
+    Parameters
+    -----------
+    db : Database
+        Database containing the relevant parameters.
+    phasename : str
+        Names of the phase to consider in the calculation.
+    components: list
+        Names of components to consider in the calculation, without VA.
+    """
+    if db is None or not hasattr(db, "search"):
+        return []
+
+    from tinydb import where
+
+    params = []
+    for each in db.search(
+        (where("phase_name") == phasename) & (where("parameter_type") == "V0")
+    ):
+        constituents = [
+            [getattr(c, "name", c) for c in subl] for subl in each["constituent_array"]
+        ]
+        species = constituents[0]
+        if len(species) < 2 or not set(species).issubset(components):
+            continue
+        if any(set(subl) != {"VA"} for subl in constituents[1:]):
+            continue
+        params.append((tuple(species), each["parameter_order"], each["parameter"]))
+    return params
+
+
+def _interfacialpartials(alphavm, betavm):
+    """
+    Construct the symbolic expressions of the partial molar volumes of components in the interface.
+
+    Parameters
+    -----------
+    alphavm: MolarVolume
+        The molar volume of a bulk phase.
+    betavm: MolarVolume
+        The molar volume of another bulk phase.
+    """
+    xs = alphavm.xs
+    vm = 0.5 * (alphavm.vm + betavm.vm)
+    dvmdxs = [diff(vm, x) for x in xs]
+
+    sumvmi = reduce(lambda x, y: x + y, [x * dvmdx for x, dvmdx in zip(xs, dvmdxs)])
+
+    vmis = [vm + dvmdx - sumvmi for dvmdx in dvmdxs]
+
+    return [subs(vmi, alphavm.vars_xs) for vmi in vmis]
+
 
 def InterficialMolarVolume(alphavm, betavm):
     """
@@ -55,15 +170,83 @@ def InterficialMolarVolume(alphavm, betavm):
     vmis: list
         The partial molar volumes of components in the interface.
     """
-    xs = alphavm.xs
-    vm = 0.5 * (alphavm.vm + betavm.vm)
-    dvmdxs = [diff(vm, x) for x in xs]
+    vmis = _interfacialpartials(alphavm, betavm)
 
-    sumvmi = reduce(lambda x, y: x + y, [x * dvmdx for x, dvmdx in zip(xs, dvmdxs)])
+    return [lambdify((alphavm.xxs, V.T), vmi) for vmi in vmis]
 
-    vmis = [vm + dvmdx - sumvmi for dvmdx in dvmdxs]
 
-    return [lambdify((alphavm.xxs, V.T), vmi, "numpy", dummify=True) for vmi in vmis]
+class CompiledInterficialMolarVolume(object):
+    """
+    Construct the partial molar volumes of all components in the interface as one compiled kernel, see Kernel.
+    Temperature is a runtime argument, and compositions and temperatures are broadcast against each other,
+    so a batch of conditions is evaluated in one vectorized call.
+
+    Parameters
+    -----------
+    alphavm: MolarVolume
+        The molar volume of a bulk phase.
+    betavm: MolarVolume
+        The molar volume of another bulk phase.
+    params: list
+        Free symbols of the molar volumes, e.g. uncertain parameters in purevm,
+        passed as trailing arguments after temperature.
+
+    Example
+    -----------
+        vmis = CompiledInterficialMolarVolume(alphavm, betavm)
+        vmis([0.1], 800.0)                   # shape (ncomps,)
+        vmis([[0.1], [0.2]], [800.0, 900.0])   # shape (ncomps, 2)
+        vmis.scalar([0.1], 800.0)            # tuple of ncomps floats
+    """
+
+    def __init__(self, alphavm, betavm, params=()):
+        self.xxs = alphavm.xxs
+        self.params = list(params)
+        self.exprs = _interfacialpartials(alphavm, betavm)
+        self.kernel = Kernel(self.xxs + [V.T] + self.params, self.exprs)
+        self.dfunc = None
+
+    def __call__(self, x, T, *p):
+        """
+        Compute the partial molar volumes of components.
+
+        Parameters
+        ----------
+        x: array_like
+            Interfacial compositions with the last axis running over the independent components.
+        T: array_like
+            Temperatures, broadcast against the leading axes of x.
+        p: array_like
+            Values of params, broadcast in the same way.
+        """
+        x = np.asarray(x, dtype=float)
+        return self.kernel.batch(*([x[..., i] for i in range(len(self.xxs))] + [T] + list(p)))
+
+    def scalar(self, x, T, *p):
+        """
+        Compute the partial molar volumes of components at a single condition, as a tuple of floats.
+        """
+        return self.kernel.scalar(*(list(x) + [T] + list(p)))
+
+    def jacobian(self, x, T, *p):
+        """
+        Derivatives of the partial molar volumes of components at a single condition,
+        with the shape (ncomps, len(x) + 1), where the columns run over the independent components and temperature.
+        The derivatives are compiled at the first call.
+
+        Parameters
+        ----------
+        x: list
+            Interfacial composition.
+        T: float
+            Given temperature.
+        """
+        if self.dfunc is None:
+            self.dfunc = lambdify(
+                self.xxs + [V.T] + self.params,
+                [[diff(each, s) for s in self.xxs + [V.T]] for each in self.exprs],
+            )
+        return np.array(self.dfunc(*(list(x) + [T] + list(p))), dtype=float)
 
 
 if __name__ == "__main__":
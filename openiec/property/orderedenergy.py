@@ -0,0 +1,348 @@
+"""
+Construct the molar Gibbs energy of a phase with several sublattices, e.g. an ordered phase like GAMMA_PRIME,
+as a function of mole fractions, by a compiled minimization over the site fractions.
+"""
+
+from pycalphad import Model
+import pycalphad.variables as V
+from openiec.utils.symbolic import lambdifyvector, subs, diff, sympify
+import threading
+import numpy as np
+
+_shared = {}
+_lock = threading.RLock()
+
+
+def _constituents(db, comps, phasename):
+    """
+    Names of the constituents of each sublattice of the phase, restricted to the given components and VA.
+    """
+    comps = set(comps) | {"VA"}
+    return [
+        sorted(set(getattr(c, "name", c) for c in subl) & comps)
+        for subl in db.phases[phasename].constituents
+    ]
+
+
+def spanning(db, comps, phasename):
+    """
+    Whether every component forms a pure end-member of the phase, i.e. it occupies every sublattice
+    either alone or together with vacancies, so that the phase covers the whole composition simplex.
+
+    Parameters
+    -----------
+    db : Database
+        Database containing the relevant parameters.
+    comps: list
+        Names of components to consider in the calculation.
+    phasename: str
+        Name of the phase.
+    """
+    constituents = _constituents(db, comps, phasename)
+    return all(
+        all(each in subl or "VA" in subl for subl in constituents)
+        for each in comps if each != "VA"
+    )
+
+
+class OrderedGibbsEnergy(object):
+    """
+    Construct the molar Gibbs energy of a phase with several sublattices as a function of mole fractions and temperature,
+    with the same interface as PhaseGibbsEnergy, so that the phase can take part in common tangents and interfaces.
+
+    At given mole fractions, the Gibbs energy per mole of atoms is minimized over the site fractions
+    under the constraints of the mole fractions and of the site fractions on each sublattice, by the Newton method
+    on the Lagrange conditions. The residuals and their Jacobian are compiled into one function
+    with the common subexpressions eliminated, as the Hessians of ordered phases are large.
+    The Lagrange multipliers of the mole fractions are the gradient of the molar Gibbs energy,
+    and its Hessian follows from the implicit differentiation of the Lagrange conditions at the minimum.
+
+    The minimization starts from the disordered site fractions and from each component enriched on each sublattice,
+    and the lowest minimum is kept, so that ordered states are found. Solutions are kept on a coarse grid
+    of compositions per temperature, and later compositions in the same cell start from them.
+    The latest solution, from which the next composition starts, is kept per thread, so that threads may share the phase.
+
+    Parameters
+    -----------
+    db : Database
+        Database containing the relevant parameters.
+    comps: list
+        Names of components to consider in the calculation.
+    phasename: str
+        Name of the phase.
+    tol: float
+        Tolerance of the residuals, with the Gibbs energies scaled by RT.
+    maxiter: int
+        Maximum number of Newton iterations.
+    cell: float
+        Width of the cells of compositions sharing a starting point.
+    """
+
+    def __init__(self, db, comps, phasename, tol=1.0e-10, maxiter=50, cell=0.05):
+        self.phasename = phasename
+        self.tol = tol
+        self.maxiter = maxiter
+        self.cell = cell
+        self.components = [each for each in comps if each != "VA"]
+        self.constituents = _constituents(db, comps, phasename)
+        self.ratios = [float(each) for each in db.phases[phasename].sublattices]
+        if not all(any(c != "VA" for c in subl) or "VA" in subl for subl in self.constituents):
+            raise ValueError("%s has an empty sublattice for %s." % (phasename, self.components))
+
+        model = Model(db, comps, phasename)
+        self.sites = [(s, c) for s, subl in enumerate(self.constituents) for c in subl]
+        ys = [V.Y(phasename, s, c) for s, c in self.sites]
+        ydict = dict(zip(self.sites, ys))
+        gm = subs(model.ast, {V.R: 8.31451})
+
+        """Mole fractions of the independent components as functions of the site fractions"""
+        atoms = [
+            sum([self.ratios[s] * ydict[(s, c)] for s, c in self.sites if c == each], 0)
+            for each in self.components
+        ]
+        total = sum(atoms, 0)
+        xs = [each / total for each in atoms[1:]]
+
+        m, n = len(self.components) - 1, len(ys)
+        nus = [sympify("NU%d" % i) for i in range(m)]
+        grad = [diff(gm, y) for y in ys]
+        dxs = [[diff(x, y) for y in ys] for x in xs]
+        residual = [grad[j] - sum([nus[i] * dxs[i][j] for i in range(m)], 0) for j in range(n)]
+        hess = [[diff(each, y) for y in ys] for each in residual]
+        gT = diff(gm, V.T)
+
+        self.n, self.m = n, m
+        self.func = lambdifyvector(
+            ys + nus + [V.T],
+            [gm, gT] + residual + sum(hess, []) + sum(dxs, []) + xs + [diff(gT, y) for y in ys],
+            cse=True,
+        )
+
+        """Sum of the site fractions of each sublattice"""
+        self.E = np.zeros((n, len(self.constituents)))
+        for j, (s, c) in enumerate(self.sites):
+            self.E[j, s] = 1.0
+        self.solutions = {}
+        self.local = threading.local()
+
+    @classmethod
+    def shared(cls, db, comps, phasename):
+        """
+        The Gibbs energy of the phase, built once per system and shared by every pair of phases.
+        """
+        key = (id(db), tuple(comps), phasename)
+        with _lock:
+            if key not in _shared or _shared[key][0] is not db:
+                _shared[key] = (db, cls(db, comps, phasename))
+            return _shared[key][1]
+
+    def _evaluate(self, y, nu, T):
+        n, m = self.n, self.m
+        v = self.func(np.concatenate([y, nu, [T]]))
+        i = 2
+        residual = v[i : i + n]
+        i += n
+        hess = v[i : i + n * n].reshape(n, n)
+        i += n * n
+        dxs = v[i : i + m * n].reshape(m, n)
+        i += m * n
+        xs = v[i : i + m]
+        i += m
+        return v[0], v[1], residual, hess, dxs, xs, v[i : i + n]
+
+    def _jacobian(self, hess, dxs):
+        n, m, k = self.n, self.m, self.E.shape[1]
+        J = np.zeros((n + m + k, n + m + k))
+        J[:n, :n] = hess
+        J[:n, n : n + m] = -dxs.T
+        J[:n, n + m :] = -self.E
+        J[n : n + m, :n] = dxs
+        J[n + m :, :n] = self.E.T
+        return J
+
+    def _newton(self, y, x, T, multipliers=None):
+        """
+        Minimize the Gibbs energy from the site fractions y at the independent mole fractions x.
+        Returns the site fractions, the multipliers of the mole fractions and of the sublattices and the Jacobian,
+        or None without convergence.
+        """
+        n, m = self.n, self.m
+        RT = 8.31451 * T
+        y = np.array(y, dtype=float)
+
+        if multipliers is None:
+            """Multipliers fitted to the gradient at the starting point"""
+            _, _, residual, _, dxs, _, _ = self._evaluate(y, np.zeros(m), T)
+            A = np.hstack([dxs.T, self.E])
+            lam = np.linalg.lstsq(A, residual, rcond=None)[0]
+            nu, mult = lam[:m], lam[m:]
+        else:
+            nu, mult = multipliers
+
+        for _ in range(self.maxiter):
+            g, _, residual, hess, dxs, xs, _ = self._evaluate(y, nu, T)
+            F = np.concatenate([residual - self.E @ mult, xs - x, self.E.T @ y - 1.0])
+            if not np.all(np.isfinite(F)):
+                return None
+            J = self._jacobian(hess, dxs)
+            if max(np.max(np.abs(F[:n])) / RT, np.max(np.abs(F[n:]))) < self.tol:
+                return y, nu, mult, J
+            try:
+                dz = np.linalg.solve(J, -F)
+            except np.linalg.LinAlgError:
+                return None
+            dy = dz[:n]
+            step = 1.0
+            if np.any(dy < 0.0):
+                step = min(1.0, 0.99 * np.min(y[dy < 0.0] / -dy[dy < 0.0]))
+            y = y + step * dy
+            nu = nu + step * dz[n : n + m]
+            mult = mult + step * dz[n + m :]
+        return None
+
+    def _starts(self, x):
+        """
+        Starting site fractions: the disordered state and each component enriched on each sublattice.
+        """
+        xx = np.array([1.0 - sum(x)] + list(x), dtype=float)
+        xx = np.maximum(xx, 1e-6)
+        weights = dict(zip(self.components, xx))
+
+        def sites(enrich=None):
+            y = np.zeros(self.n)
+            for s, subl in enumerate(self.constituents):
+                w = np.array([
+                    (1.0 if c == "VA" else weights[c])
+                    * (10.0 if enrich == (s, c) else 0.1 if enrich is not None and c == enrich[1] else 1.0)
+                    for c in subl
+                ])
+                index = [j for j, (t, _) in enumerate(self.sites) if t == s]
+                y[index] = w / w.sum()
+            return y
+
+        starts = [sites()]
+        if len(self.constituents) > 1:
+            starts += [sites((s, c)) for s, c in self.sites if c != "VA" and len(self.constituents[s]) > 1]
+        return starts
+
+    def solve(self, x, T):
+        """
+        Site fractions at the minimum of the Gibbs energy at the independent mole fractions x.
+
+        Returns
+        -----------
+        A tuple of the site fractions, the multipliers of the mole fractions, which are the gradient
+        of the molar Gibbs energy, and the Jacobian of the Lagrange conditions.
+        """
+        x = np.asarray(x, dtype=float)
+        key = (float(T),) + tuple(np.round(x / self.cell).astype(int))
+        latest, start = getattr(self.local, "latest", None), self.solutions.get(key)
+        if start is not None:
+            """Start from the latest solution if it lies in the same cell, which is the usual case in iterations"""
+            if latest is not None and latest[0] == key:
+                res = self._newton(latest[1][0], x, T, latest[1][1:3])
+            else:
+                res = self._newton(start, x, T)
+            if res is not None:
+                self.local.latest = (key, res)
+                return res
+
+        best, gbest = None, np.inf
+        for y in self._starts(x):
+            res = self._newton(y, x, T)
+            if res is None:
+                continue
+            g = self._evaluate(res[0], res[1], T)[0]
+            if g < gbest:
+                best, gbest = res, g
+        if best is None:
+            raise ValueError("The site fractions of %s at %s and %s K did not converge." % (self.phasename, list(x), T))
+        if len(self.solutions) >= 100000:
+            self.solutions = {}
+        self.solutions[key] = best[0]
+        self.local.latest = (key, best)
+        return best
+
+    def __call__(self, x, T):
+        """
+        Molar Gibbs energy, its gradient and Hessian at the independent mole fractions x.
+        """
+        y, nu, mult, J = self.solve(x, T)
+        n, m = self.n, self.m
+        rhs = np.zeros((len(J), m))
+        rhs[n : n + m] = np.eye(m)
+        hess = np.linalg.solve(J, rhs)[n : n + m]
+        g = self._evaluate(y, nu, T)[0]
+        return float(g), np.array(nu), 0.5 * (hess + hess.T)
+
+    def temperature(self, x, T):
+        """
+        Temperature derivatives of the molar Gibbs energy and of its gradient at the independent mole fractions x.
+        """
+        y, nu, mult, J = self.solve(x, T)
+        n, m = self.n, self.m
+        _, gT, _, _, _, _, dgTdy = self._evaluate(y, nu, T)
+        rhs = np.zeros(len(J))
+        rhs[:n] = -dgTdy
+        return float(gT), np.linalg.solve(J, rhs)[n : n + m]
+
+    def chemicalpotential(self, x, T):
+        """
+        Chemical potentials of components in the phase at the independent mole fractions x,
+        together with their derivatives, see PhaseGibbsEnergy.chemicalpotential.
+        """
+        x = np.asarray(x, dtype=float)
+        g, grad, hess = self(x, T)
+        gT, gradT = self.temperature(x, T)
+        mu0, dmu0, dmu0dT = g - x @ grad, -(hess @ x), gT - x @ gradT
+        return {
+            "mu": np.concatenate([[mu0], mu0 + grad]),
+            "x": np.vstack([dmu0, dmu0 + hess]),
+            "T": np.concatenate([[dmu0dT], dmu0dT + gradT]),
+        }
+
+    def references(self, T):
+        """
+        Molar Gibbs energies of the pure end-members of components and their temperature derivatives.
+        """
+        if not hasattr(self, "_endmembers"):
+            self._endmembers = []
+            for each in self.components:
+                if not all(each in subl or "VA" in subl for subl in self.constituents):
+                    raise ValueError("%s has no pure end-member of %s." % (self.phasename, each))
+                y = np.array([
+                    1.0 if c == each or (c == "VA" and each not in self.constituents[s]) else 0.0
+                    for s, c in self.sites
+                ])
+                self._endmembers.append(y)
+        values = [self._evaluate(y, np.zeros(self.m), T)[:2] for y in self._endmembers]
+        return np.array([each[0] for each in values]), np.array([each[1] for each in values])
+
+    def partialexcess(self, x, T, derivatives=True):
+        """
+        Partial molar excess Gibbs energies of components at the independent mole fractions x,
+        relative to the pure end-members and the ideal substitutional mixing, mu_i - G_i - RT ln(x_i).
+
+        Returns
+        -----------
+        A dictionary with
+        pexgm: partial excess Gibbs energies of components.
+        x: derivatives with respect to the independent mole fractions, one row per component, if derivatives.
+        T: derivatives with respect to temperature, if derivatives.
+        """
+        x = np.asarray(x, dtype=float)
+        xx = np.concatenate([[1.0 - x.sum()], x])
+        R = 8.31451
+        g0, g0T = self.references(T)
+        if not derivatives:
+            y, nu = self.solve(x, T)[:2]
+            mu0 = self._evaluate(y, nu, T)[0] - x @ nu
+            return {"pexgm": np.concatenate([[mu0], mu0 + nu]) - g0 - R * T * np.log(xx)}
+
+        mu = self.chemicalpotential(x, T)
+        dlnx = np.vstack([-np.ones(len(x)) / xx[0], np.diag(1.0 / x)])
+        return {
+            "pexgm": mu["mu"] - g0 - R * T * np.log(xx),
+            "x": mu["x"] - R * T * dlnx,
+            "T": mu["T"] - g0T - R * np.log(xx),
+        }
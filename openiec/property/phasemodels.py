@@ -0,0 +1,108 @@
+"""
+Share the models of each phase among all interfaces it takes part in.
+"""
+
+from openiec.property.coherentenergy import CoherentGibbsEnergy
+from openiec.property.meltingenthalpy import MeltingEnthalpy
+from openiec.property.molarvolume import MolarVolume, CompiledInterficialMolarVolume
+from openiec.property.solliqenergy import SolutionGibbsEnergy, InterfacialGibbsEnergy
+import threading
+
+
+class PhaseModels(object):
+    """
+    Build the models of phases in a database once and return the same instances to every interface,
+    e.g. the LIQUID models of both FCC_A1/LIQUID and BCC_A2/LIQUID.
+    Models depending on temperature are kept per temperature.
+    The models do not change after they are built, so they may be shared by threads, and each is built once under a lock.
+
+    Parameters
+    -----------
+    db : Database
+        Database containing the relevant parameters.
+    comps: list
+        Names of components to consider in the calculation.
+    """
+
+    def __init__(self, db, comps):
+        self.db = db
+        self.comps = comps
+        self.models = {}
+        self.lock = threading.RLock()
+
+    def _get(self, key, build):
+        with self.lock:
+            if key not in self.models:
+                self.models[key] = build()
+            return self.models[key]
+
+    def molarvolume(self, phasename, purevm, intervm=[]):
+        """
+        The molar volume of the phase, see MolarVolume.
+        """
+        return self._get(
+            ("molarvolume", phasename, repr(purevm), repr(intervm)),
+            lambda: MolarVolume(self.db, phasename, self.comps, purevm, intervm),
+        )
+
+    def interfacialvolume(self, phasenames, purevms, intervms=[]):
+        """
+        The partial molar volumes in the interface of two phases, see CompiledInterficialMolarVolume.
+        """
+        intervms = intervms if intervms else [[], []]
+        return self._get(
+            ("interfacialvolume", tuple(phasenames), repr(purevms), repr(intervms)),
+            lambda: CompiledInterficialMolarVolume(
+                *[self.molarvolume(phasenames[i], purevms[i], intervms[i]) for i in range(2)]
+            ),
+        )
+
+    def solution(self, T, phasename):
+        """
+        The partial excess Gibbs energies of the phase at the temperature, see SolutionGibbsEnergy.
+        """
+        return self._get(
+            ("solution", T, phasename),
+            lambda: SolutionGibbsEnergy(T, self.db, self.comps, phasename),
+        )
+
+    def interfacial(self, T, phasenames):
+        """
+        The partial excess Gibbs energies in the interface of two phases at the temperature, see InterfacialGibbsEnergy.
+        """
+        return self._get(
+            ("interfacial", T, tuple(phasenames)),
+            lambda: InterfacialGibbsEnergy(T, self.db, self.comps, phasenames),
+        )
+
+    def equilibrium(self, T, phasename, pdens=None):
+        """
+        The equilibrium model of one phase or several phases at the temperature, see CoherentGibbsEnergy.
+        """
+        phases = phasename if isinstance(phasename, str) else tuple(phasename)
+        return self._get(
+            ("equilibrium", T, phases, pdens),
+            lambda: CoherentGibbsEnergy(T, self.db, self.comps, phasename, pdens, slim=True),
+        )
+
+    def meltingenthalpy(self, comp, phasenames, debug=False):
+        """
+        The melting enthalpy of the pure component between the solid and the liquid phases, see MeltingEnthalpy.
+        """
+        return self._get(
+            ("meltingenthalpy", comp, tuple(phasenames)),
+            lambda: MeltingEnthalpy(self.db, comp, phasenames, debug),
+        )
+
+    def clear(self, T=None):
+        """
+        Remove the models at the temperature, or all models if T is None.
+        """
+        with self.lock:
+            if T is None:
+                self.models = {}
+            else:
+                self.models = {
+                    key: value for key, value in self.models.items()
+                    if key[0] not in ("solution", "interfacial", "equilibrium") or key[1] != T
+                }
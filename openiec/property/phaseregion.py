@@ -0,0 +1,152 @@
+"""
+Classify alloy compositions by whether they lie in the two-phase region of the phases separated by the interface.
+"""
+
+from openiec.property.coherentenergy import CoherentGibbsEnergy
+from openiec.property.commontangent import CommonTangent
+import threading
+
+_shared = {}
+_lock = threading.RLock()
+
+
+class PhaseRegion(object):
+    """
+    A cheap and cached check of the two-phase region, done before any model of the interface is built.
+
+    When both phases are supported by CommonTangent, the check is a Newton solve of the common tangent and the lever rule,
+    started from the latest tie-line found at the same temperature, and the composition lies in the two-phase region
+    if the phase fraction is between 0 and 1. Otherwise, or for the first composition at a temperature,
+    the global equilibrium of the two phases is calculated. Results are cached per temperature and composition.
+    The caches are guarded by a lock, so that the classifier may be shared by threads.
+
+    Parameters
+    -----------
+    db : Database
+        Database containing the relevant parameters.
+    comps: list
+        Names of components to consider in the calculation.
+    phasenames: list
+        Names of two phases.
+    pdens: int
+        Number of points sampled per degree of freedom of each phase in the global equilibrium calculations.
+    maxcache: int
+        Maximum number of cached results.
+    maxmodels: int
+        Maximum number of temperatures whose global equilibrium models are kept, the oldest is dropped first.
+    """
+
+    def __init__(self, db, comps, phasenames, pdens=None, maxcache=100000, maxmodels=8):
+        self.db = db
+        self.comps = comps
+        self.phasenames = phasenames
+        self.pdens = pdens
+        self.maxcache = maxcache
+        self.maxmodels = maxmodels
+        self.tangent = (
+            CommonTangent.shared(db, comps, phasenames)
+            if CommonTangent.supports(db, comps, phasenames)
+            else None
+        )
+        self.eqmodels = {}
+        self.tielines = {}
+        self.results = {}
+        self.lock = threading.RLock()
+
+    @classmethod
+    def shared(cls, db, comps, phasenames, pdens=None):
+        """
+        The classifier of the two phases, built once per system and shared within the process.
+        """
+        key = (id(db), tuple(comps), tuple(phasenames), pdens)
+        with _lock:
+            if key not in _shared or _shared[key].db is not db:
+                _shared[key] = cls(db, comps, phasenames, pdens)
+            return _shared[key]
+
+    def eqmodel(self, T):
+        """
+        The two-phase equilibrium model at the given temperature, built once per temperature.
+        """
+        with self.lock:
+            if T not in self.eqmodels:
+                if len(self.eqmodels) >= self.maxmodels:
+                    self.eqmodels.pop(next(iter(self.eqmodels)))
+                self.eqmodels[T] = CoherentGibbsEnergy(
+                    T, self.db, self.comps, self.phasenames, self.pdens, slim=True
+                )
+            return self.eqmodels[T]
+
+    def clear(self, T=None):
+        """
+        Drop the models, tie-lines and results cached at the given temperature, or at all temperatures by default,
+        e.g. once a sweep has moved on to other temperatures.
+        """
+        with self.lock:
+            if T is None:
+                self.eqmodels, self.tielines, self.results = {}, {}, {}
+            else:
+                self.eqmodels.pop(T, None)
+                self.tielines.pop(T, None)
+                self.results = {k: v for k, v in self.results.items() if k[0] != float(T)}
+        if self.tangent is not None:
+            self.tangent.clear(T)
+
+    def check(self, x0, T, guess=None):
+        """
+        Whether the initial alloy composition lies in the two-phase region at the given temperature,
+        together with the two-phase equilibrium if it does.
+
+        Parameters
+        -----------
+        x0: list
+            Initial alloy composition.
+        T: float
+            Given temperature.
+        guess: list
+            Two-phase equilibrium composition at a neighbouring condition.
+
+        Returns
+        -----------
+        A dictionary with
+        region: whether the composition lies in the two-phase region.
+        xeq: mole fractions of components in two phases, None outside the two-phase region.
+        mueq: chemical potentials of components, None outside the two-phase region.
+        """
+        x0 = [float(each) for each in x0]
+        key = (float(T),) + tuple(round(each, 12) for each in x0)
+        with self.lock:
+            if key in self.results:
+                return self.results[key]
+
+        res = self._check(x0, T, guess)
+
+        with self.lock:
+            if len(self.results) >= self.maxcache:
+                self.results = {}
+            self.results[key] = res
+        return res
+
+    def _check(self, x0, T, guess):
+        if self.tangent is not None:
+            if guess is None:
+                with self.lock:
+                    guess = self.tielines.get(T)
+            sol = self.tangent.solve(x0, T, guess)
+            if not sol["region"] and guess is not None and len(x0) > 1:
+                """In multicomponent systems, the extension of a tie-line may cross the two-phase region"""
+                sol = self.tangent.solve(x0, T)
+            if not sol["region"]:
+                return {"region": False, "xeq": None, "mueq": None}
+            with self.lock:
+                self.tielines[T] = sol["x"]
+            return {"region": True, "xeq": sol["x"], "mueq": sol["mu"]}
+
+        model = self.eqmodel(T)
+        if not set(self.phasenames).issubset(set(model.phase(x0))):
+            return {"region": False, "xeq": None, "mueq": None}
+        return {
+            "region": True,
+            "xeq": model.molefraction(x0),
+            "mueq": model.chemicalpotential(x0),
+        }
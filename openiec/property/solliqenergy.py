@@ -5,8 +5,13 @@ Construct partial excess Gibbs energy expressions of the bulk phase and the inte
 from pycalphad import equilibrium
 from pycalphad import Database, Model
 import pycalphad.variables as V
-from sympy import lambdify, symbols, sympify, diff
+from openiec.utils.symbolic import lambdify, subs, diff
+from openiec.utils.kernels import Kernel
+from openiec.property.commontangent import substitutional
+from openiec.property.orderedenergy import OrderedGibbsEnergy
 from functools import reduce
+import threading
+import numpy as np
 
 
 class SubModel(Model):
@@ -17,6 +22,74 @@ class SubModel(Model):
     contributions = [("xsmix", "excess_mixing_energy")]
 
 
+class ExcessModelRegistry(object):
+    """
+    Build the excess Gibbs energy of each phase and its partial quantities once per system.
+    The expressions keep the temperature symbolic, so that they are shared by the bulk and interfacial models
+    at every temperature. The registry may be shared by threads, each model is built once under a lock.
+    """
+
+    def __init__(self):
+        self.models = {}
+        self.partials = {}
+        self.lock = threading.RLock()
+
+    def get(self, db, comps, phasename):
+        """
+        The excess Gibbs energy of the phase and the partial excess Gibbs energies of components.
+
+        Parameters
+        -----------
+        db : Database
+            Database containing the relevant parameters.
+        comps: list
+            Names of components to consider in the calculation.
+        phasename: str
+            Name of the phase.
+        """
+        key = (id(db), tuple(comps), phasename)
+        with self.lock:
+            if key not in self.models or self.models[key]["db"] is not db:
+                self.models[key] = self._build(db, comps, phasename)
+            return self.models[key]
+
+    def _build(self, db, comps, phasename):
+        vars = {V.Y(phasename, 1, "VA"): 1.0, V.R: 8.31451}
+        xs = [V.Y(phasename, 0, each) for each in comps if each != "VA"]
+
+        model = SubModel(db, comps, phasename)
+        exgm = subs(model.ast, vars)
+
+        dgmdy = [diff(exgm, x) for x in xs]
+
+        sumpartial = reduce(
+            lambda x, y: x + y, [xs[i] * dgmdy[i] for i in range(len(xs))]
+        )
+        pexgm = [exgm + dgmdy[i] - sumpartial for i in range(len(xs))]
+
+        return {"db": db, "xs": xs, "exgm": exgm, "pexgm": pexgm}
+
+    def phase(self, db, comps, phasename):
+        """
+        The partial excess Gibbs energies of components in one phase as numerical functions, built once per system.
+        See PhaseExcess.
+        """
+        key = ("PhaseExcess", id(db), tuple(comps), phasename)
+        with self.lock:
+            if key not in self.partials or self.partials[key][0] is not db:
+                self.partials[key] = (db, PhaseExcess(db, comps, phasename, self))
+            return self.partials[key][1]
+
+    def clear(self):
+        with self.lock:
+            self.models = {}
+            self.partials = {}
+
+
+"""The registry shared by default within the process"""
+registry = ExcessModelRegistry()
+
+
 class SolutionGibbsEnergy(object):
     """
     Construct the excess Gibbs energy expression of the builk phase.
@@ -31,38 +104,37 @@ class SolutionGibbsEnergy(object):
         Name of pure component.
     phasename: str
         One of two bulk phases.
+    registry: ExcessModelRegistry
+        The registry of excess models, shared by default within the process.
     """
 
-    def __init__(self, T, db, comps, phasename):
-        vars = {V.Y(phasename, 1, "VA"): 1.0, V.R: 8.31451, V.T: T}
+    def __init__(self, T, db, comps, phasename, registry=registry):
+        if not substitutional(db, phasename):
+            phase = registry.phase(db, comps, phasename)
+            self.lam_pexgm = [
+                (lambda *x, i=i: float(phase(x, T)[i])) for i in range(len(phase.components))
+            ]
+            self.lam_exgm = lambda *x: float(np.dot([1.0 - sum(x)] + list(x), phase(x, T)))
+            return
 
-        xs = [V.Y(phasename, 0, each) for each in comps if each != "VA"]
+        model = registry.get(db, comps, phasename)
+
+        xs = model["xs"]
         vars_xs = [(xs[0], 1.0 - sum([xs[i] for i in range(1, len(xs))]))]
         self.xxs = [xs[i] for i in range(1, len(xs))]
 
-        model = SubModel(db, comps, phasename)
-        sympy_exgm = model.ast
-        exgm = sympy_exgm.subs(vars)
+        exgm = subs(subs(model["exgm"], {V.T: T}), vars_xs)
+        pexgm = [subs(subs(each, {V.T: T}), vars_xs) for each in model["pexgm"]]
 
-        dgmdy = [diff(exgm, x) for x in xs]
-
-        sumpartial = reduce(
-            lambda x, y: x + y, [xs[i] * dgmdy[i] for i in range(len(xs))]
-        )
-        pexgm = [exgm + dgmdy[i] - sumpartial for i in range(len(xs))]
-
-        exgm = exgm.subs(vars_xs)
-        pexgm = [each.subs(vars_xs) for each in pexgm]
-
-        self.lam_exgm = lambdify(self.xxs, exgm, "numpy", dummify=True)
-        self.lam_pexgm = [
-            lambdify(self.xxs, each, "numpy", dummify=True) for each in pexgm
-        ]
+        self.lam_exgm = lambdify(self.xxs, exgm)
+        self.lam_pexgm = [lambdify(self.xxs, each) for each in pexgm]
 
 
 class InterfacialGibbsEnergy(object):
     """
     Construct the excess Gibbs energy expression of the interface.
+    The excess Gibbs energy of the interface is the average of those of two bulk phases,
+    and so are the partial excess Gibbs energies.
 
     Parameters
     -----------
@@ -74,44 +146,95 @@ class InterfacialGibbsEnergy(object):
         Name of pure component.
     phasename: list
         Two phases in the interface
+    registry: ExcessModelRegistry
+        The registry of excess models, shared by default within the process.
     """
 
-    def __init__(self, T, db, comps, phasename):
-        vars1 = {V.Y(phasename[0], 1, "VA"): 1.0, V.R: 8.31451, V.T: T}
-
-        xs1 = [V.Y(phasename[0], 0, each) for each in comps if each != "VA"]
-
-        model1 = SubModel(db, comps, phasename[0])
-        sympy_exgm1 = model1.ast
-        exgm1 = sympy_exgm1.subs(vars1)
-
-        vars2 = {V.Y(phasename[1], 1, "VA"): 1.0, V.R: 8.31451, V.T: T}
-
-        xs2 = [V.Y(phasename[1], 0, each) for each in comps if each != "VA"]
-
-        model2 = SubModel(db, comps, phasename[1])
-        sympy_exgm2 = model2.ast
-        exgm2 = sympy_exgm2.subs(vars2)
-
-        vars_xs = [(xs1[i], xs2[i]) for i in range(len(xs1))]
+    def __init__(self, T, db, comps, phasename, registry=registry):
+        if not all(substitutional(db, each) for each in phasename):
+            phases = [registry.phase(db, comps, each) for each in phasename]
+            pexgm = lambda x: 0.5 * (phases[0](x, T) + phases[1](x, T))
+            self.lam_pexgm = [
+                (lambda *x, i=i: float(pexgm(x)[i])) for i in range(len(phases[0].components))
+            ]
+            self.lam_exgm = lambda *x: float(np.dot([1.0 - sum(x)] + list(x), pexgm(x)))
+            return
+
+        model1 = registry.get(db, comps, phasename[0])
+        model2 = registry.get(db, comps, phasename[1])
+
+        xs1, xs2 = model1["xs"], model2["xs"]
+        vars_xs = dict([(xs1[i], xs2[i]) for i in range(len(xs1))] + [(V.T, T)])
         xs = [each for each in xs2]
         vars_xxs = [(xs[0], 1.0 - sum([xs[i] for i in range(1, len(xs))]))]
         self.xxs = [xs[i] for i in range(1, len(xs))]
 
-        sympy_exgm = 0.5 * (exgm1 + exgm2)
-        exgm = sympy_exgm.subs(vars_xs)
+        exgm = 0.5 * (subs(model1["exgm"], vars_xs) + subs(model2["exgm"], {V.T: T}))
+        pexgm = [
+            0.5 * (subs(p1, vars_xs) + subs(p2, {V.T: T}))
+            for p1, p2 in zip(model1["pexgm"], model2["pexgm"])
+        ]
 
-        dgmdy = [diff(exgm, x) for x in xs]
+        exgm = subs(exgm, vars_xxs)
+        pexgm = [subs(each, vars_xxs) for each in pexgm]
+        self.lam_exgm = lambdify(self.xxs, exgm)
+        self.lam_pexgm = [lambdify(self.xxs, each) for each in pexgm]
 
-        sumpartial = reduce(
-            lambda x, y: x + y, [xs[i] * dgmdy[i] for i in range(len(xs))]
-        )
-        pexgm = [exgm + dgmdy[i] - sumpartial for i in range(len(xs))]
 
-        exgm = exgm.subs(vars_xxs)
-        pexgm = [each.subs(vars_xxs) for each in pexgm]
-        self.lam_exgm = lambdify(self.xxs, exgm, "numpy")
-        self.lam_pexgm = [
-            lambdify(self.xxs, each, "numpy", dummify=True) for each in pexgm
-        ]
+class PhaseExcess(object):
+    """
+    Construct the partial excess Gibbs energies of components in one phase and their derivatives
+    as numerical functions of the independent mole fractions and temperature.
+    For a substitutional phase they come from the excess Gibbs energy of the database,
+    and for a phase with several sublattices from the minimized Gibbs energy relative to the pure end-members
+    and the ideal mixing, see OrderedGibbsEnergy.partialexcess.
+
+    Parameters
+    -----------
+    db : Database
+        Database containing the relevant parameters.
+    comps: list
+        Names of components to consider in the calculation.
+    phasename: str
+        Name of the phase.
+    registry: ExcessModelRegistry
+        The registry of excess models, shared by default within the process.
+    """
 
+    def __init__(self, db, comps, phasename, registry=registry):
+        self.components = [each for each in comps if each != "VA"]
+        if substitutional(db, phasename):
+            self.ordered = None
+            model = registry.get(db, comps, phasename)
+            xs = model["xs"]
+            vars_xxs = [(xs[0], 1.0 - sum([xs[i] for i in range(1, len(xs))]))]
+            args = [xs[i] for i in range(1, len(xs))] + [V.T]
+            pexgm = [subs(each, vars_xxs) for each in model["pexgm"]]
+            self.func = Kernel(args, pexgm)
+            self.dfunc = lambdify(args, [[diff(each, x) for x in args] for each in pexgm])
+        else:
+            self.ordered = OrderedGibbsEnergy.shared(db, comps, phasename)
+
+    def _clip(self, x):
+        """The site fractions of an ordered phase are kept off the boundaries of the composition simplex"""
+        x = np.clip(np.asarray(x, dtype=float), 1.0e-10, 1.0)
+        return x / max(1.0, x.sum() + 1.0e-10)
+
+    def __call__(self, x, T):
+        """
+        Partial excess Gibbs energies of components at the independent mole fractions x.
+        """
+        if self.ordered is None:
+            return np.array(self.func.scalar(*(list(x) + [T])), dtype=float)
+        return self.ordered.partialexcess(self._clip(x), T, derivatives=False)["pexgm"]
+
+    def derivatives(self, x, T):
+        """
+        Derivatives of the partial excess Gibbs energies with respect to the independent mole fractions,
+        with the shape (ncomps, len(x)), and temperature, with the shape (ncomps,).
+        """
+        if self.ordered is None:
+            d = np.array(self.dfunc(*(list(x) + [T])), dtype=float)
+            return d[:, :-1], d[:, -1]
+        d = self.ordered.partialexcess(self._clip(x), T)
+        return d["x"], d["T"]
@@ -0,0 +1,242 @@
+"""
+Load a TDB database restricted to the requested components and phases.
+
+Large databases contain many elements and phases which are not needed in a calculation,
+but all of their functions and parameters are parsed into symbolic expressions on loading.
+The TDB text is filtered before parsing instead, and the filtered text is kept on disk,
+so that every worker of a batch job only parses the relevant part once.
+"""
+
+import hashlib
+import os
+import re
+
+"""Bump to invalidate the filtered files on disk when the filtering changes"""
+_version = 1
+
+_keywords = [
+    "ELEMENT",
+    "SPECIES",
+    "FUNCTION",
+    "TYPE_DEFINITION",
+    "PHASE",
+    "CONSTITUENT",
+    "PARAMETER",
+]
+
+
+def LoadDatabase(path, comps, phasenames, cachedir=None):
+    """
+    Load the database with only the elements, phases, parameters and functions relevant to the given components and phases.
+
+    Parameters
+    -----------
+    path: str
+        Path of the TDB file.
+    comps : list
+        Names of components to consider in the calculation.
+    phasenames : list
+        Names of phases to keep. Disordered parts of the given ordered phases are kept too.
+    cachedir: str
+        Directory of the filtered files, which defaults to the environment variable OPENIEC_CACHE or ~/.cache/openiec.
+        The filtered file is reused as long as the TDB file, the components and the phases are unchanged.
+        False disables the cache.
+
+    Return type: pycalphad Database
+    """
+    from pycalphad import Database
+
+    with open(path) as f:
+        text = f.read()
+
+    if cachedir is False:
+        return Database.from_string(FilterTDB(text, comps, phasenames), fmt="tdb")
+
+    if cachedir is None:
+        cachedir = os.environ.get("OPENIEC_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "openiec"))
+    key = hashlib.sha256(
+        repr((_version, text, sorted(c.upper() for c in comps), sorted(p.upper() for p in phasenames))).encode()
+    ).hexdigest()
+    cached = os.path.join(cachedir, "%s-%s.tdb" % (os.path.splitext(os.path.basename(path))[0], key[:16]))
+
+    if os.path.exists(cached):
+        with open(cached) as f:
+            filtered = f.read()
+    else:
+        filtered = FilterTDB(text, comps, phasenames)
+        try:
+            os.makedirs(cachedir, exist_ok=True)
+            """Write to a temporary file first, as several workers may store the same file at once"""
+            tmp = "%s.%d.tmp" % (cached, os.getpid())
+            with open(tmp, "w") as f:
+                f.write(filtered)
+            os.replace(tmp, cached)
+        except OSError as e:
+            print("[Warning] The filtered database is not cached: %s" % e)
+
+    return Database.from_string(filtered, fmt="tdb")
+
+
+def FilterTDB(text, comps, phasenames):
+    """
+    Filter the text of a TDB file, keeping:
+        ELEMENT and SPECIES commands of the given components, VA and /-,
+        PHASE and CONSTITUENT commands of the given phases, with the constituents restricted to the kept species,
+        PARAMETER commands of the kept phases whose constituents are all kept,
+        FUNCTION commands referred to by the kept parameters and functions,
+        TYPE_DEFINITION commands used by the kept phases,
+        and all other commands unchanged.
+    A phase without any kept constituent on one of its sublattices is removed.
+
+    Parameters
+    -----------
+    text: str
+        Content of the TDB file.
+    comps : list
+        Names of components to consider in the calculation.
+    phasenames : list
+        Names of phases to keep.
+
+    Return type: str
+    """
+    commands = _commands(text)
+    elements = set(each.upper() for each in comps) | {"VA", "/-"}
+    phases = set(each.upper() for each in phasenames)
+
+    """Element names of the database, used to split the formulas of species"""
+    allelements = set()
+    for keyword, command in commands:
+        if keyword == "ELEMENT" and len(command.split()) > 1:
+            allelements.add(command.split()[1])
+
+    species = set(elements)
+    for keyword, command in commands:
+        if keyword == "SPECIES":
+            tokens = command.split()
+            if len(tokens) > 2 and _formula(tokens[2], allelements) <= elements:
+                species.add(tokens[1])
+
+    """Type definitions and disordered parts of the requested phases"""
+    typechars = {}
+    for keyword, command in commands:
+        if keyword == "PHASE":
+            tokens = command.split()
+            typechars[_phasename(tokens[1])] = tokens[2] if len(tokens) > 2 else ""
+    for keyword, command in commands:
+        if keyword == "TYPE_DEFINITION":
+            tokens = command.replace(",", " ").split()
+            if "DIS_PART" in tokens or "DISORDERED_PART" in tokens:
+                if len(tokens) > 6 and tokens[4] in phases:
+                    phases.add(tokens[6])
+
+    constituents = {}
+    for keyword, command in commands:
+        if keyword == "CONSTITUENT":
+            tokens = command.split(None, 2)
+            name = _phasename(tokens[1])
+            if name not in phases:
+                continue
+            subls = [
+                [c.strip() for c in subl.split(",") if c.strip() and c.strip().rstrip("%") in species]
+                for subl in tokens[2].strip().strip(":").split(":")
+            ]
+            if all(subls):
+                constituents[name] = (tokens[1], subls)
+    phases = set(constituents)
+    used = set("".join(typechars.get(each, "") for each in phases))
+
+    """Parameters of the kept phases and the functions they refer to"""
+    parameters = set()
+    for keyword, command in commands:
+        if keyword == "PARAMETER":
+            match = re.match(r"\S+\s+[^(]+\(\s*([^,\s]+)\s*,([^;]*);", command)
+            if match is None:
+                continue
+            sitespecies = [c.strip() for c in re.split(r"[,:]", match.group(2)) if c.strip()]
+            if _phasename(match.group(1)) in phases and all(c in species or c == "*" for c in sitespecies):
+                parameters.add(command)
+
+    functions = {}
+    for keyword, command in commands:
+        if keyword == "FUNCTION":
+            functions[command.split()[1]] = command
+    needed = set()
+    queue = list(parameters)
+    while queue:
+        for name in re.findall(r"[A-Z_][A-Z0-9_]*", queue.pop().split(None, 2)[-1]):
+            if name in functions and name not in needed:
+                needed.add(name)
+                queue.append(functions[name])
+
+    kept = []
+    for keyword, command in commands:
+        tokens = command.split()
+        if keyword == "ELEMENT":
+            keep = len(tokens) > 1 and tokens[1] in elements
+        elif keyword == "SPECIES":
+            keep = len(tokens) > 1 and tokens[1] in species
+        elif keyword == "FUNCTION":
+            keep = tokens[1] in needed
+        elif keyword == "TYPE_DEFINITION":
+            keep = len(tokens) > 1 and tokens[1] in used
+        elif keyword == "PHASE":
+            keep = _phasename(tokens[1]) in phases
+        elif keyword == "CONSTITUENT":
+            name = _phasename(tokens[1])
+            keep = name in phases
+            if keep:
+                fullname, subls = constituents[name]
+                command = "CONSTITUENT %s :%s:" % (fullname, " : ".join(",".join(subl) for subl in subls))
+        elif keyword == "PARAMETER":
+            keep = command in parameters
+        else:
+            keep = True
+        if keep:
+            kept.append(command)
+
+    return "".join(" %s !\n" % each for each in kept)
+
+
+def _commands(text):
+    """
+    Split the text of a TDB file into commands as pycalphad does, with comments removed.
+    Each command is returned with its keyword expanded from possible abbreviations.
+    """
+    lines = text.upper().replace("\t", " ").split("\n")
+    lines = [each.split("$", 1)[0] for each in lines]
+    lines = [each.split("!")[0] + ("!" if "!" in each else "") for each in lines]
+    commands = []
+    for command in " ".join(lines).split("!"):
+        command = " ".join(command.split())
+        if command:
+            word = command.split()[0].replace("-", "_")
+            keyword = next((k for k in _keywords if len(word) > 2 and k.startswith(word)), None)
+            commands.append((keyword, command))
+    return commands
+
+
+def _phasename(name):
+    """
+    The name of the phase without the options after ":", e.g. LIQUID for LIQUID:L.
+    """
+    return name.split(":")[0].upper()
+
+
+def _formula(formula, allelements):
+    """
+    The elements in the formula of a species, e.g. {"AL", "NI"} for AL1NI1, split by the element names of the database.
+    """
+    formula = formula.split("/")[0]
+    elements, i = set(), 0
+    names = sorted(allelements, key=len, reverse=True)
+    while i < len(formula):
+        if formula[i].isdigit() or formula[i] == ".":
+            i += 1
+            continue
+        name = next((each for each in names if formula.startswith(each, i)), None)
+        if name is None:
+            """Unknown element, so that the species is not kept"""
+            return {formula}
+        elements.add(name)
+        i += len(name)
+    return elements
@@ -0,0 +1,123 @@
+"""
+Compiled kernels of symbolic expressions for the innermost loops of the interfacial equilibrium search.
+
+A kernel evaluates all its expressions at once, either at a single point (scalar) or at a batch of points (batch).
+By default the scalar kernel is plain Python code with the math module, and the batch kernel is the numpy function
+of the symbolic backend. With the environment variable OPENIEC_KERNEL=numba, the kernels are compiled by numba,
+which removes the interpreter overhead of calling numpy functions with scalars. The compilation is not cached
+on disk and takes several seconds per model in every process, so that numba only pays off for long runs
+in a single process.
+"""
+
+import math
+import os
+import threading
+import numpy as np
+import sympy
+from sympy.printing.pycode import PythonCodePrinter
+from openiec.utils.symbolic import lambdify, sympify
+
+backend = os.environ.get("OPENIEC_KERNEL", "numpy")
+
+"""numba is imported only if it is chosen, as the import alone takes a noticeable part of the start of a worker"""
+numba = None
+if backend == "numba":
+    try:
+        import numba
+    except ImportError:
+        print("[Warning] OPENIEC_KERNEL=numba but numba is not installed, the numpy kernels are used.")
+        backend = "numpy"
+
+"""Compiled functions keyed by their source, shared by all kernels of the same expressions within the process"""
+_compiled = {}
+_lock = threading.Lock()
+
+
+class Kernel(object):
+    """
+    Compile expressions into a scalar and a batched function of the same arguments.
+    numba compiles the functions at their first call, and models rebuilt with the same expressions,
+    e.g. at another temperature, reuse the compiled functions.
+
+    Parameters
+    -----------
+    args: list
+        Symbols of the arguments.
+    exprs: list
+        Expressions to evaluate.
+
+    Example
+    -----------
+        kernel = Kernel([x, T], [x * T, log(x)])
+        kernel.scalar(0.5, 800.0)                            # tuple of two floats
+        kernel.batch([0.1, 0.2], 800.0)                      # array with the shape (2, 2)
+    """
+
+    def __init__(self, args, exprs):
+        self.nargs, self.nout = len(args), len(exprs)
+        names = ["a%d" % i for i in range(self.nargs)]
+        source = _source(names, [sympify(each) for each in args], [sympify(each) for each in exprs])
+
+        if backend == "numba":
+            with _lock:
+                if source not in _compiled:
+                    namespace = {"math": math}
+                    exec(source, namespace)
+                    scalar = numba.njit(error_model="numpy")(namespace["scalar"])
+                    namespace = {"math": math, "scalar": scalar}
+                    exec(_batchsource(names, self.nout), namespace)
+                    _compiled[source] = (scalar, numba.njit(error_model="numpy")(namespace["batch"]))
+                self._scalar, self._batch = _compiled[source]
+        else:
+            namespace = {"math": math}
+            exec(source, namespace)
+            self._scalar = namespace["scalar"]
+            self._batch = lambdify(list(args), list(exprs))
+
+    def scalar(self, *values):
+        """
+        Values of all expressions at a single point, as a tuple of floats.
+        """
+        try:
+            return self._scalar(*[float(each) for each in values])
+        except (ValueError, ZeroDivisionError, OverflowError):
+            """The math module raises where numpy returns NaN"""
+            return (float("nan"),) * self.nout
+
+    def batch(self, *values):
+        """
+        Values of all expressions at a batch of points, with the shape (len(exprs), ...),
+        where the arguments are broadcast against each other.
+        """
+        values = np.broadcast_arrays(*[np.asarray(each, dtype=float) for each in values])
+        shape = values[0].shape
+        if backend == "numba":
+            X = np.ascontiguousarray(np.stack([each.ravel() for each in values], axis=-1))
+            out = np.empty((self.nout, X.shape[0]))
+            self._batch(X, out)
+            return out.reshape((self.nout,) + shape)
+        return np.array([np.broadcast_to(each, shape) for each in self._batch(*values)], dtype=float)
+
+
+def _source(names, args, exprs):
+    """
+    Python source of the scalar function of the expressions, with the arguments renamed to names.
+    """
+    dummies = [sympy.Symbol(each) for each in names]
+    replace = dict(zip([sympy.sympify(each) for each in args], dummies))
+    printer = PythonCodePrinter({"fully_qualified_modules": True})
+    body = ", ".join(printer.doprint(sympy.sympify(each).xreplace(replace)) for each in exprs)
+    return "def scalar(%s):\n    return (%s,)\n" % (", ".join(names), body)
+
+
+def _batchsource(names, nout):
+    """
+    Python source of the loop evaluating the scalar function at every row of X into the columns of out.
+    """
+    lines = [
+        "def batch(X, out):",
+        "    for i in range(X.shape[0]):",
+        "        r = scalar(%s)" % ", ".join("X[i, %d]" % j for j in range(len(names))),
+    ]
+    lines += ["        out[%d, i] = r[%d]" % (k, k) for k in range(nout)]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,281 @@
+"""
+Split a sweep into shards which are calculated by workers on several machines sharing a directory.
+
+The condition table is partitioned into shards of consecutive rows, which depends only on the number of rows
+and the shard size. The shards are listed in a SQLite database in the shared directory, from which the workers
+claim them one at a time, and each shard is written to its own ResultStore in the same directory.
+A worker renews the lease of its shard while calculating, and a shard whose lease has expired,
+e.g. as its worker was killed or its machine was lost, is claimed again by another worker,
+which continues from the chunks already stored. The shards are finally merged into one Dataset.
+No scheduler is needed: any number of workers may be started or stopped at any time on any machine.
+
+The database is locked by the filesystem, so the shared directory should support POSIX locks
+(local disks and most NFS setups do), and the lease should be much longer than the difference of the clocks
+of the machines and than the time to calculate one chunk.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+import numpy as np
+from xarray import concat
+
+_schema = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY,
+    start INTEGER,
+    stop INTEGER,
+    state TEXT DEFAULT 'pending',
+    owner TEXT,
+    heartbeat REAL,
+    attempts INTEGER DEFAULT 0
+);
+"""
+
+
+class ShardQueue(object):
+    """
+    The work queue of a sharded sweep in a shared directory.
+
+    Parameters
+    -----------
+    directory: str
+        The shared directory of the queue and the results of the shards.
+
+    Example
+    -----------
+        queue = ShardQueue("/shared/sigma-NiAl")
+        queue.create(system, "/shared/NiAl-xal-tem.csv", nrows, shardsize=1000)
+        shard = queue.claim(Owner())                         # on every worker, until None
+        ...
+        ds = queue.merge()
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, "queue.sqlite")
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=60.0, isolation_level=None)
+        connection.executescript(_schema)
+        return connection
+
+    def _transaction(self, f):
+        """
+        Call f with a cursor in a transaction holding the write lock, so that no shard is claimed twice.
+        """
+        connection = self._connect()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = f(cursor)
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+            return result
+        finally:
+            connection.close()
+
+    def create(self, system, input, nrows, shardsize=1000, lease=600.0, maxattempts=3):
+        """
+        Partition the condition table into shards, or check that the existing queue was created the same way.
+
+        Parameters
+        -----------
+        system: dict
+            Description of the calculation system, see openiec.cli.readsystem.
+        input: str
+            Path of the conditions, readable by all workers.
+        nrows: int
+            Number of conditions in the table.
+        shardsize: int
+            Number of consecutive conditions in a shard.
+        lease: float
+            Seconds after the last heartbeat of a worker until its shard may be claimed by another worker.
+        maxattempts: int
+            Number of claims of a shard after which it is given up, e.g. as it kills its workers.
+
+        Return type: int, the number of shards
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {
+            "system": json.dumps(system, sort_keys=True),
+            "input": os.path.abspath(input),
+            "nrows": str(int(nrows)),
+            "shardsize": str(int(shardsize)),
+            "lease": repr(float(lease)),
+            "maxattempts": str(int(maxattempts)),
+        }
+
+        def create(cursor):
+            existing = dict(cursor.execute("SELECT key, value FROM meta").fetchall())
+            if existing:
+                if existing != meta:
+                    raise ValueError(
+                        "The queue in %s was created for another sweep, use another directory." % self.directory
+                    )
+            else:
+                cursor.executemany("INSERT INTO meta VALUES (?, ?)", sorted(meta.items()))
+                cursor.executemany("INSERT INTO shards (id, start, stop) VALUES (?, ?, ?)", Partition(nrows, shardsize))
+            return cursor.execute("SELECT COUNT(*) FROM shards").fetchone()[0]
+
+        return self._transaction(create)
+
+    def meta(self):
+        """
+        The system, the input and the settings of the queue as a dictionary.
+        """
+        if not os.path.exists(self.path):
+            raise ValueError("No shard queue is created in %s." % self.directory)
+        connection = self._connect()
+        try:
+            meta = dict(connection.execute("SELECT key, value FROM meta").fetchall())
+        finally:
+            connection.close()
+        return {
+            "system": json.loads(meta["system"]),
+            "input": meta["input"],
+            "nrows": int(meta["nrows"]),
+            "shardsize": int(meta["shardsize"]),
+            "lease": float(meta["lease"]),
+            "maxattempts": int(meta["maxattempts"]),
+        }
+
+    def claim(self, owner):
+        """
+        Claim a pending shard, or a shard whose lease has expired.
+
+        Parameters
+        -----------
+        owner: str
+            Unique name of the worker, see Owner.
+
+        Return type: tuple (id, start, stop) of the shard, None if no shard is left
+        """
+        meta = self.meta()
+
+        def claim(cursor):
+            now = time.time()
+            row = cursor.execute(
+                "SELECT id, start, stop FROM shards WHERE attempts < ? "
+                "AND (state = 'pending' OR (state = 'running' AND heartbeat < ?)) ORDER BY id LIMIT 1",
+                (meta["maxattempts"], now - meta["lease"]),
+            ).fetchone()
+            if row is None:
+                return None
+            cursor.execute(
+                "UPDATE shards SET state = 'running', owner = ?, heartbeat = ?, attempts = attempts + 1 WHERE id = ?",
+                (owner, now, row[0]),
+            )
+            return tuple(row)
+
+        return self._transaction(claim)
+
+    def heartbeat(self, shard, owner):
+        """
+        Renew the lease of the shard.
+
+        Return type: bool, False if the shard was claimed by another worker in the meantime
+        """
+        return self._update(shard, owner, "running")
+
+    def complete(self, shard, owner):
+        """
+        Mark the shard as calculated.
+
+        Return type: bool, False if the shard was claimed by another worker in the meantime
+        """
+        return self._update(shard, owner, "done")
+
+    def _update(self, shard, owner, state):
+        def update(cursor):
+            cursor.execute(
+                "UPDATE shards SET state = ?, heartbeat = ? WHERE id = ? AND owner = ? AND state = 'running'",
+                (state, time.time(), shard, owner),
+            )
+            return cursor.rowcount == 1
+
+        return self._transaction(update)
+
+    def status(self):
+        """
+        Number of shards by state: pending, running, expired, failed and done.
+        """
+        meta = self.meta()
+        connection = self._connect()
+        try:
+            rows = connection.execute("SELECT state, heartbeat, attempts FROM shards").fetchall()
+        finally:
+            connection.close()
+        now = time.time()
+        status = {"pending": 0, "running": 0, "expired": 0, "failed": 0, "done": 0}
+        for state, heartbeat, attempts in rows:
+            if state != "done" and attempts >= meta["maxattempts"] and (state == "pending" or heartbeat < now - meta["lease"]):
+                state = "failed"
+            elif state == "running" and heartbeat < now - meta["lease"]:
+                state = "expired"
+            status[state] += 1
+        return status
+
+    def output(self, shard):
+        """
+        Path of the ResultStore of the shard.
+        """
+        return os.path.join(self.directory, "shard-%06d" % shard)
+
+    def merge(self):
+        """
+        Merge the results of all shards into one Dataset in the order of the shards.
+        Conditions stored twice, by a worker which lost its lease and by the worker which claimed the shard again,
+        are kept once.
+
+        Return type: xarray Dataset with the dimensions Condition and Components
+        """
+        from openiec.utils.store import OpenResults, _parts
+
+        status = self.status()
+        total = sum(status.values())
+        if status["done"] < total:
+            print("[Warning] %d of %d shards are not completed: %s" % (total - status["done"], total, status))
+
+        parts = []
+        for shard in range(total):
+            if _parts(self.output(shard)):
+                parts.append(OpenResults(self.output(shard)))
+        if not parts:
+            raise ValueError("No results are stored in %s." % self.directory)
+        ds = concat(parts, dim="Condition", data_vars="minimal")
+        ds.attrs = parts[0].attrs
+        _, first = np.unique(ds["Id"].values.astype(str), return_index=True)
+        return ds.isel(Condition=np.sort(first))
+
+
+def Partition(nrows, shardsize):
+    """
+    Partition the rows of a condition table into shards of consecutive rows.
+
+    Parameters
+    -----------
+    nrows: int
+        Number of rows.
+    shardsize: int
+        Number of rows of a shard, the last shard may be shorter.
+
+    Return type: list of (id, start, stop)
+    """
+    if shardsize < 1:
+        raise ValueError("The shard size must be positive, not %s." % shardsize)
+    return [(i, start, min(start + shardsize, nrows)) for i, start in enumerate(range(0, nrows, shardsize))]
+
+
+def Owner():
+    """
+    A unique name of a worker, made of the host name, the process id and a random suffix.
+    """
+    return "%s:%d:%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
@@ -0,0 +1,180 @@
+"""
+Store the results of large sweeps in chunks, and read them back lazily.
+
+The records of calculated conditions are collected in preallocated arrays and written in chunks,
+either as NetCDF part files in a directory or appended to a Zarr store, with the dimensions Condition and Components.
+Nothing but the chunk being filled is kept in memory, and a killed run is continued from the stored chunks.
+"""
+
+import glob
+import os
+import numpy as np
+from xarray import Dataset, open_dataset, concat
+
+
+class ResultStore(object):
+    """
+    An append-capable chunked store of interfacial energy results.
+
+    Parameters
+    -----------
+    path: str
+        A directory of NetCDF part files, or a Zarr store if the path ends with ".zarr".
+    components: list
+        Names of components, without VA.
+    chunksize: int
+        Number of conditions written at once.
+    attrs: dict
+        Attributes of the stored Dataset, e.g. the description of the system.
+
+    Example
+    -----------
+        with ResultStore("sigma-NiAl", ["NI", "AL"]) as store:
+            for i, (T, x0) in enumerate(conditions):
+                store.append(i, T, x0, model(T).calculate(x0))
+        ds = OpenResults("sigma-NiAl")
+    """
+
+    def __init__(self, path, components, chunksize=4096, attrs={}):
+        self.path = path
+        self.components = list(components)
+        self.chunksize = chunksize
+        self.attrs = dict(attrs)
+        self.zarr = path.rstrip("/").endswith(".zarr")
+        if not self.zarr:
+            os.makedirs(path, exist_ok=True)
+            self.parts = len(_parts(path))
+        self._allocate()
+
+    def _allocate(self):
+        n, m = self.chunksize, len(self.components)
+        self.n = 0
+        self.ids = []
+        self.status = []
+        self.T = np.full(n, np.nan)
+        self.x0 = np.full((n, m), np.nan)
+        self.xc = np.full((n, m), np.nan)
+        self.sigmapartial = np.full((n, m), np.nan)
+        self.sigma = np.full(n, np.nan)
+
+    def append(self, cid, T, x0, record=None, status="ok"):
+        """
+        Add the result of one condition, and write the chunk when it is full.
+
+        Parameters
+        -----------
+        cid: str or int
+            Identifier of the condition.
+        T: float
+            Given temperature.
+        x0: list
+            Initial alloy composition, without the first component.
+        record: dict
+            The result of calculate of SigmaSolLiqModel or SigmaCoherentModel, None if not calculated.
+        status: str
+            "ok", or the reason why the condition was not calculated.
+        """
+        i = self.n
+        self.ids.append(str(cid))
+        self.status.append(status)
+        self.T[i] = T
+        self.x0[i] = [1.0 - sum(x0)] + list(x0)
+        if record is not None:
+            self.xc[i] = record["xc"]
+            self.sigmapartial[i] = record["sigmapartial"]
+            self.sigma[i] = record["sigma"]
+        self.n += 1
+        if self.n == self.chunksize:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the collected conditions as one chunk.
+        """
+        if self.n == 0:
+            return
+        n = self.n
+        ds = Dataset(
+            {
+                "Id": ("Condition", np.array(self.ids, dtype=object)),
+                "Temperature": ("Condition", self.T[:n]),
+                "Initial_Alloy_Composition": (("Condition", "Components"), self.x0[:n]),
+                "Interfacial_Composition": (("Condition", "Components"), self.xc[:n]),
+                "Partial_Interfacial_Energy": (("Condition", "Components"), self.sigmapartial[:n]),
+                "Interfacial_Energy": ("Condition", self.sigma[:n]),
+                "Status": ("Condition", np.array(self.status, dtype=object)),
+            },
+            coords={"Components": self.components},
+            attrs=self.attrs,
+        )
+        if self.zarr:
+            if os.path.exists(self.path):
+                """Appending replaces the attributes, so keep those of the first chunk"""
+                ds.attrs = OpenResults(self.path).attrs
+                ds.to_zarr(self.path, append_dim="Condition")
+            else:
+                ds.to_zarr(self.path, mode="w-")
+        else:
+            """Write to a temporary file first, so that a killed run leaves no broken part"""
+            name = os.path.join(self.path, "part-%06d.nc" % self.parts)
+            ds.to_netcdf(name + ".tmp", format="NETCDF3_64BIT")
+            os.replace(name + ".tmp", name)
+            self.parts += 1
+        self._allocate()
+
+    def done(self):
+        """
+        Identifiers of the conditions already stored.
+        """
+        if not os.path.exists(self.path) or (not self.zarr and not _parts(self.path)):
+            return set()
+        return set(str(each) for each in OpenResults(self.path)["Id"].values)
+
+    def discard(self):
+        """
+        Drop the conditions collected since the last chunk was written, e.g. when the shard was lost to another worker.
+        """
+        self._allocate()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def OpenResults(path):
+    """
+    Open the results of a ResultStore lazily as one Dataset with the dimensions Condition and Components.
+    The NetCDF part files are combined by dask if it is installed, and loaded one by one otherwise.
+
+    Parameters
+    -----------
+    path: str
+        The path given to ResultStore.
+
+    Return type: xarray Dataset
+    """
+    if path.rstrip("/").endswith(".zarr"):
+        from xarray import open_zarr
+
+        return open_zarr(path)
+
+    parts = _parts(path)
+    if not parts:
+        raise ValueError("No results are stored in %s." % path)
+    try:
+        import dask
+    except ImportError:
+        return concat([open_dataset(each) for each in parts], dim="Condition", data_vars="minimal")
+
+    from xarray import open_mfdataset
+
+    return open_mfdataset(parts, combine="nested", concat_dim="Condition", data_vars="minimal")
+
+
+def _parts(path):
+    return sorted(glob.glob(os.path.join(path, "part-*.nc")))
@@ -0,0 +1,164 @@
+"""
+Symbolic backend of the model construction.
+
+The substitutions, derivatives and compiled functions of the Gibbs energy and molar volume models
+are done by symengine if it is installed, and by sympy otherwise.
+The backend is chosen by the environment variable OPENIEC_SYMBOLIC ("symengine" or "sympy"), or by UseBackend.
+Expressions of either package are accepted and converted to the backend,
+and the compiled functions of both backends take and return numpy arrays in the same way as sympy.lambdify.
+"""
+
+import os
+import numpy as np
+import sympy
+
+try:
+    import symengine
+except ImportError:
+    symengine = None
+
+backend = os.environ.get("OPENIEC_SYMBOLIC", "symengine" if symengine is not None else "sympy")
+
+
+def UseBackend(name):
+    """
+    Select the symbolic backend for the models built afterwards.
+
+    Parameters
+    -----------
+    name: str
+        "symengine" or "sympy".
+    """
+    global backend
+    if name not in ("symengine", "sympy"):
+        raise ValueError("Unknown symbolic backend %r, use 'symengine' or 'sympy'." % name)
+    if name == "symengine" and symengine is None:
+        raise ImportError("The symbolic backend symengine is not installed.")
+    backend = name
+
+
+def sympify(expr):
+    """
+    Convert the expression to the backend.
+    """
+    if backend == "symengine":
+        return symengine.sympify(expr)
+    return sympy.sympify(expr)
+
+
+def subs(expr, mapping):
+    """
+    Substitute the symbols in the expression, where mapping is a dictionary or a list of pairs.
+    """
+    mapping = dict(mapping)
+    return sympify(expr).subs({sympify(k): sympify(v) for k, v in mapping.items()})
+
+
+def diff(expr, x):
+    """
+    The derivative of the expression with respect to the symbol x.
+    """
+    return sympify(expr).diff(sympify(x))
+
+
+def lambdify(args, exprs, cse=False):
+    """
+    Compile the expressions into a numpy function of the arguments, as sympy.lambdify(args, exprs, "numpy").
+
+    Parameters
+    -----------
+    args: symbol or list
+        Arguments of the function, possibly nested, e.g. (xxs, T).
+    exprs: expression or list
+        Expressions to evaluate, possibly nested. The function returns them in the same structure,
+        with the arguments broadcast against each other.
+    cse: bool
+        Eliminate the common subexpressions of all expressions, e.g. of large Hessians of multi-sublattice models.
+    """
+    if backend == "symengine":
+        return _SymengineFunction(args, exprs, cse)
+    args = _unflatten([sympify(each) for each in _flatten(args)], args)
+    exprs = _unflatten([sympify(each) for each in _flatten(exprs)], exprs)
+    return sympy.lambdify(args, exprs, "numpy", dummify=True, cse=cse)
+
+
+def lambdifyvector(args, exprs, cse=False):
+    """
+    Compile the expressions into a function of one vector of the values of the arguments,
+    returning the vector of the values of the expressions. It avoids the broadcasting of lambdify
+    for the many evaluations at single points in inner iterations.
+
+    Parameters
+    -----------
+    args: list
+        Symbols of the arguments.
+    exprs: list
+        Expressions to evaluate.
+    cse: bool
+        Eliminate the common subexpressions of all expressions.
+    """
+    args = [sympify(each) for each in args]
+    exprs = [sympify(each) for each in exprs]
+    if backend == "symengine":
+        func = symengine.Lambdify(args, exprs, real=True, cse=cse)
+        return lambda values: func(np.asarray(values, dtype=float))
+    func = sympy.lambdify(args, exprs, "math", dummify=True, cse=cse)
+    return lambda values: np.array(func(*values), dtype=float)
+
+
+class _SymengineFunction(object):
+    """
+    A compiled symengine function with the calling convention of sympy.lambdify.
+    All expressions are evaluated by one symengine Lambdify with real arguments.
+    """
+
+    def __init__(self, args, exprs, cse=False):
+        self.args = args
+        self.exprs = exprs
+        flatargs = [sympify(each) for each in _flatten(args)]
+        flatexprs = [sympify(each) for each in _flatten(exprs)]
+        self.func = symengine.Lambdify(flatargs, flatexprs, real=True, cse=cse)
+        self.nargs = len(flatargs)
+
+    def __call__(self, *values):
+        values = values if isinstance(self.args, (list, tuple)) else values[0]
+        values = np.broadcast_arrays(*[np.asarray(each, dtype=float) for each in _flatvalues(self.args, values)])
+        shape = values[0].shape
+        if self.nargs == 1:
+            out = self.func(values[0])
+        else:
+            out = self.func(np.stack(values, axis=-1))
+        out = np.asarray(out).reshape(shape + (-1,))
+        return _unflatten([out[..., i] for i in range(out.shape[-1])], self.exprs)
+
+
+def _flatten(tree):
+    """
+    The leaves of a nested list, or a list of the single leaf.
+    """
+    if isinstance(tree, (list, tuple)):
+        return [leaf for each in tree for leaf in _flatten(each)]
+    return [tree]
+
+
+def _flatvalues(args, values):
+    """
+    The values of the arguments in the order of _flatten(args), where values follow the structure of args.
+    """
+    if isinstance(args, (list, tuple)):
+        return [leaf for arg, value in zip(args, values) for leaf in _flatvalues(arg, value)]
+    return [values]
+
+
+def _unflatten(leaves, tree):
+    """
+    Arrange the leaves in the structure of the nested list.
+    """
+    leaves = iter(leaves)
+
+    def build(node):
+        if isinstance(node, (list, tuple)):
+            return [build(each) for each in node]
+        return next(leaves)
+
+    return build(tree)
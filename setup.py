@@ -8,6 +8,7 @@ setup(name="openiec",
 	packages=find_packages(),
 	license="None",
 	entry_points={
+        "console_scripts": ["openiec=openiec.cli:main"],
     },
 	install_requires=[]
 )
\ No newline at end of file